@@ -0,0 +1,81 @@
+"""
+full / delta 저장 방식 비교: 디스크 크기 + 조회 지연
+    python bench/delta.py [--lines 300] [--versions 60] [--every 10]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from core.storage import JsonlStorage, new_prompt_id  # noqa: E402
+from core.sqlite_store import SqliteStorage  # noqa: E402
+
+def _history(n_lines: int, n_versions: int, seed: int = 0):
+    rnd = random.Random(seed)
+    lines = [f"{i:04d} " + " ".join(rnd.choice("lorem ipsum dolor sit amet consectetur".split()) for _ in range(12))
+             for i in range(n_lines)]
+    out = ["\n".join(lines)]
+    for v in range(1, n_versions):
+        i = rnd.randrange(len(lines))
+        if v % 5 == 0:
+            lines.insert(i, f"inserted at v{v}")
+        else:
+            lines[i] = f"edited at v{v}: " + lines[i]
+        out.append("\n".join(lines))
+    return out
+
+def _timeit(fn, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def run(backend: str, mode: str, history, every: int, root: Path):
+    path = root / f"{backend}-{mode}" / ("prompts.db" if backend == "sqlite" else "prompts.jsonl")
+    path.parent.mkdir(parents=True)
+    cls = SqliteStorage if backend == "sqlite" else JsonlStorage
+    st = cls(path, mode=mode, snapshot_every=every)
+    pid = new_prompt_id()
+    for content in history:
+        st.save_new_version(pid, "bench", content)
+    if backend == "sqlite":
+        st._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = sum(p.stat().st_size for p in path.parent.iterdir() if not p.name.endswith((".idx", ".lock")))
+
+    def cold(fn):
+        def go():
+            st._cache.clear()
+            fn()
+        return go
+    mid = len(history) // 2 + every // 2  # 스냅샷 사이 중간 버전
+    return {
+        "size_kb": size / 1024,
+        "latest_cold_ms": _timeit(cold(lambda: st.latest_by_id(pid))),
+        "latest_warm_ms": _timeit(lambda: st.latest_by_id(pid)),
+        "mid_cold_ms": _timeit(cold(lambda: st.get_version(pid, mid))),
+        "all_cold_ms": _timeit(cold(lambda: st.all_versions(pid)), repeat=5),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=300)
+    ap.add_argument("--versions", type=int, default=60)
+    ap.add_argument("--every", type=int, default=10, help="snapshot 주기")
+    args = ap.parse_args()
+    history = _history(args.lines, args.versions)
+    cols = ["size_kb", "latest_cold_ms", "latest_warm_ms", "mid_cold_ms", "all_cold_ms"]
+    print(f"{args.lines} lines × {args.versions} versions, snapshot every {args.every}")
+    print(f"{'store':<14}" + "".join(f"{c:>16}" for c in cols))
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ("jsonl", "sqlite"):
+            for mode in ("full", "delta"):
+                r = run(backend, mode, history, args.every, Path(tmp))
+                print(f"{backend + '/' + mode:<14}" + "".join(f"{r[c]:>16.2f}" for c in cols))
+
+if __name__ == "__main__":
+    main()
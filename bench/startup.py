@@ -0,0 +1,74 @@
+"""
+CLI 시작 시간 측정 (python -X importtime 기반)
+    python bench/startup.py [--runs 10] [--target-ms 60]
+- 비 LLM 명령(list/show/diff/--help)의 벽시계 시간(중앙값)과 import 시간 상위 모듈
+- 기준: 빈 인터프리터(python -c pass) 대비 추가 시간이 target-ms 이하, openai 미로딩
+- 기준을 넘으면 exit 1
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CLI = str(ROOT / "cli.py")
+
+def _wall(cmd, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def _importtime(cmd):
+    """(모듈명, 누적 ms, 최상위 여부) 목록."""
+    err = subprocess.run([sys.executable, "-X", "importtime", *cmd[1:]], cwd=ROOT,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cum_us, name = line[len("import time:"):].split("|")
+        name = name[1:]  # 구분자 뒤 공백 한 칸, 그 뒤 들여쓰기 = 중첩 깊이
+        rows.append((name.strip(), int(cum_us) / 1000, not name.startswith(" ")))
+    return rows
+
+def _first_prompt_id():
+    # CLI 와 같은 설정(SPARKLING_DATA_DIR/SPARKLING_STORAGE/.env)으로 저장소를 연다
+    sys.path.insert(0, str(ROOT))
+    from core.storage import get_storage
+    _, rows = get_storage().summaries(sort="title", limit=1)
+    return rows[0]["prompt_id"] if rows else None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--target-ms", type=float, default=60.0, help="빈 인터프리터 대비 허용 추가 시간")
+    args = ap.parse_args()
+
+    commands = {"--help": [sys.executable, CLI, "--help"], "list": [sys.executable, CLI, "list"]}
+    pid = _first_prompt_id()
+    if pid:
+        commands["show"] = [sys.executable, CLI, "show", "--id", pid]
+        commands["diff"] = [sys.executable, CLI, "diff", "--id", pid, "--a", "1", "--b", "1"]
+
+    base = _wall([sys.executable, "-c", "pass"], args.runs)
+    print(f"python -c pass: {base:.1f} ms (median of {args.runs})")
+    failed = False
+    for name, cmd in commands.items():
+        ms = _wall(cmd, args.runs)
+        rows = _importtime(cmd)
+        heavy = any(mod == "openai" for mod, _, _ in rows)
+        top = sorted((r for r in rows if r[2]), key=lambda r: -r[1])[:5]
+        ok = (ms - base) <= args.target_ms and not heavy
+        failed |= not ok
+        print(f"\n[{'ok' if ok else 'FAIL'}] {name:<7} {ms:7.1f} ms  (+{ms - base:.1f} ms){'  ⚠ openai imported' if heavy else ''}")
+        for mod, cum, _ in top:
+            print(f"    {cum:7.1f} ms  {mod}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+오프라인 벤치마크 모음 — 합성 저장소(1k~1M 레코드) + replay LLM 백엔드
+    python bench/suite.py [--records 10k] [--backend jsonl,sqlite] [--llm-latency-ms 0]
+                          [--json out.json] [--baseline base.json] [--tolerance 0.25]
+- 저장소 조회(인덱스 구축/로드, latest/get_version/all_versions/title/evals), apply_edits, diff,
+  define → edit → eval CLI 경로(프로세스 내 + 새 프로세스)를 잰다. 값은 모두 ms (중앙값)
+- 모든 파일은 임시 폴더(SPARKLING_DATA_DIR)에 만든다 → data/ 는 건드리지 않음
+- --baseline: 이전 --json 결과보다 tolerance 이상 느려진 항목이 있으면 exit 1
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+WORDS = ("prompt output format json table summary list bullet markdown answer user model "
+         "요약 리뷰 번역 출력 형식 고객 응답 조건 예시 금지").split()
+
+DEFINE_REPLY = "Checklist\n- goal\n```\n# 목표\n{goal}\n\n# 출력 형식\n- JSON\n```\n검증: 충족."
+EVAL_REPLY = "- '출력 형식' 섹션에 JSON 스키마 예시를 추가하세요.\n- 금지 사항을 한 줄로 분리하세요."
+
+def _count(spec: str) -> int:
+    spec = spec.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(spec[-1:], 1)
+    return int(float(spec.rstrip("km")) * mult)
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+def generate_store(path: Path, n_records: int, versions: int, n_lines: int, seed: int = 0):
+    """프롬프트마다 versions 개 버전 + 5버전마다 eval 1개. (prompt_id 목록, 제목 목록)"""
+    rnd = random.Random(seed)
+    pool = [" ".join(rnd.choice(WORDS) for _ in range(10)) for _ in range(512)]
+    pids, titles, written = [], [], 0
+    with path.open("w", encoding="utf-8") as f:
+        while written < n_records:
+            pid, title = f"p{len(pids):07d}", f"title {len(pids) % 997}"
+            lines = [pool[rnd.randrange(512)] for _ in range(n_lines)]
+            for v in range(1, versions + 1):
+                if written >= n_records:
+                    break
+                lines[rnd.randrange(n_lines)] = f"v{v} " + pool[rnd.randrange(512)]
+                f.write(json.dumps({"prompt_id": pid, "version": v, "title": title, "content": "\n".join(lines),
+                                    "meta": {"kind": "edit" if v > 1 else "define"},
+                                    "created_at": "2026-01-01T00:00:00Z"}, ensure_ascii=False) + "\n")
+                written += 1
+                if v % 5 == 0 and written < n_records:
+                    f.write(json.dumps({"record_type": "eval", "prompt_id": pid, "source_version": v, "title": title,
+                                        "llm_output": EVAL_REPLY, "created_at": "2026-01-01T00:00:00Z"},
+                                       ensure_ascii=False) + "\n")
+                    written += 1
+            pids.append(pid)
+            titles.append(title)
+    return pids, titles
+
+def write_fixtures(path: Path) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for i, text in enumerate([DEFINE_REPLY.format(goal="bench goal"), EVAL_REPLY]):
+            f.write(json.dumps({"event": "llm_request", "req_id": f"b{i}", "kwargs": {}}) + "\n")
+            f.write(json.dumps({"event": "llm_response", "req_id": f"b{i}", "text": text, "latency_ms": 0,
+                                "usage": {"input_tokens": 1000, "output_tokens": 200}}, ensure_ascii=False) + "\n")
+
+def bench_store(name, store, pids, titles, repeat, out):
+    rnd = random.Random(1)
+    sample = [rnd.choice(pids) for _ in range(200)]
+    out[f"{name}.latest_by_id"] = _median_ms(lambda: [store.latest_by_id(p) for p in sample], repeat) / len(sample)
+    out[f"{name}.get_version"] = _median_ms(lambda: [store.get_version(p, 2) for p in sample], repeat) / len(sample)
+    out[f"{name}.all_versions"] = _median_ms(lambda: [store.all_versions(p) for p in sample[:50]], repeat) / 50
+    out[f"{name}.find_ids_by_title"] = _median_ms(lambda: [store.find_ids_by_title(t) for t in titles[:50]], repeat) / 50
+    out[f"{name}.evals_for"] = _median_ms(lambda: [store.evals_for(p) for p in sample[:50]], repeat) / 50
+
+def bench_edit_diff(repeat, out):
+    from prompts.edit import apply_edits
+    rnd = random.Random(2)
+    content = "\n".join(" ".join(rnd.choice(WORDS) for _ in range(10)) for _ in range(2000))
+    ops = []
+    for line in rnd.sample(range(1, 2001), 300):
+        op = rnd.choice(["set", "insert", "delete"])
+        ops.append({"op": op, "line": line, "text": "edited"} if op != "delete" else {"op": op, "line": line})
+    out["edit.apply_edits_2000l_300ops"] = _median_ms(lambda: apply_edits(content, ops), repeat)
+    edited = apply_edits(content, ops)
+    out["diff.unified_2000l"] = _median_ms(
+        lambda: list(difflib.unified_diff(content.splitlines(), edited.splitlines(), lineterm="")), repeat)
+
+def bench_cli(pids, repeat, out):
+    import cli
+    sink = io.StringIO()
+
+    def run(*argv):
+        with contextlib.redirect_stdout(sink):
+            code = cli.run(list(argv))
+        sink.seek(0)
+        sink.truncate()
+        if code:
+            raise RuntimeError(f"cli {argv} → exit {code}")
+
+    pid = pids[len(pids) // 2]
+    out["cli.define"] = _median_ms(lambda: run("define", "--title", "bench", "--goal", "bench goal"), repeat)
+    out["cli.edit"] = _median_ms(lambda: run("edit", "--id", pid, "--patch-json",
+                                             '[{"op":"insert","line":1,"text":"bench"}]'), repeat)
+    out["cli.eval"] = _median_ms(lambda: run("eval", "--id", pid, "--undesired", "형식을 안 지킴"), repeat)
+    out["cli.show"] = _median_ms(lambda: run("show", "--id", pid), repeat)
+
+    def cold(*argv):
+        subprocess.run([sys.executable, str(ROOT / "cli.py"), *argv], cwd=ROOT, env=os.environ,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    out["cli.show_cold"] = _median_ms(lambda: cold("show", "--id", pid), max(3, repeat // 2))
+    out["cli.define_cold"] = _median_ms(lambda: cold("define", "--title", "bench", "--goal", "g"), max(3, repeat // 2))
+
+def compare(now, base, tolerance):
+    regressions = []
+    for k, v in now.items():
+        b = base.get(k)
+        if isinstance(b, (int, float)) and b > 0 and v > b * (1 + tolerance) and v - b > 0.05:
+            regressions.append((k, b, v))
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", default="10k", help="합성 레코드 수 (1k, 100k, 1m …)")
+    ap.add_argument("--versions", type=int, default=10, help="프롬프트당 버전 수")
+    ap.add_argument("--lines", type=int, default=20, help="프롬프트 라인 수")
+    ap.add_argument("--backend", default="jsonl,sqlite")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--llm-latency-ms", default="0", help="replay 합성 지연 (ms 또는 recorded)")
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    ap.add_argument("--baseline", help="비교할 이전 결과(JSON)")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="허용 느려짐 비율")
+    ap.add_argument("--keep", action="store_true", help="임시 폴더를 지우지 않음")
+    args = ap.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="sparkling-bench-"))
+    os.environ.update({
+        "SPARKLING_DATA_DIR": str(tmp),
+        "SPARKLING_LLM_BACKEND": "replay",
+        "SPARKLING_LLM_FIXTURES": str(tmp / "fixtures.jsonl"),
+        "SPARKLING_LLM_REPLAY_MATCH": "any",
+        "SPARKLING_LLM_REPLAY_LATENCY": args.llm_latency_ms,
+        "SPARKLING_LLM_CACHE": "off",
+        "SPARKLING_DAEMON": "off",
+        "LLM_LOG_CONSOLE": "0",
+    })
+    from core.storage import JsonlStorage
+    n = _count(args.records)
+    out = {}
+    try:
+        write_fixtures(tmp / "fixtures.jsonl")
+        path = tmp / "prompts.jsonl"
+        t0 = time.perf_counter()
+        pids, titles = generate_store(path, n, args.versions, args.lines)
+        print(f"{n:,} records / {len(pids):,} prompts, {path.stat().st_size / 1e6:.1f} MB "
+              f"(generated in {time.perf_counter() - t0:.1f}s) → {tmp}")
+
+        backends = [b.strip() for b in args.backend.split(",") if b.strip()]
+        if "jsonl" in backends:
+            idx = path.with_name(path.name + ".idx")
+            out["jsonl.index_build"] = _median_ms(
+                lambda: (idx.unlink(missing_ok=True), JsonlStorage(path).index.refresh()), 1)
+            out["jsonl.index_load"] = _median_ms(lambda: JsonlStorage(path).index.refresh(), args.repeat)
+            bench_store("jsonl", JsonlStorage(path), pids, titles, args.repeat, out)
+        if "sqlite" in backends:
+            from core.sqlite_store import SqliteStorage, migrate_jsonl
+            db = tmp / "prompts.db"
+            out["sqlite.migrate"] = _median_ms(lambda: migrate_jsonl(path, db), 1)
+            bench_store("sqlite", SqliteStorage(db), pids, titles, args.repeat, out)
+        bench_edit_diff(args.repeat, out)
+        bench_cli(pids, args.repeat, out)
+    finally:
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    width = max(len(k) for k in out)
+    for k, v in out.items():
+        print(f"{k:<{width}}  {v:10.3f} ms")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"records": n, **out}, indent=2), encoding="utf-8")
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regs = compare(out, base, args.tolerance)
+        for k, b, v in regs:
+            print(f"[REGRESSION] {k}: {b:.3f} → {v:.3f} ms (+{(v / b - 1) * 100:.0f}%)")
+        if regs:
+            sys.exit(1)
+        print(f"[ok] baseline 대비 {args.tolerance:.0%} 이상 느려진 항목 없음")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
 import argparse
 import json
+import os
 import sys
+from contextlib import contextmanager
 from typing import List
 from core.storage import (
-    new_prompt_id, save_new_version, latest_by_id, list_prompts, find_ids_by_title, all_versions, append_record
+    new_prompt_id, save_new_version, latest_by_id, find_ids_by_title, append_record,
+    get_version, append_records, evals_for, save_new_prompts, list_summaries,
 )
-from prompts.define import make_draft
-from prompts.edit import apply_edits, with_line_numbers
-from prompts.eval import run_llm_eval, extract_goal_from_content
+from prompts.edit import apply_edits, with_line_numbers, PatchError
+# LLM 관련 모듈(core.llm → openai)은 define/eval 계열 명령 안에서만 불러온다 (list/show 등 시작 속도)
 
 def _resolve_prompt_id(title: str = None, prompt_id: str = None) -> str:
     if prompt_id:
@@ -24,13 +26,106 @@ def _resolve_prompt_id(title: str = None, prompt_id: str = None) -> str:
     print("[!] --title 또는 --id 를 제공하세요.")
     sys.exit(1)
 
+def _print_delta(text: str) -> None:
+    print(text, end="", flush=True)
+
 def cmd_define(args):
+    from core.llm import log_context
+    from prompts.define import make_draft
+    if args.from_file:
+        return cmd_define_batch(args)
+    if not args.title or not args.goal:
+        print("[!] --title 과 --goal 을 제공하세요 (또는 --from-file).")
+        sys.exit(1)
     pid = new_prompt_id()
-    draft = make_draft(args.goal)
+    with log_context(kind="define", prompt_id=pid):
+        if args.stream:
+            draft = make_draft(args.goal, model=args.model, on_delta=_print_delta)
+            print()
+        else:
+            draft = make_draft(args.goal, model=args.model)
     rec = save_new_version(pid, args.title, draft, meta={"kind":"define","goal":args.goal})
     print(f"[+] created: {rec['prompt_id']} v{rec['version']}")
     print(with_line_numbers(rec["content"]))
 
+def _define_batch_id(title: str, goal: str) -> str:
+    # 같은 (title, goal) → 같은 prompt_id: 중단 후 다시 실행하면 이미 저장된 줄은 건너뜀
+    import uuid
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "sparkling:define:" + json.dumps([title, goal], ensure_ascii=False)))
+
+def cmd_define_batch(args):
+    from core.batch import BatchInterrupted, RateLimiter, run_batch
+    from core.llm import log_context
+    from prompts.define import make_draft
+
+    items, failed, skipped, seen = [], [], 0, set()
+    with open(args.from_file, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                spec = json.loads(line)
+                title, goal = spec["title"].strip(), spec["goal"].strip()
+                if not title or not goal:
+                    raise ValueError("title/goal 이 비어 있음")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                failed.append((n, str(e)))
+                continue
+            pid = _define_batch_id(title, goal)
+            if pid in seen or latest_by_id(pid):
+                skipped += 1
+                continue
+            seen.add(pid)
+            items.append({"line": n, "pid": pid, "title": title, "goal": goal})
+
+    def job(item):
+        with log_context(kind="define", prompt_id=item["pid"], batch=True):
+            return make_draft(item["goal"], model=args.model)
+
+    from core.llm import output_limit
+    from prompts.define import MAX_TOKENS
+    out_tokens = output_limit("define", MAX_TOKENS)  # chat() 이 실제로 요청할 출력 한도
+
+    def cost(item):
+        # 대략: 지시문 + 목표 (4자 ≈ 1토큰) + 출력 상한
+        return (len(item["goal"]) + 3000) // 4 + out_tokens
+
+    pending, ok = [], 0
+    def flush():
+        save_new_prompts(pending)
+        pending.clear()
+
+    def on_done(res):
+        nonlocal ok
+        item, draft, err = res
+        if err is not None:
+            failed.append((item["line"], str(err)))
+            print(f"[fail] line {item['line']}: {item['title']} | {err}")
+            return
+        ok += 1
+        pending.append({"prompt_id": item["pid"], "title": item["title"], "content": draft,
+                        "meta": {"kind": "define", "goal": item["goal"], "batch": os.path.basename(args.from_file)}})
+        print(f"[ok] line {item['line']}: {item['pid']} {item['title']}")
+        if len(pending) >= args.flush_every:
+            flush()
+
+    print(f"[*] define: {len(items)} goals (skipped {skipped} already created), concurrency={args.concurrency}")
+    try:
+        with _quiet_console():
+            run_batch(items, job, concurrency=args.concurrency,
+                      limiter=RateLimiter(args.rpm, args.tpm), cost=cost, on_done=on_done)
+    except BatchInterrupted as e:
+        print(f"[!] 중단됨: {ok} created, {len(failed)} failed, {e.pending} not run (다시 실행하면 이어서)")
+        sys.exit(130)
+    finally:
+        flush()  # 중단(Ctrl-C)돼도 끝난 초안은 기록 → 다시 실행하면 이어서
+
+    print(f"[+] done: {ok} created, {len(failed)} failed, {skipped} skipped")
+    for n, msg in sorted(failed):
+        print(f"  - line {n}: {msg}")
+    if failed:
+        sys.exit(1)
+
 def _parse_edit_flags(args) -> List[dict]:
     edits = []
     for s in (args.set or []):
@@ -52,12 +147,20 @@ def cmd_edit(args):
     edits = _parse_edit_flags(args)
     if args.patch_json:
         edits.extend(json.loads(args.patch_json))
-    new_content = apply_edits(latest["content"], edits)
+    try:
+        new_content = apply_edits(latest["content"], edits)
+    except PatchError as e:
+        print("[!] 수정 적용 실패 (저장하지 않음):")
+        for msg in e.problems:
+            print(f"    - {msg}")
+        sys.exit(1)
     rec = save_new_version(pid, latest["title"], new_content, meta={"kind":"edit","edits":edits})
     print(f"[+] saved: {rec['prompt_id']} v{rec['version']}")
     print(with_line_numbers(rec["content"]))
 
 def cmd_eval(args):
+    from core.llm import log_context
+    from prompts.eval import run_llm_eval
     pid = _resolve_prompt_id(args.title, args.id)
     latest = latest_by_id(pid)
     if not latest:
@@ -65,47 +168,213 @@ def cmd_eval(args):
         sys.exit(1)
 
     prompt_text = latest["content"]
-    desired = args.desired or (latest.get("meta") or {}).get("goal")
     undesired = args.undesired
+    # desired: --desired → meta.goal → (run_llm_eval 이) 현재 본문의 "# 목표" 섹션
+    # 직전 평가의 desired 는 증분 평가 여부 판단에만 씀 (다르면 전체 평가)
+    desired = args.desired or (latest.get("meta") or {}).get("goal")
+    previous = None if args.full else _previous_eval(pid, latest, undesired)
 
+    if args.stream and args.samples > 1:
+        print("[!] --stream 은 --samples 와 함께 쓸 수 없음.")
+        sys.exit(1)
+    if args.stream:
+        print("# === LLM Feedback ===")
     try:
-        result = run_llm_eval(
-            prompt_text=prompt_text,
-            desired=desired,
-            undesired=undesired,
-            model=args.model,
-            temperature=args.temperature,
-        )
+        with log_context(kind="eval", prompt_id=pid):
+            result = run_llm_eval(
+                prompt_text=prompt_text,
+                desired=desired,
+                undesired=undesired,
+                model=args.model,
+                temperature=args.temperature,
+                on_delta=_print_delta if args.stream else None,
+                previous=previous,
+                samples=args.samples,
+            )
     except Exception as e:
         print(f"[!] LLM 평가 실패: {e}")
         sys.exit(1)
+    if result["mode"] == "incremental" and not args.stream:
+        print(f"[incremental] v{result['base_version']} 평가 이후 변경분만 전송")
+    for err in result.get("samples_failed") or []:
+        print(f"[fail] 샘플 실패: {err}")
 
-    # 출력
-    print("# === Meta Prompt Sent ===")
-    print(result["meta_prompt"])
-    print("\n# === LLM Feedback ===")
-    print(result["llm_output"])
+    # 출력 (스트리밍이면 피드백은 이미 출력됨 → 메타 프롬프트만 뒤에)
+    if args.stream:
+        print("\n\n# === Meta Prompt Sent ===")
+        print(result["meta_prompt"])
+    else:
+        print("# === Meta Prompt Sent ===")
+        print(result["meta_prompt"])
+        print("\n# === LLM Feedback ===")
+        print(result["llm_output"])
 
     # 기록
-    append_record({
+    append_record(_eval_record(pid, latest, result, undesired, args.model, args.temperature))
+
+def _previous_eval(pid: str, latest: dict, undesired: str):
+    """
+    같은 undesired 로 한 가장 최근 전체(full) 평가 + 그때의 본문 (증분 평가의 기준). 없으면 None.
+    증분 평가를 기준으로 삼지 않음 → 바뀐 줄 비율이 마지막 전체 평가 대비로 재져 diff 만 보는 평가가 이어지지 않음
+    """
+    for rec in reversed(evals_for(pid)):
+        v = rec.get("source_version")
+        if not v or v >= latest["version"] or (rec.get("undesired") or "").strip() != undesired.strip():
+            continue
+        if rec.get("eval_mode") == "incremental":
+            continue
+        source = get_version(pid, v)
+        if not source or not rec.get("llm_output"):
+            return None
+        return {"version": v, "content": source["content"], "llm_output": rec["llm_output"],
+                "desired": rec.get("desired"), "undesired": rec.get("undesired")}
+    return None
+
+def _eval_record(pid: str, target: dict, result: dict, undesired: str, model, temperature) -> dict:
+    rec = {
         "record_type": "eval",
         "prompt_id": pid,
-        "source_version": latest["version"],
-        "title": latest["title"],
+        "source_version": target["version"],
+        "title": target["title"],
         "desired": result["desired_used"],
         "undesired": undesired,
-        "llm_model": args.model or "env:OPENAI_MODEL",
-        "llm_temperature": args.temperature,
+        "llm_model": model or "env:OPENAI_MODEL",
+        "llm_temperature": temperature,
         "meta_prompt": result["meta_prompt"],
         "llm_output": result["llm_output"],
-    })
+    }
+    if result.get("mode") == "incremental":
+        rec["eval_mode"], rec["base_version"] = "incremental", result["base_version"]
+    if result.get("samples"):
+        rec["samples"] = result["samples"]
+        rec["suggestions"] = [{"text": c["text"], "support": c["support"], "samples": c["samples"]}
+                              for c in result["suggestions"]]
+    return rec
+
+@contextmanager
+def _quiet_console():
+    """배치 실행 동안 LLM 콘솔 로그를 끔 (동시 호출 로그가 뒤섞이지 않도록). 끝나면 원래 값으로."""
+    prev = os.environ.get("LLM_LOG_CONSOLE")
+    os.environ["LLM_LOG_CONSOLE"] = "0"
+    try:
+        yield
+    finally:
+        if prev is None:
+            os.environ.pop("LLM_LOG_CONSOLE", None)
+        else:
+            os.environ["LLM_LOG_CONSOLE"] = prev
+
+def _batch_key(pid: str, version: int, desired, undesired: str) -> str:
+    import hashlib
+    blob = json.dumps([pid, version, desired, undesired], ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+def _batch_eval_item(line_no: int, spec: dict) -> dict:
+    """manifest 한 줄 → 평가 대상. 문제가 있으면 ValueError."""
+    pid = spec.get("id")
+    if not pid:
+        ids = find_ids_by_title(spec.get("title") or "")
+        if len(ids) != 1:
+            raise ValueError(f"제목 '{spec.get('title')}' 에 해당하는 프롬프트가 {len(ids)}개")
+        pid = ids[0]
+    target = get_version(pid, int(spec["version"])) if spec.get("version") else latest_by_id(pid)
+    if not target:
+        raise ValueError(f"프롬프트/버전을 찾을 수 없음: {pid} v{spec.get('version') or 'latest'}")
+    if not spec.get("undesired"):
+        raise ValueError("undesired 가 비어 있음")
+    desired = spec.get("desired") or (target.get("meta") or {}).get("goal")
+    return {
+        "line": line_no,
+        "pid": pid,
+        "target": target,
+        "desired": desired,
+        "undesired": spec["undesired"],
+        "model": spec.get("model"),
+        "key": _batch_key(pid, target["version"], desired, spec["undesired"]),
+    }
+
+def cmd_eval_batch(args):
+    from core.batch import BatchInterrupted, RateLimiter, run_batch
+    from core.llm import log_context
+    from prompts.eval import run_llm_eval
+
+    items, failed, skipped = [], [], 0
+    done_keys = {}
+    with open(args.manifest, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = _batch_eval_item(n, json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                failed.append((n, str(e)))
+                continue
+            if item["pid"] not in done_keys:
+                done_keys[item["pid"]] = {r.get("batch_key") for r in evals_for(item["pid"])}
+            if item["key"] in done_keys[item["pid"]]:
+                skipped += 1
+                continue
+            done_keys[item["pid"]].add(item["key"])
+            items.append(item)
+
+    def job(item):
+        with log_context(kind="eval", prompt_id=item["pid"], batch=True):
+            return run_llm_eval(
+                prompt_text=item["target"]["content"],
+                desired=item["desired"],
+                undesired=item["undesired"],
+                model=args.model or item["model"],
+                temperature=args.temperature,
+            )
+
+    from core.llm import output_limit
+    from prompts.eval import MAX_TOKENS
+    out_tokens = output_limit("eval", MAX_TOKENS)
+
+    def cost(item):
+        # 대략: 입력 4자 ≈ 1토큰 + 출력 상한
+        return (len(item["target"]["content"]) + len(item["undesired"]) + 1500) // 4 + out_tokens
+
+    pending, ok = [], 0
+    def on_done(res):
+        nonlocal ok
+        item, result, err = res
+        if err is not None:
+            failed.append((item["line"], str(err)))
+            print(f"[fail] line {item['line']}: {item['pid']} v{item['target']['version']} | {err}")
+            return
+        ok += 1
+        rec = _eval_record(item["pid"], item["target"], result, item["undesired"],
+                           args.model or item["model"], args.temperature)
+        rec["batch_key"] = item["key"]
+        pending.append(rec)
+        print(f"[ok] line {item['line']}: {item['pid']} v{item['target']['version']}")
+        if len(pending) >= args.flush_every:
+            append_records(pending)
+            pending.clear()
+
+    print(f"[*] eval-batch: {len(items)} items (skipped {skipped} already done), concurrency={args.concurrency}")
+    try:
+        with _quiet_console():
+            run_batch(items, job, concurrency=args.concurrency,
+                      limiter=RateLimiter(args.rpm, args.tpm), cost=cost, on_done=on_done)
+    except BatchInterrupted as e:
+        print(f"[!] 중단됨: {ok} ok, {len(failed)} failed, {e.pending} not run (다시 실행하면 이어서)")
+        sys.exit(130)
+    finally:
+        append_records(pending)  # 중단돼도 끝난 평가는 저장
+
+    print(f"[+] done: {ok} ok, {len(failed)} failed, {skipped} skipped")
+    for n, msg in sorted(failed):
+        print(f"  - line {n}: {msg}")
+    if failed:
+        sys.exit(1)
 
 
 def cmd_show(args):
     pid = _resolve_prompt_id(args.title, args.id)
     if args.version:
-        versions = all_versions(pid)
-        target = next((v for v in versions if v["version"] == args.version), None)
+        target = get_version(pid, args.version)
     else:
         target = latest_by_id(pid)
     if not target:
@@ -114,25 +383,28 @@ def cmd_show(args):
     print(f"{target['prompt_id']} v{target['version']} | {target['title']}")
     print(with_line_numbers(target["content"]))
 
-def cmd_list(_args):
-    rows = list_prompts()
+def cmd_list(args):
+    total, rows = list_summaries(sort=args.sort, reverse=args.reverse, title_prefix=args.prefix,
+                                 limit=args.limit or None, offset=args.offset)
+    if args.json:
+        print(json.dumps({"total": total, "offset": args.offset, "items": rows}, ensure_ascii=False, indent=2))
+        return
     if not rows:
-        print("(empty)")
+        print("(empty)" if not total else f"(offset {args.offset} 이후 없음, 전체 {total})")
         return
-    seen = {}
     for r in rows:
-        k = r["prompt_id"]
-        seen[k] = max(seen.get(k, 0), r.get("version", 0))
-    for pid, ver in seen.items():
-        title = next((x["title"] for x in rows if x["prompt_id"] == pid), "")
-        print(f"- {pid}  v{ver}  | {title}")
+        evals = f"  eval {r['evals']} ({r['last_eval_at']})" if r["evals"] else ""
+        print(f"- {r['prompt_id']}  v{r['version']}  {r['updated_at'] or ''}  | {r['title']}{evals}")
+    end = args.offset + len(rows)
+    if end < total or args.offset:
+        more = f", 다음: --offset {end}" if end < total else ""
+        print(f"({args.offset + 1}-{end} / {total}{more})")
 
 def cmd_diff(args):
     import difflib
     pid = _resolve_prompt_id(args.title, args.id)
-    vlist = all_versions(pid)
-    a = next((v for v in vlist if v["version"] == args.a), None)
-    b = next((v for v in vlist if v["version"] == args.b), None)
+    a = get_version(pid, args.a)
+    b = get_version(pid, args.b)
     if not a or not b:
         print("[!] 버전 번호 확인필.")
         sys.exit(1)
@@ -145,13 +417,106 @@ def cmd_diff(args):
     )
     print("\n".join(diff))
 
+def cmd_blame(args):
+    from core.blame import blame
+    from core.storage import StorageError
+    pid = _resolve_prompt_id(args.title, args.id)
+    try:
+        target, rows = blame(pid, args.version, cache=not args.no_blame_cache)
+    except StorageError:
+        print("[!] 해당 버전을 찾을 수 없음.")
+        sys.exit(1)
+    print(f"{target['prompt_id']} v{target['version']} | {target['title']}")
+    for i, r in enumerate(rows):
+        when = (r.get("created_at") or "")[:10]
+        kind = r.get("kind") or "-"
+        if r.get("edits"):
+            kind += f"({r['edits']})"
+        print(f"v{r['version']:<4} {when:<10} {kind:<10}{i+1:>4}│ {r['line']}")
+
+def cmd_search(args):
+    from core.search import SearchIndex
+    idx = SearchIndex()
+    try:
+        idx.update()
+        hits = idx.search(args.query, limit=args.limit, record_type=args.type, per_prompt=not args.all_versions)
+    finally:
+        idx.close()
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return
+    if not hits:
+        print("(no match)")
+        return
+    for h in hits:
+        tag = "" if h["record_type"] == "prompt" else f" [{h['record_type']}]"
+        print(f"{h['score']:>8.3f}  {h['prompt_id']}  v{h['version']}{tag}  | {h['title']}")
+
+def cmd_migrate(args):
+    from pathlib import Path
+    from core.config import JSONL_PATH, SQLITE_PATH
+    from core.sqlite_store import migrate_jsonl
+    src = Path(args.src) if args.src else JSONL_PATH
+    dst = Path(args.dst) if args.dst else SQLITE_PATH
+    if not src.exists():
+        print(f"[!] 원본 파일이 없음: {src}")
+        sys.exit(1)
+    inserted, skipped = migrate_jsonl(src, dst)
+    print(f"[+] migrated: {inserted} records → {dst}" + (f" (중복 버전 {skipped}건 건너뜀)" if skipped else ""))
+    print("    사용하려면 SPARKLING_STORAGE=sqlite 로 설정")
+
+def cmd_compact(args):
+    from core.storage import get_storage, StorageError
+    try:
+        res = get_storage().compact(keep=args.keep, evals=args.evals)
+    except StorageError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    before, after = res["bytes_before"], res["bytes_after"]
+    saved = (1 - after / before) * 100 if before else 0.0
+    print(f"[+] compact: {before:,} → {after:,} bytes ({saved:.1f}% 감소)")
+    print(f"    보관한 버전 {res['archived']} | 공유 blob {res['blobs']} | 정리한 eval {res['evals_trimmed']}")
+    if res.get("segment"):
+        print(f"    보관 세그먼트: {res['segment']}")
+
+def cmd_stats(args):
+    from core.config import LLM_LOG_PATH, MODEL_PRICES
+    from core.stats import aggregate, format_report, iter_log_events, parse_since
+    try:
+        since = parse_since(args.since) if args.since else None
+        until = parse_since(args.until) if args.until else None
+    except ValueError:
+        print("[!] --since/--until 형식: 7d, 24h, 30m 또는 ISO 시각")
+        sys.exit(1)
+    by = [d.strip() for d in args.by.split(",")] if args.by else None
+    report = aggregate(iter_log_events(LLM_LOG_PATH), since=since, until=until,
+                       prices=MODEL_PRICES, **({"by": by} if by else {}))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+
 def build_parser():
     p = argparse.ArgumentParser(prog="sparkling", description="Minimal prompting notebook CLI")
+    g_cache = p.add_mutually_exclusive_group()
+    g_cache.add_argument("--cache", dest="llm_cache", action="store_const", const="on",
+                         help="LLM 응답 캐시 사용 (SPARKLING_LLM_CACHE=on)")
+    g_cache.add_argument("--no-cache", dest="llm_cache", action="store_const", const="off",
+                         help="캐시 우회")
+    g_cache.add_argument("--refresh-cache", dest="llm_cache", action="store_const", const="refresh",
+                         help="캐시를 조회하지 않고 새 응답으로 갱신")
     sub = p.add_subparsers()
 
     p_def = sub.add_parser("define", help="목표로 초안 생성")
-    p_def.add_argument("--title", required=True)
-    p_def.add_argument("--goal", required=True)
+    p_def.add_argument("--title")
+    p_def.add_argument("--goal")
+    p_def.add_argument("--stream", action="store_true", help="생성되는 대로 출력")
+    p_def.add_argument("--from-file", help='목표 목록 JSONL: 한 줄에 {"title": ..., "goal": ...} (동시 생성)')
+    p_def.add_argument("--concurrency", type=int, default=4, help="--from-file: 동시 호출 수")
+    p_def.add_argument("--rpm", type=float, help="--from-file: 분당 요청 수 상한")
+    p_def.add_argument("--tpm", type=float, help="--from-file: 분당 토큰 수 상한(추정치 기준)")
+    p_def.add_argument("--model", help="LLM 모델명(기본: gpt-5)")
+    p_def.add_argument("--flush-every", type=int, default=20, help="--from-file: 완료 N건마다 기록")
     p_def.set_defaults(func=cmd_define)
 
     p_edit = sub.add_parser("edit", help="라인 기반 편집")
@@ -170,8 +535,22 @@ def build_parser():
     p_eval.add_argument("--desired", help="원하는 동작(미지정 시 '# 목표'에서 추출)")
     p_eval.add_argument("--model", help="LLM 모델명(기본: OPENAI_MODEL 환경변수)")
     p_eval.add_argument("--temperature", type=float)
+    p_eval.add_argument("--stream", action="store_true", help="피드백을 생성되는 대로 출력")
+    p_eval.add_argument("--full", action="store_true", help="직전 평가와 상관없이 전체 프롬프트로 평가")
+    p_eval.add_argument("--samples", type=int, default=1, help="동시에 N번 평가해 반복되는 제안 순으로 정리")
     p_eval.set_defaults(func=cmd_eval)
 
+    p_eb = sub.add_parser("eval-batch", help="manifest(JSONL)의 여러 프롬프트/버전을 동시에 평가")
+    p_eb.add_argument("--manifest", required=True,
+                      help='한 줄에 {"id"|"title", "version"?, "desired"?, "undesired", "model"?}')
+    p_eb.add_argument("--concurrency", type=int, default=4)
+    p_eb.add_argument("--rpm", type=float, help="분당 요청 수 상한")
+    p_eb.add_argument("--tpm", type=float, help="분당 토큰 수 상한(추정치 기준)")
+    p_eb.add_argument("--model", help="모든 항목에 적용할 모델(기본: 항목의 model 또는 OPENAI_MODEL)")
+    p_eb.add_argument("--temperature", type=float)
+    p_eb.add_argument("--flush-every", type=int, default=20, help="완료 N건마다 기록")
+    p_eb.set_defaults(func=cmd_eval_batch)
+
     p_show = sub.add_parser("show", help="내용 보기(라인 번호 포함)")
     p_show.add_argument("--title")
     p_show.add_argument("--id")
@@ -179,6 +558,13 @@ def build_parser():
     p_show.set_defaults(func=cmd_show)
 
     p_list = sub.add_parser("list", help="프롬프트 목록(최신 버전 요약)")
+    p_list.add_argument("--limit", type=int, default=50, help="한 페이지 개수 (0 = 전부)")
+    p_list.add_argument("--offset", type=int, default=0)
+    p_list.add_argument("--sort", choices=["updated", "eval", "version", "title"], default="updated",
+                        help="정렬 기준 (title 만 오름차순, 나머지는 최근/큰 값 먼저)")
+    p_list.add_argument("--reverse", action="store_true", help="정렬 순서 뒤집기")
+    p_list.add_argument("--prefix", help="제목 접두어로 거르기")
+    p_list.add_argument("--json", action="store_true", help="JSON 으로 출력")
     p_list.set_defaults(func=cmd_list)
 
     p_diff = sub.add_parser("diff", help="두 버전 비교")
@@ -188,15 +574,116 @@ def build_parser():
     p_diff.add_argument("--b", type=int, required=True, help="to 버전")
     p_diff.set_defaults(func=cmd_diff)
 
+    p_blame = sub.add_parser("blame", help="라인별로 마지막으로 바꾼 버전 표시")
+    p_blame.add_argument("--title")
+    p_blame.add_argument("--id")
+    p_blame.add_argument("--version", type=int, help="대상 버전 (기본: 최신)")
+    p_blame.add_argument("--no-blame-cache", action="store_true",
+                         help="blame 캐시를 쓰지 않고 처음부터 계산 (LLM 응답 캐시는 전역 --no-cache)")
+    p_blame.set_defaults(func=cmd_blame)
+
+    p_search = sub.add_parser("search", help="프롬프트/목표/평가 피드백 전문 검색 (BM25)")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--type", choices=["prompt", "eval"], help="레코드 종류로 거르기")
+    p_search.add_argument("--all-versions", action="store_true", help="프롬프트당 최고점 하나가 아니라 모든 버전/평가 표시")
+    p_search.add_argument("--json", action="store_true", help="JSON 출력")
+    p_search.set_defaults(func=cmd_search)
+
+    p_stats = sub.add_parser("stats", help="LLM 호출 지연/토큰/비용 집계")
+    p_stats.add_argument("--since", default="7d", help="7d, 24h, 30m 또는 ISO 시각 (기본 7d)")
+    p_stats.add_argument("--until", help="끝 시각 (기본: 현재)")
+    p_stats.add_argument("--by", help="model,kind,prompt 중 선택 (쉼표 구분, 기본 전부)")
+    p_stats.add_argument("--json", action="store_true", help="JSON 출력")
+    p_stats.set_defaults(func=cmd_stats)
+
+    p_cmp = sub.add_parser("compact", help="저장소 재작성: 중복 제거/오래된 버전 보관/eval 필드 정리")
+    p_cmp.add_argument("--keep", type=int, default=0, help="프롬프트마다 로그에 남길 최근 버전 수 (0 = 보관 안 함)")
+    p_cmp.add_argument("--evals", choices=["keep", "drop", "archive"], default="keep",
+                       help="eval 의 meta_prompt: 그대로 | 삭제 | 보관 세그먼트로")
+    p_cmp.set_defaults(func=cmd_compact)
+
+    p_mig = sub.add_parser("migrate", help="prompts.jsonl → SQLite 저장소로 이전")
+    p_mig.add_argument("--src", help="원본 JSONL (기본: data/prompts.jsonl)")
+    p_mig.add_argument("--dst", help="대상 SQLite 파일 (기본: SPARKLING_SQLITE_PATH 또는 data/prompts.db)")
+    p_mig.set_defaults(func=cmd_migrate)
+
+    p_shell = sub.add_parser("shell", help="대화형 모드 (인덱스/LLM 클라이언트 상주)")
+    p_shell.set_defaults(func=cmd_shell)
+
+    p_daemon = sub.add_parser("daemon", help="Unix 소켓 데몬 — 떠 있으면 CLI 명령이 여기로 전달됨")
+    p_daemon.add_argument("--stop", action="store_true", help="실행 중인 데몬 종료")
+    p_daemon.set_defaults(func=cmd_daemon)
+
     return p
 
-def main():
-    p = build_parser()
-    args = p.parse_args()
-    if not hasattr(args, "func"):
-        p.print_help()
+def _warm_up():
+    """상주 모드 준비: 저장소 인덱스를 메모리에 올리고 LLM 클라이언트는 뒤에서 미리 만든다."""
+    import threading
+    from core.storage import get_storage
+    store = get_storage()
+    if getattr(store, "index", None) is not None:
+        store.index.refresh()
+
+    def client():
+        from core import llm
+        try:
+            llm._get_client()
+        except Exception:
+            pass  # 키가 없으면 실제 호출 때 오류를 보여줌
+    threading.Thread(target=client, daemon=True).start()
+
+def cmd_shell(_args):
+    from core.daemon import repl
+    _warm_up()
+    print("sparkling shell — 명령은 CLI 와 같음 (예: show --id X), 종료: exit / Ctrl-D")
+    repl(run)
+
+def cmd_daemon(args):
+    from core.daemon import serve, stop
+    if args.stop:
+        print("[+] 데몬 종료" if stop() else "[!] 실행 중인 데몬 없음")
         return
-    args.func(args)
+    _warm_up()
+    try:
+        serve(run, on_ready=lambda path: print(f"[+] listening: {path} (종료: sparkling daemon --stop)", flush=True))
+    except RuntimeError as e:
+        print(f"[!] {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+def run(argv: List[str]) -> int:
+    """명령 하나 실행 → 종료 코드. shell/daemon 에서도 같은 경로로 실행."""
+    p = build_parser()
+    # 명령이 바꾸는 환경변수 (--llm-cache, 배치 명령의 LLM_LOG_CONSOLE) → 끝나면 되돌림 (shell/daemon 에서 다음 명령에 새지 않게)
+    saved = {k: os.environ.get(k) for k in ("SPARKLING_LLM_CACHE", "LLM_LOG_CONSOLE")}
+    try:
+        args = p.parse_args(argv)
+        if not hasattr(args, "func"):
+            p.print_help()
+            return 0
+        if args.llm_cache:
+            os.environ["SPARKLING_LLM_CACHE"] = args.llm_cache
+        args.func(args)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return 0
+
+def main():
+    argv = sys.argv[1:]
+    if argv and argv[0] not in ("shell", "daemon"):
+        from core.daemon import forward
+        code = forward(argv)  # 데몬이 떠 있으면 거기서 실행
+        if code is not None:
+            sys.exit(code)
+    sys.exit(run(argv))
 
 if __name__ == "__main__":
     main()
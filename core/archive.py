@@ -0,0 +1,125 @@
+import os
+import json
+import gzip
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+
+"""
+보관(archive) 세그먼트 — compact 가 오래된 버전/큰 평가 필드를 옮겨 두는 곳
+- <log>.archive.<UTC시각>.gz       : JSONL (프롬프트 버전은 content 포함·델타 없음, 평가 필드는 blob 레코드)
+- <log>.archive.<UTC시각>.gz.json  : {"prompts": {prompt_id: [version...]}, "blobs": [hash...]}
+  세그먼트를 열지 않고도 어느 세그먼트에 무엇이 있는지 알 수 있게 하는 목록
+"""
+
+def archive_segments(log_path: Path) -> List[Path]:
+    return sorted(log_path.parent.glob(log_path.name + ".archive.*.gz"))
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class Archive:
+    def __init__(self, log_path: Path):
+        self.log_path = Path(log_path)
+        self._segments: Tuple[Path, ...] = ()
+        self.prompts: Dict[str, Dict[int, Path]] = {}
+        self.blob_segments: Dict[str, Path] = {}
+        self._blobs: Dict[str, str] = {}
+
+    def refresh(self) -> "Archive":
+        segs = tuple(archive_segments(self.log_path))
+        if segs == self._segments:
+            return self
+        self._segments, self.prompts, self.blob_segments, self._blobs = segs, {}, {}, {}
+        for seg in segs:
+            try:
+                listing = json.loads(Path(str(seg) + ".json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                listing = self._listing(self._iter_segment(seg))
+            for pid, versions in listing.get("prompts", {}).items():
+                for v in versions:
+                    self.prompts.setdefault(pid, {})[int(v)] = seg
+            for h in listing.get("blobs", []):
+                self.blob_segments[h] = seg
+        return self
+
+    @staticmethod
+    def _listing(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        prompts: Dict[str, List[int]] = {}
+        blobs: List[str] = []
+        for r in records:
+            if r.get("record_type") == "blob":
+                blobs.append(r["hash"])
+            else:
+                prompts.setdefault(r["prompt_id"], []).append(r["version"])
+        return {"prompts": prompts, "blobs": blobs}
+
+    @staticmethod
+    def _iter_segment(seg: Path) -> Iterator[Dict[str, Any]]:
+        with gzip.open(seg, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    # ---------- 조회 ----------
+    def versions(self, prompt_id: str) -> Dict[int, Path]:
+        return self.refresh().prompts.get(prompt_id, {})
+
+    def read_versions(self, prompt_id: str, versions: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        where = self.versions(prompt_id)
+        wanted = set(where) if versions is None else {v for v in versions if v in where}
+        out = []
+        for seg in sorted({where[v] for v in wanted}):
+            out.extend(r for r in self._iter_segment(seg)
+                       if r.get("prompt_id") == prompt_id and r.get("version") in wanted)
+        return sorted(out, key=lambda r: r["version"])
+
+    def blob(self, h: str) -> Optional[str]:
+        if h not in self._blobs:
+            seg = self.refresh().blob_segments.get(h)
+            if seg is None:
+                return None
+            for r in self._iter_segment(seg):  # 세그먼트 하나를 열면 그 안의 blob 은 모두 기억
+                if r.get("record_type") == "blob":
+                    self._blobs[r["hash"]] = r["content"]
+        return self._blobs.get(h)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """보관된 프롬프트 버전 (오래된 세그먼트부터). blob 레코드는 제외."""
+        for seg in self.refresh()._segments:
+            for r in self._iter_segment(seg):
+                if r.get("record_type") != "blob":
+                    yield r
+
+    # ---------- 쓰기 ----------
+    def write(self, records: List[Dict[str, Any]]) -> Path:
+        """새 세그먼트 + 목록 파일을 임시 파일 → fsync → rename 으로 기록."""
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        seg = self.log_path.with_name(f"{self.log_path.name}.archive.{stamp}.gz")
+        for path, write in (
+            (Path(str(seg) + ".json"), lambda f: f.write(json.dumps(self._listing(records)).encode("utf-8"))),
+            (seg, lambda f: self._write_gz(f, records)),
+        ):
+            tmp = path.with_name(path.name + ".tmp")
+            with tmp.open("wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        _fsync_dir(seg.parent)
+        return seg
+
+    @staticmethod
+    def _write_gz(f, records: List[Dict[str, Any]]) -> None:
+        with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+            for r in records:
+                gz.write((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8"))
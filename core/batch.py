@@ -0,0 +1,122 @@
+import time
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+"""
+배치 실행 엔진
+- RateLimiter: 분당 요청 수(rpm) / 분당 토큰 수(tpm) 토큰 버킷
+- run_batch: 스레드 풀로 fn(item) 을 동시 실행, 실패해도 나머지는 계속 (Ctrl-C: 남은 작업은 취소, 실행 중이던 결과는 넘기고 BatchInterrupted)
+"""
+
+class RateLimiter:
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.rpm = rpm or None
+        self.tpm = tpm or None
+        self._req = float(self.rpm or 0)
+        self._tok = float(self.tpm or 0)
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        dt, self._t = now - self._t, now
+        if self.rpm:
+            self._req = min(self.rpm, self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(self.tpm, self._tok + dt * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """요청 1건 + tokens 만큼의 여유가 생길 때까지 대기."""
+        if not self.rpm and not self.tpm:
+            return
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        while True:
+            with self._lock:
+                self._refill()
+                need_req = 1 - self._req if self.rpm else 0
+                need_tok = tokens - self._tok if self.tpm else 0
+                if need_req <= 0 and need_tok <= 0:
+                    if self.rpm:
+                        self._req -= 1
+                    if self.tpm:
+                        self._tok -= tokens
+                    return
+                wait = max(need_req * 60.0 / self.rpm if self.rpm and need_req > 0 else 0,
+                           need_tok * 60.0 / self.tpm if self.tpm and need_tok > 0 else 0)
+            time.sleep(min(wait, 5.0))
+
+BatchResult = Tuple[Any, Any, Optional[BaseException]]  # (item, 결과, 예외)
+
+class BatchInterrupted(KeyboardInterrupt):
+    """Ctrl-C 로 중단된 run_batch. results = 그때까지 끝난 결과, pending = 실행하지 않은 item 수."""
+    def __init__(self, results: List[BatchResult], pending: int):
+        super().__init__(f"중단됨: {len(results)}개 완료, {pending}개 실행 안 함")
+        self.results = results
+        self.pending = pending
+
+def run_batch(
+    items: Iterable[Any],
+    fn: Callable[[Any], Any],
+    *,
+    concurrency: int = 4,
+    limiter: Optional[RateLimiter] = None,
+    cost: Optional[Callable[[Any], int]] = None,
+    on_done: Optional[Callable[[BatchResult], None]] = None,
+) -> List[BatchResult]:
+    """
+    items 각각에 fn 을 최대 concurrency 개 동시에 실행.
+    limiter 가 있으면 호출 전에 acquire(cost(item)).
+    on_done 은 완료되는 순서대로 (메인 스레드에서) 호출된다.
+    Ctrl-C: 대기 중인 작업은 취소, 이미 실행 중인 호출은 끝나길 기다려 on_done 으로 넘긴 뒤
+    BatchInterrupted (한 번 더 Ctrl-C 면 기다리지 않음).
+    """
+    stop = threading.Event()
+
+    def job(item):
+        if limiter:
+            limiter.acquire(cost(item) if cost else 0)
+        if stop.is_set():
+            raise CancelledError()  # 한도 대기 중에 중단됨 → 호출하지 않음
+        return fn(item)
+
+    results: List[BatchResult] = []
+    handled = set()
+
+    def deliver(fut) -> None:
+        handled.add(fut)
+        item = futures[fut]
+        try:
+            res: BatchResult = (item, fut.result(), None)
+        except CancelledError:
+            return
+        except Exception as e:
+            res = (item, None, e)
+        results.append(res)
+        if on_done:
+            on_done(res)
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    futures = {}
+    try:
+        for it in items:
+            futures[pool.submit(job, it)] = it
+        for fut in as_completed(futures):
+            deliver(fut)
+    except KeyboardInterrupt:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            # 실행 중이던 호출은 이미 비용이 듦 → 결과를 버리지 않음
+            for fut in as_completed([f for f in futures if f not in handled and not f.cancelled()]):
+                if fut not in handled:
+                    deliver(fut)
+        except KeyboardInterrupt:
+            pass
+        raise BatchInterrupted(results, len(futures) - len(results)) from None
+    except BaseException:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return results
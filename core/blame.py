@@ -0,0 +1,112 @@
+import os
+import json
+import hashlib
+import difflib
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from . import config
+from . import storage
+
+"""
+라인 단위 blame (sparkling blame)
+- 각 라인을 마지막으로 바꾼 버전을 버전 체인을 따라 한 단계씩 계산
+  · meta.kind == "edit" 이고 meta.edits 를 부모에 적용한 결과가 실제 내용과 같으면 패치 매핑(prompts/patch.apply_mapped)
+  · 아니면 라인 해시 시퀀스끼리 difflib 비교 (같은 블록은 이전 귀속 유지, 나머지는 새 버전)
+- 결과는 data/cache/blame/<prompt_id>/<version>.json 에 저장 → 다음 blame 은 가장 가까운 캐시부터 이어서 계산
+  (내용 sha1 을 함께 저장해 compact 등으로 내용이 달라졌으면 무시)
+"""
+
+CHECKPOINT_EVERY = 10
+
+def _sha(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def _cache_path(prompt_id: str, version: int) -> Path:
+    return config.BLAME_CACHE_DIR / prompt_id / f"{version}.json"
+
+def _load(prompt_id: str, version: int, content: str) -> Optional[Dict[str, Any]]:
+    try:
+        entry = json.loads(_cache_path(prompt_id, version).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return entry if entry.get("sha") == _sha(content) else None
+
+def _save(prompt_id: str, version: int, content: str, owners: List[int], info: Dict[str, Any]) -> None:
+    p = _cache_path(prompt_id, version)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    used = {str(v): info[str(v)] for v in set(owners)}
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"sha": _sha(content), "owners": owners, "info": used}, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, p)
+
+def _info(rec: Dict[str, Any]) -> Dict[str, Any]:
+    meta = rec.get("meta") or {}
+    return {"kind": meta.get("kind"), "created_at": rec.get("created_at"), "edits": len(meta.get("edits") or [])}
+
+def _step(prev_lines: List[str], prev_owners: List[int], rec: Dict[str, Any]) -> List[int]:
+    """부모(prev) 귀속 → rec 버전의 라인별 귀속."""
+    from prompts.patch import apply_mapped, PatchError
+    lines, v = rec["content"].splitlines(), rec["version"]
+    edits = (rec.get("meta") or {}).get("edits")
+    if edits is not None and (rec.get("meta") or {}).get("kind") == "edit":
+        try:
+            mapped = apply_mapped(prev_lines, edits)
+        except PatchError:
+            mapped = None
+        if mapped is not None and [t for t, _ in mapped] == lines:
+            return [v if i is None else prev_owners[i] for _, i in mapped]
+    # 라인 해시 diff
+    a = [hash(t) for t in prev_lines]
+    b = [hash(t) for t in lines]
+    owners = [v] * len(lines)
+    for i, j, n in difflib.SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks():
+        owners[j:j + n] = prev_owners[i:i + n]
+    return owners
+
+def blame(prompt_id: str, version: Optional[int] = None, *, cache: bool = True) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    (대상 버전 레코드, [{"line", "version", "kind", "created_at", "edits"}...]).
+    version 생략 시 최신 버전. 없으면 StorageError.
+    """
+    target = storage.latest_by_id(prompt_id) if version is None else storage.get_version(prompt_id, version)
+    if not target:
+        raise storage.StorageError(f"버전 없음: {prompt_id} v{version if version is not None else '(latest)'}")
+    n = target["version"]
+    hit = _load(prompt_id, n, target["content"]) if cache else None
+    if hit:
+        return target, _annotate(target["content"], hit["owners"], hit["info"])
+
+    # 가장 가까운 이전 캐시(또는 첫 버전)부터 이어서 계산
+    start, owners, info, prev = None, [], {}, None
+    chain = {n: target}
+    for v in range(n - 1, 0, -1):
+        rec = storage.get_version(prompt_id, v)
+        if rec is None:
+            continue
+        chain[v] = rec
+        entry = _load(prompt_id, v, rec["content"]) if cache else None
+        if entry:
+            start, owners, info, prev = v, entry["owners"], dict(entry["info"]), rec
+            break
+        start, prev = v, rec  # 캐시가 없으면 결국 가장 오래된 버전에서 시작
+    if prev is None:
+        prev = target
+    if not owners:
+        owners = [prev["version"]] * len(prev["content"].splitlines())
+        info[str(prev["version"])] = _info(prev)
+
+    for v in range((start or n) + 1, n + 1):
+        rec = chain.get(v)
+        if rec is None:
+            continue
+        owners = _step(prev["content"].splitlines(), owners, rec)
+        info[str(v)] = _info(rec)
+        prev = rec
+        if cache and v < n and v % CHECKPOINT_EVERY == 0:  # 중간 버전도 가끔 저장 → 이전 버전 blame 도 빠르게
+            _save(prompt_id, v, rec["content"], owners, info)
+    if cache:
+        _save(prompt_id, n, target["content"], owners, info)
+    return target, _annotate(target["content"], owners, info)
+
+def _annotate(content: str, owners: List[int], info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"line": t, "version": v, **info.get(str(v), {})} for t, v in zip(content.splitlines(), owners)]
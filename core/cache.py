@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+"""
+LLM 응답 캐시 (내용 주소 기반, 디스크)
+- 키: 정규화한 요청 kwargs(JSON, 키 정렬)의 sha256 → <root>/<앞 2자>/<키>.json
+- LRU: 적중 시 파일 mtime 을 갱신, 용량(max_bytes) 초과 시 mtime 오래된 순으로 삭제
+- TTL: 저장 시각(ts) 기준, 0/None 이면 만료 없음
+- stats.json: 누적 hits/misses 와 대략적인 총 용량 (읽고-고쳐-쓰기는 잠금 안에서, 임시 파일은 프로세스별)
+"""
+
+_stats_lock = threading.Lock()  # 같은 프로세스의 모든 ResponseCache 가 공유
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    blob = json.dumps(kwargs, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, root: Path, max_bytes: int = 200 * 1024 * 1024, ttl: Optional[float] = None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.stats_path = self.root / "stats.json"
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    # ---------- 통계 ----------
+    def stats(self) -> Dict[str, int]:
+        try:
+            return json.loads(self.stats_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"hits": 0, "misses": 0, "bytes": 0}
+
+    def _write_stats(self, st: Dict[str, int]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.stats_path.with_name(f"stats.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(st), encoding="utf-8")
+        os.replace(tmp, self.stats_path)
+
+    def _bump(self, **delta: int) -> Dict[str, int]:
+        with _stats_lock:
+            st = self.stats()
+            for k, v in delta.items():
+                st[k] = st.get(k, 0) + v
+            self._write_stats(st)
+        return st
+
+    # ---------- 조회/저장 ----------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        p = self._path(key)
+        try:
+            entry = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self.ttl and time.time() - entry.get("ts", 0) > self.ttl:
+            p.unlink(missing_ok=True)
+            return None
+        os.utime(p)  # LRU 갱신
+        return entry
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"ts": time.time(), **value}, ensure_ascii=False)
+        tmp = p.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, p)
+        st = self._bump(bytes=len(data.encode("utf-8")))
+        if st["bytes"] > self.max_bytes:
+            self.evict()
+
+    def record(self, hit: bool) -> Dict[str, int]:
+        return self._bump(hits=1) if hit else self._bump(misses=1)
+
+    def evict(self) -> int:
+        """용량의 90% 이하가 될 때까지 오래된 항목 삭제. 삭제 개수 반환."""
+        files = []
+        for sub in self.root.iterdir():
+            if sub.is_dir():
+                for p in sub.glob("*.json"):
+                    st = p.stat()
+                    files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, p in sorted(files, key=lambda x: x[0]):
+            if total <= self.max_bytes * 0.9:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        with _stats_lock:
+            st = self.stats()
+            st["bytes"] = total
+            self._write_stats(st)
+        return removed
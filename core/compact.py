@@ -0,0 +1,114 @@
+import json
+import uuid
+import hashlib
+from typing import Dict, Any, List
+from .storage import JsonlStorage, StorageError, INTERNAL_TYPES, _now_iso
+from .archive import archive_segments
+
+"""
+저장소 정리 (sparkling compact) — JSONL 저장소
+- 잠금을 잡은 채로 로그 전체를 다시 쓴다 (임시 파일 → fsync → rename)
+- keep=N: 프롬프트마다 최근 N 버전만 로그에 남기고 나머지는 gzip 보관 세그먼트로 (all_versions/get_version 은 그대로 읽음)
+- 같은 content 가 여러 번 나오면 blob 레코드 하나로 두고 "content_ref" 로 참조
+- evals: keep(그대로) | drop(meta_prompt 삭제) | archive(meta_prompt 를 보관 세그먼트로, "meta_prompt_ref" 로 참조)
+  이미 보관된 meta_prompt_ref 는 keep/archive 에서 그대로 둔다 (drop 이면 참조도 지움)
+- 첫 줄에 compact 표시 레코드 → 다른 프로세스의 인덱스/검색 cursor 가 재작성을 알아챔
+"""
+
+EVAL_POLICIES = ("keep", "drop", "archive")
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _disk_bytes(store: JsonlStorage) -> int:
+    segs = archive_segments(store.path)
+    paths = [store.path] + segs + [seg.with_name(seg.name + ".json") for seg in segs]
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+def compact_jsonl(store: JsonlStorage, *, keep: int = 0, evals: str = "keep") -> Dict[str, Any]:
+    if evals not in EVAL_POLICIES:
+        raise StorageError(f"알 수 없는 evals 정책: {evals} ({'|'.join(EVAL_POLICIES)})")
+    with store._locked():
+        before = _disk_bytes(store)
+        if not store.path.exists():
+            return {"bytes_before": before, "bytes_after": before, "archived": 0, "blobs": 0, "evals_trimmed": 0}
+        store.index.refresh()
+        records: List[Dict[str, Any]] = []
+        blobs: Dict[str, str] = {}
+        with store.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                if rec.get("record_type") == "blob":
+                    blobs[rec["hash"]] = rec["content"]
+                elif rec.get("record_type") not in INTERNAL_TYPES:
+                    records.append(rec)
+        for rec in records:  # content 참조만 풀어 둔다 (다시 dedupe). 보관된 meta_prompt_ref 는 그대로
+            ref = rec.pop("content_ref", None)
+            if ref is not None:
+                rec["content"] = blobs[ref] if ref in blobs else store._blob(ref)
+
+        # 1) 오래된 버전 → 보관
+        latest: Dict[str, int] = {}
+        for rec in records:
+            if rec.get("record_type") in (None, "prompt") and rec.get("prompt_id"):
+                latest[rec["prompt_id"]] = max(latest.get(rec["prompt_id"], 0), rec.get("version") or 0)
+        cutoff = {pid: v - keep for pid, v in latest.items()} if keep > 0 else {}
+        archived, kept = [], []
+        for rec in records:
+            is_prompt = rec.get("record_type") in (None, "prompt")
+            if is_prompt and (rec.get("version") or 0) <= cutoff.get(rec.get("prompt_id"), 0):
+                full = store._materialize(rec)
+                archived.append({k: v for k, v in full.items() if k != "delta"})
+                continue
+            if is_prompt and "delta" in rec and rec["delta"]["base"] <= cutoff.get(rec["prompt_id"], 0):
+                rec = {k: v for k, v in store._materialize(rec).items() if k != "delta"}  # 기준이 보관됨 → 스냅샷으로
+            kept.append(rec)
+
+        # 2) 평가의 큰 필드
+        trimmed, archived_blobs = 0, {}
+        for rec in kept:
+            if rec.get("record_type") != "eval" or evals == "keep":
+                continue
+            if evals == "drop" and rec.pop("meta_prompt_ref", None):
+                trimmed += 1
+                continue
+            if not rec.get("meta_prompt"):
+                continue
+            text = rec.pop("meta_prompt")
+            trimmed += 1
+            if evals == "archive":
+                rec["meta_prompt_ref"] = h = _hash(text)
+                archived_blobs[h] = text
+
+        # 3) 같은 content 는 blob 하나로
+        hashes = {id(rec): _hash(rec["content"]) for rec in kept if "content" in rec}
+        counts: Dict[str, int] = {}
+        for h in hashes.values():
+            counts[h] = counts.get(h, 0) + 1
+        shared: Dict[str, str] = {}
+        for rec in kept:
+            h = hashes.get(id(rec))
+            if h and counts[h] > 1:
+                shared[h] = rec.pop("content")
+                rec["content_ref"] = h
+
+        # 4) 보관 세그먼트 먼저, 그다음 로그 교체 (중간에 죽어도 잃는 레코드 없음: 로그 쪽이 우선)
+        n_archived = len(archived)
+        archived += [{"record_type": "blob", "hash": h, "content": t} for h, t in archived_blobs.items()]
+        segment = store.archive.write(archived) if archived else None
+        marker = {"record_type": "compact", "id": uuid.uuid4().hex, "compacted_at": _now_iso()}
+        store._write_lines([marker]
+                           + [{"record_type": "blob", "hash": h, "content": c} for h, c in shared.items()]
+                           + kept)
+        store.index.rebuild()
+        store.archive.refresh()
+        return {
+            "bytes_before": before,
+            "bytes_after": _disk_bytes(store),
+            "archived": n_archived,
+            "blobs": len(shared),
+            "evals_trimmed": trimmed,
+            "segment": str(segment) if segment else None,
+        }
@@ -1,23 +1,102 @@
-# core/config.py (추가/보완)
+# core/config.py
+# 설정은 처음 읽을 때 한 번만 계산한다 (import 시점에 .env 파싱/폴더 생성 없음).
+# 폴더는 실제로 파일을 쓰는 쪽(storage/logsink/cache)이 필요할 때 만든다.
 from pathlib import Path
 import os
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
-# .env 로딩을 이미 하고 있다면 그대로 유지
-env_file = BASE_DIR / ".env"
-if env_file.exists():
-    for line in env_file.read_text().splitlines():
-        if line.strip() and not line.startswith("#"):
-            key, _, val = line.partition("=")
-            os.environ.setdefault(key.strip(), val.strip())
+_env_loaded = False
+def load_env() -> None:
+    """.env → os.environ (이미 설정된 값은 유지). 여러 번 불러도 한 번만 읽음."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    env_file = BASE_DIR / ".env"
+    if env_file.exists():
+        for line in env_file.read_text().splitlines():
+            if line.strip() and not line.startswith("#"):
+                key, _, val = line.partition("=")
+                os.environ.setdefault(key.strip(), val.strip())
 
-DATA_DIR = BASE_DIR / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+def _resolve() -> dict:
+    load_env()
+    c = {}
+    c["DATA_DIR"] = DATA_DIR = Path(os.getenv("SPARKLING_DATA_DIR") or BASE_DIR / "data")  # 벤치마크 등은 임시 폴더로
+    c["JSONL_PATH"] = DATA_DIR / "prompts.jsonl"
 
-JSONL_PATH = DATA_DIR / "prompts.jsonl"
+    # ▼ 저장소 백엔드: "jsonl"(기본) | "sqlite"
+    c["STORAGE_BACKEND"] = os.getenv("SPARKLING_STORAGE", "jsonl").strip().lower()
+    c["SQLITE_PATH"] = Path(os.getenv("SPARKLING_SQLITE_PATH") or DATA_DIR / "prompts.db")
+    # ▼ 버전 저장 방식: "full"(버전마다 전체 내용) | "delta"(부모 대비 라인 델타 + N버전마다 스냅샷)
+    c["STORAGE_MODE"] = os.getenv("SPARKLING_STORAGE_MODE", "full").strip().lower()
+    c["SNAPSHOT_EVERY"] = int(os.getenv("SPARKLING_SNAPSHOT_EVERY", "10"))
 
-# ▼ 로그 폴더/파일
-LOG_DIR = DATA_DIR / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
-LLM_LOG_PATH = LOG_DIR / "llm.jsonl"
+    # ▼ 로그 폴더/파일
+    c["LOG_DIR"] = LOG_DIR = DATA_DIR / "logs"
+    c["LLM_LOG_PATH"] = LOG_DIR / "llm.jsonl"
+    c["LLM_LOG_MAX_MB"] = float(os.getenv("LLM_LOG_MAX_MB", "50"))             # 넘으면 회전(gzip)
+    c["LLM_LOG_ROTATE_HOURS"] = float(os.getenv("LLM_LOG_ROTATE_HOURS", "0"))  # 0 = 시간 기준 회전 없음
+    c["LLM_LOG_BACKUPS"] = int(os.getenv("LLM_LOG_BACKUPS", "10"))             # 보관할 회전 세그먼트 수
+    c["LLM_LOG_RAW"] = os.getenv("LLM_LOG_RAW", "truncated")                   # full | truncated | off
+    c["LLM_LOG_RAW_MAX"] = int(os.getenv("LLM_LOG_RAW_MAX", "2000"))
+
+    # ▼ OpenAI 호출 정책
+    c["LLM_TIMEOUT"] = float(os.getenv("LLM_TIMEOUT", "120"))               # 초 (응답 읽기 포함 전체)
+    c["LLM_CONNECT_TIMEOUT"] = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+    c["LLM_MAX_RETRIES"] = int(os.getenv("LLM_MAX_RETRIES", "3"))           # 429/5xx/연결 오류
+    c["LLM_BACKOFF_BASE"] = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))     # 초, 지수 백오프 시작값
+    c["LLM_BACKOFF_MAX"] = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+    c["LLM_POOL_SIZE"] = int(os.getenv("LLM_POOL_SIZE", "16"))              # HTTP 커넥션 풀 크기
+    c["LLM_HEDGE_AFTER"] = float(os.getenv("LLM_HEDGE_AFTER", "0"))         # 초, 0 = 헤지 요청 끔
+
+    # ▼ 토큰 예산 (core/tokens.py): 입력은 보내기 전에 어림, 출력 한도는 kind 별 최근 사용량으로 자동 조정
+    c["LLM_INPUT_BUDGET"] = int(os.getenv("SPARKLING_LLM_INPUT_BUDGET", "100000"))    # 어림 토큰, 0 = 검사 안 함
+    c["LLM_INPUT_POLICY"] = os.getenv("SPARKLING_LLM_INPUT_POLICY", "warn").strip().lower()  # warn | refuse
+    c["LLM_AUTO_MAX_TOKENS"] = os.getenv("SPARKLING_LLM_AUTO_MAX_TOKENS", "on").lower() not in ("0", "off", "false")
+    c["LLM_MAX_OUTPUT_TOKENS"] = int(os.getenv("SPARKLING_LLM_MAX_OUTPUT_TOKENS", "32000"))  # 자동 조정/재요청 상한
+
+    # ▼ LLM 백엔드: openai(기본) | record(실제 호출 + 로그에 전체 text) | replay(fixture 재생, core/replay.py)
+    c["LLM_BACKEND"] = os.getenv("SPARKLING_LLM_BACKEND", "openai").strip().lower()
+    c["LLM_FIXTURES"] = Path(os.environ["SPARKLING_LLM_FIXTURES"]) if os.getenv("SPARKLING_LLM_FIXTURES") else None  # 없으면 LLM_LOG_PATH
+    c["LLM_REPLAY_LATENCY"] = os.getenv("SPARKLING_LLM_REPLAY_LATENCY", "0")   # 밀리초 | recorded
+    c["LLM_REPLAY_MATCH"] = os.getenv("SPARKLING_LLM_REPLAY_MATCH", "exact")   # exact | any
+
+    # ▼ 모델 단가 (USD / 1M tokens, 모델명 접두어 기준) — SPARKLING_PRICES 에 JSON 으로 덮어쓰기 가능
+    c["MODEL_PRICES"] = {
+        "gpt-5":      {"input": 1.25, "cached_input": 0.125, "output": 10.0},
+        "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0},
+        "gpt-5-nano": {"input": 0.05, "cached_input": 0.005, "output": 0.4},
+        "gpt-4.1":    {"input": 2.0,  "cached_input": 0.5,   "output": 8.0},
+        "gpt-4o":     {"input": 2.5,  "cached_input": 1.25,  "output": 10.0},
+        "o3":         {"input": 2.0,  "cached_input": 0.5,   "output": 8.0},
+    }
+    if os.getenv("SPARKLING_PRICES"):
+        import json
+        c["MODEL_PRICES"].update(json.loads(os.environ["SPARKLING_PRICES"]))
+
+    # ▼ LLM 응답 캐시 (SPARKLING_LLM_CACHE: off(기본) | on | refresh)
+    c["LLM_CACHE_DIR"] = DATA_DIR / "cache" / "llm"
+    c["LLM_CACHE_MAX_MB"] = float(os.getenv("SPARKLING_LLM_CACHE_MAX_MB", "200"))
+    c["LLM_CACHE_TTL"] = float(os.getenv("SPARKLING_LLM_CACHE_TTL", "0"))  # 초, 0 = 만료 없음
+
+    # ▼ 증분 평가: 직전 평가 이후 바뀐 줄 비율이 이보다 크면 전체 프롬프트로 평가
+    c["EVAL_MAX_CHANGE"] = float(os.getenv("SPARKLING_EVAL_MAX_CHANGE", "0.3"))
+
+    # ▼ blame 결과 캐시 (prompt_id/version 별)
+    c["BLAME_CACHE_DIR"] = DATA_DIR / "cache" / "blame"
+    # ▼ 검색 역색인 (저장소에서 다시 만들 수 있는 파생 데이터)
+    c["SEARCH_INDEX_PATH"] = DATA_DIR / "cache" / "search.db"
+    return c
+
+def __getattr__(name: str):
+    # config.JSONL_PATH 처럼 처음 접근할 때 전체 설정을 계산해 모듈 속성으로 고정
+    if name.startswith("__"):
+        raise AttributeError(name)
+    settings = _resolve()
+    if name not in settings:
+        raise AttributeError(f"module 'core.config' has no attribute {name!r}")
+    for k, v in settings.items():
+        globals().setdefault(k, v)
+    return globals()[name]
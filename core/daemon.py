@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import shlex
+import socket
+import threading
+import contextlib
+from pathlib import Path
+from typing import Callable, List, Optional
+from . import config
+
+"""
+상주 모드 — 저장소 인덱스/LLM 클라이언트를 프로세스에 띄워 둔 채 명령을 실행
+- repl(): sparkling shell (한 줄 = CLI 명령 하나)
+- serve(): sparkling daemon (Unix 소켓). CLI 는 소켓이 있으면 명령을 넘기고 출력만 받아 쓴다
+  프로토콜: 요청 한 줄 {"argv": [...], "cwd": "...", "env": 지문} → 응답 여러 줄 {"out": "..."} … {"exit": 코드}
+  env = 설정 환경변수(SPARKLING_*/OPENAI_*/LLM_*) 지문. 데몬과 다르면 {"mismatch": true} → CLI 가 직접 실행
+- 명령은 한 번에 하나씩 (cwd/환경변수/stdout 이 프로세스 전역이라)
+- SPARKLING_DAEMON=off 이면 소켓이 있어도 넘기지 않음
+"""
+
+Runner = Callable[[List[str]], int]
+
+def socket_path() -> Path:
+    return Path(os.getenv("SPARKLING_SOCKET") or config.DATA_DIR / "sparkling.sock")
+
+_ENV_PREFIXES = ("SPARKLING_", "OPENAI_", "LLM_")
+_ENV_IGNORE = ("SPARKLING_SOCKET", "SPARKLING_DAEMON")
+
+def env_fingerprint() -> str:
+    """설정에 쓰이는 환경변수(.env 포함)의 해시 — 값(API 키 등)은 소켓으로 보내지 않음."""
+    config.load_env()
+    items = sorted((k, v) for k, v in os.environ.items() if k.startswith(_ENV_PREFIXES) and k not in _ENV_IGNORE)
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+# ---------- 클라이언트 ----------
+def forward(argv: List[str]) -> Optional[int]:
+    """데몬에 명령을 넘겨 실행. 데몬이 없으면 None (직접 실행)."""
+    if os.getenv("SPARKLING_DAEMON", "").lower() in ("0", "off", "false"):
+        return None
+    path = socket_path()
+    if not path.exists():
+        return None
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(str(path))
+    except OSError:
+        s.close()
+        return None
+    with s, s.makefile("rwb") as f:
+        f.write((json.dumps({"argv": argv, "cwd": os.getcwd(), "env": env_fingerprint()}) + "\n").encode("utf-8"))
+        f.flush()
+        for line in f:
+            msg = json.loads(line)
+            if "out" in msg:
+                print(msg["out"], end="", flush=True)
+            elif "exit" in msg:
+                return msg["exit"]
+            elif msg.get("mismatch"):
+                return None  # 데몬과 설정(환경변수)이 다름 → 직접 실행
+    return 1  # 데몬이 응답 도중 끊김
+
+def stop(path: Optional[Path] = None) -> bool:
+    path = path or socket_path()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(str(path))
+            s.sendall(b'{"stop": true}\n')
+            s.recv(64)
+        return True
+    except OSError:
+        return False
+
+# ---------- 서버 ----------
+class _SocketWriter:
+    """print() 출력을 {"out": ...} 줄로 바로 보냄 (스트리밍 출력 유지)."""
+    def __init__(self, f):
+        self.f = f
+        self.closed = False
+
+    def write(self, s: str) -> int:
+        if s and not self.closed:
+            try:
+                self.f.write((json.dumps({"out": s}, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.f.flush()
+            except OSError:
+                self.closed = True  # 클라이언트가 끊어도 명령은 끝까지 실행
+        return len(s)
+
+    def flush(self) -> None:
+        pass
+
+def serve(run: Runner, path: Optional[Path] = None, on_ready: Optional[Callable[[Path], None]] = None) -> None:
+    path = Path(path or socket_path())
+    if path.exists():
+        if stop(path):
+            raise RuntimeError(f"이미 실행 중인 데몬이 있음: {path}")
+        path.unlink()  # 죽은 데몬이 남긴 소켓
+    path.parent.mkdir(parents=True, exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)  # 소켓 파일이 처음부터 0600 으로 생기게 (bind 후 chmod 사이 틈 없음)
+    try:
+        server.bind(str(path))
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.settimeout(0.5)  # stop 요청을 주기적으로 확인
+    lock = threading.Lock()
+    stopping = threading.Event()
+
+    def handle(conn: socket.socket) -> None:
+        with conn, conn.makefile("rwb") as f:
+            try:
+                req = json.loads(f.readline() or b"{}")
+            except ValueError:
+                return
+            if req.get("stop"):
+                f.write(b'{"exit": 0}\n')
+                f.flush()
+                stopping.set()
+                return
+            out = _SocketWriter(f)
+            with lock:
+                if req.get("env") != env_fingerprint():
+                    f.write(b'{"mismatch": true}\n')
+                    f.flush()
+                    return
+                cwd = os.getcwd()
+                try:
+                    os.chdir(req.get("cwd") or cwd)
+                    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+                        code = run(list(req.get("argv") or []))
+                except Exception as e:
+                    out.write(f"[!] 데몬 실행 오류: {e}\n")
+                    code = 1
+                finally:
+                    os.chdir(cwd)
+            try:
+                f.write((json.dumps({"exit": code}) + "\n").encode("utf-8"))
+                f.flush()
+            except OSError:
+                pass  # 클라이언트가 먼저 끊음
+
+    if on_ready:
+        on_ready(path)
+    try:
+        while not stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            conn.settimeout(None)
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+
+# ---------- REPL ----------
+def repl(run: Runner, prompt: str = "sparkling> ") -> None:
+    try:
+        import readline  # noqa: F401  (있으면 줄 편집/히스토리)
+    except ImportError:
+        pass
+    while True:
+        try:
+            line = input(prompt).strip()
+        except EOFError:
+            print()
+            return
+        except KeyboardInterrupt:
+            print()
+            continue
+        if not line:
+            continue
+        if line in ("exit", "quit"):
+            return
+        try:
+            argv = shlex.split(line)
+        except ValueError as e:
+            print(f"[!] {e}")
+            continue
+        if argv[0] in ("shell", "daemon"):
+            print("[!] shell 안에서는 실행할 수 없는 명령")
+            continue
+        try:
+            run(argv)
+        except KeyboardInterrupt:
+            print("\n[!] 중단됨")
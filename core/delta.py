@@ -0,0 +1,26 @@
+import difflib
+from typing import List, Any
+
+"""
+라인 단위 델타
+- ops: [[i1, i2, ["새 라인", ...]], ...]  : 부모 라인 [i1:i2) 구간을 새 라인들로 교체 (0부터, 부모 기준)
+- 내용은 "\n" 으로만 나눈다 → "\n".join 으로 원문 그대로 복원
+"""
+
+Delta = List[List[Any]]
+
+def make_delta(old: str, new: str) -> Delta:
+    a, b = old.split("\n"), new.split("\n")
+    sm = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+    return [[i1, i2, b[j1:j2]] for tag, i1, i2, j1, j2 in sm.get_opcodes() if tag != "equal"]
+
+def apply_delta(old: str, ops: Delta) -> str:
+    a = old.split("\n")
+    out: List[str] = []
+    pos = 0
+    for i1, i2, lines in ops:
+        out.extend(a[pos:i1])
+        out.extend(lines)
+        pos = i2
+    out.extend(a[pos:])
+    return "\n".join(out)
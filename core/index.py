@@ -0,0 +1,190 @@
+import json
+import hashlib
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Any, Tuple, Iterable
+
+"""
+prompts.jsonl 사이드카 오프셋 인덱스 (<log>.idx)
+- 1행: 헤더 {"v":1, "sig":...}  (sig = 로그 첫 줄 해시, 재작성 감지용)
+- 이후: [offset, length, prompt_id, version, title, record_type, created_at] 를 한 줄씩 append
+  (blob 레코드는 prompt_id 자리에 hash)
+- 프롬프트별 요약(최신 버전/제목/갱신 시각/마지막 평가 시각)도 같이 유지 → list 가 로그를 읽지 않음
+로그에 레코드가 추가되면 인덱스에도 한 줄만 추가한다.
+로그가 잘렸거나(sig 불일치/크기 감소) 인덱스가 깨졌으면 전체 재구축.
+인덱스 파일 쓰기(추가/재구축)는 lock(저장소의 쓰기 잠금) 안에서 → 읽는 쪽이 따라잡으며 써도 줄이 섞이지 않음.
+"""
+
+INDEX_VERSION = 2
+_SIG_BYTES = 4096
+
+Loc = Tuple[int, int]  # (offset, length)
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+class OffsetIndex:
+    def __init__(self, log_path: Path, index_path: Optional[Path] = None,
+                 lock: Optional[Callable[[], ContextManager]] = None):
+        self.log_path = Path(log_path)
+        self._lock = lock or nullcontext
+        self.path = Path(index_path) if index_path else self.log_path.with_name(self.log_path.name + ".idx")
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.size = 0          # 인덱싱된 로그 바이트 수
+        self.sig: Optional[str] = None
+        self.prompts: Dict[str, Dict[int, Loc]] = {}
+        self.titles: Dict[str, List[str]] = {}
+        self.evals: Dict[str, List[Loc]] = {}
+        self.blobs: Dict[str, Loc] = {}   # compact 가 만든 공유 content (hash → 위치)
+        self.summary: Dict[str, Dict[str, Any]] = {}  # prompt_id → 최신 버전 요약
+
+    # ---------- 로그 상태 ----------
+    def _log_size(self) -> int:
+        try:
+            return self.log_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _signature(self) -> Optional[str]:
+        if not self.log_path.exists():
+            return None
+        with self.log_path.open("rb") as f:
+            head = f.readline(_SIG_BYTES)
+        return hashlib.sha1(head).hexdigest() if head else None
+
+    # ---------- 메모리 반영 ----------
+    def _apply(self, entry: List[Any]) -> None:
+        offset, length, pid, version, title, rtype, created_at = entry
+        if offset < self.size:
+            return  # 다른 프로세스가 이미 색인한 구간을 따라잡으며 다시 쓴 줄 (중복)
+        self.size = offset + length
+        if not pid:
+            return
+        loc = (offset, length)
+        if rtype in (None, "prompt"):
+            version = int(version or 0)
+            self.prompts.setdefault(pid, {})[version] = loc
+            row = self.summary.get(pid)
+            if row is None:
+                row = self.summary[pid] = {"prompt_id": pid, "version": 0, "evals": 0, "last_eval_at": None}
+            if version >= row["version"]:
+                row.update(version=version, title=title, updated_at=created_at)
+        elif rtype == "eval":
+            self.evals.setdefault(pid, []).append(loc)
+            row = self.summary.get(pid)
+            if row is not None:
+                row["evals"] += 1
+                row["last_eval_at"] = created_at
+        elif rtype == "blob":
+            self.blobs[pid] = loc
+            return
+        if title is not None:
+            ids = self.titles.setdefault(title, [])
+            if pid not in ids:
+                ids.append(pid)
+
+    @staticmethod
+    def _entry(offset: int, length: int, rec: Dict[str, Any]) -> List[Any]:
+        key = rec.get("hash") if rec.get("record_type") == "blob" else rec.get("prompt_id")
+        return [offset, length, key, rec.get("version"), rec.get("title"), rec.get("record_type"), rec.get("created_at")]
+
+    # ---------- 파일 입출력 ----------
+    def _load(self) -> bool:
+        """인덱스 파일을 읽는다. 헤더가 안 맞거나 깨진 줄이 있으면 False."""
+        self._loaded = True
+        self._reset()
+        if not self.path.exists():
+            return False
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "null")
+                if not isinstance(header, dict) or header.get("v") != INDEX_VERSION:
+                    return False
+                self.sig = header.get("sig")
+                for line in f:
+                    self._apply(json.loads(line))
+        except (ValueError, TypeError):
+            self._reset()
+            return False
+        return True
+
+    def _append_entries(self, entries: Iterable[List[Any]]) -> None:
+        with self._lock(), self.path.open("a", encoding="utf-8") as f:
+            for e in entries:
+                f.write(_dumps(e) + "\n")
+
+    def _scan(self, start: int) -> None:
+        """로그의 start 바이트부터 끝까지 읽어 인덱스에 추가. 마지막 줄이 미완성이면 건너뜀."""
+        if not self.log_path.exists():
+            return
+        entries = []
+        with self.log_path.open("rb") as f:
+            f.seek(start)
+            offset = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                if raw.strip():
+                    entry = self._entry(offset, len(raw), json.loads(raw))
+                    self._apply(entry)
+                    entries.append(entry)
+                offset += len(raw)
+        self.size = offset
+        if entries:
+            self._append_entries(entries)
+
+    def rebuild(self) -> None:
+        with self._lock():
+            self._reset()
+            self.sig = self._signature()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(_dumps({"v": INDEX_VERSION, "sig": self.sig}) + "\n", encoding="utf-8")
+            self._scan(0)
+            self._loaded = True
+
+    def refresh(self) -> "OffsetIndex":
+        """로그와 인덱스를 맞춘다: 뒤에 붙은 레코드만 추가하고, 잘림/재작성은 재구축."""
+        if not self._loaded and not self._load():
+            self.rebuild()
+            return self
+        size = self._log_size()
+        if size < self.size or (size and self._signature() != self.sig):
+            self.rebuild()
+        elif size > self.size:
+            self._scan(self.size)
+        return self
+
+    def add(self, offset: int, length: int, rec: Dict[str, Any]) -> None:
+        """append_record 직후 호출. offset 은 방금 쓴 줄의 시작 위치."""
+        if offset != self.size:
+            # 그 사이 다른 프로세스가 로그에 썼음 → 따라잡기
+            self.refresh()
+            return
+        entry = self._entry(offset, length, rec)
+        self._apply(entry)
+        self._append_entries([entry])
+
+    # ---------- 조회 ----------
+    def versions(self, prompt_id: str) -> List[Tuple[int, Loc]]:
+        return sorted(self.prompts.get(prompt_id, {}).items())
+
+    def latest(self, prompt_id: str) -> Optional[Tuple[int, Loc]]:
+        vs = self.prompts.get(prompt_id)
+        if not vs:
+            return None
+        v = max(vs)
+        return v, vs[v]
+
+    def ids_by_title(self, title: str) -> List[str]:
+        return sorted(self.titles.get(title, []))
+
+    def read(self, locs: Iterable[Loc]) -> List[Dict[str, Any]]:
+        out = []
+        with self.log_path.open("rb") as f:
+            for offset, length in locs:
+                f.seek(offset)
+                out.append(json.loads(f.read(length)))
+        return out
@@ -1,37 +1,199 @@
-import os, json
-from typing import List, Dict, Any, Optional
+import os, sys, time, uuid, random, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime, timezone
-from openai import OpenAI
-from core.config import LLM_LOG_PATH
+from core import config
+from core.cache import ResponseCache, request_key
+from core.logsink import AsyncJsonlLog
+from core.tokens import UsageHistory, estimate_messages, output_budget
+# openai SDK 는 import 가 무거워서(수백 ms) 실제 호출 시점에 불러온다.
 
 class LLMError(Exception):
     pass
 
 _client = None
-def _get_client() -> OpenAI:
+_client_lock = threading.Lock()
+def _get_client():
     global _client
-    if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        base_url = os.getenv("OPENAI_BASE_URL") 
-        if not api_key:
-            raise LLMError("환경변수 OPENAI_API_KEY가 없습니다.")
-        _client = OpenAI(api_key=api_key, base_url=base_url)
-    return _client
+    if _client is not None:
+        return _client
+    with _client_lock:  # 동시 첫 호출도 클라이언트(커넥션 풀)는 하나만
+        if _client is None and config.LLM_BACKEND == "replay":
+            from core.replay import ReplayClient
+            _client = ReplayClient(config.LLM_FIXTURES or config.LLM_LOG_PATH,
+                                   latency=config.LLM_REPLAY_LATENCY, match=config.LLM_REPLAY_MATCH)
+        elif _client is None:
+            if config.LLM_BACKEND not in ("openai", "record"):
+                raise LLMError(f"알 수 없는 LLM 백엔드: {config.LLM_BACKEND} (openai|record|replay)")
+            import httpx
+            from openai import OpenAI
+            config.load_env()
+            api_key = os.getenv("OPENAI_API_KEY")
+            base_url = os.getenv("OPENAI_BASE_URL") 
+            if not api_key:
+                raise LLMError("환경변수 OPENAI_API_KEY가 없습니다.")
+            timeout = httpx.Timeout(config.LLM_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT)
+            # 스레드 간 공유하는 커넥션 풀 (eval-batch 등 동시 호출 수에 맞춰 LLM_POOL_SIZE)
+            http_client = httpx.Client(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=config.LLM_POOL_SIZE,
+                                    max_keepalive_connections=config.LLM_POOL_SIZE),
+            )
+            # 재시도는 chat() 에서 직접 (횟수를 로그에 남기기 위해)
+            _client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+                             http_client=http_client)
+        return _client
+
+_cache = None
+def _get_cache() -> Optional[ResponseCache]:
+    """SPARKLING_LLM_CACHE 가 on/refresh 일 때만 캐시 사용."""
+    global _cache
+    if os.getenv("SPARKLING_LLM_CACHE", "off") not in ("on", "refresh"):
+        return None
+    if _cache is None:
+        _cache = ResponseCache(config.LLM_CACHE_DIR, int(config.LLM_CACHE_MAX_MB * 1024 * 1024), config.LLM_CACHE_TTL)
+    return _cache
 
 def _now():
     return datetime.now(timezone.utc).isoformat()
 
-def _append_jsonl(obj: Dict[str, Any]):
+def _cache_error(req_id: str, op: str, e: Exception) -> None:
+    """캐시 장부(파일) 실패는 호출 실패가 아님 — 로그만 남기고 계속."""
+    _append_jsonl({"ts": _now(), "event": "llm_cache_error", "req_id": req_id, "op": op, "error": str(e)})
+    _console(f">>> [LLM cache] {op} 실패 (무시): {e}")
+
+_history = None
+def _get_history() -> UsageHistory:
+    """kind 별 출력 토큰 기록 (max_output_tokens 자동 조정용)."""
+    global _history
+    if _history is None or _history.path != config.LLM_LOG_PATH:
+        _history = UsageHistory(config.LLM_LOG_PATH)
+    return _history
+
+def output_limit(kind: Optional[str], default: int) -> int:
+    """chat() 이 이 kind 호출에 실제로 요청할 max_output_tokens (자동 조정 포함). 배치 tpm 비용 어림에도 씀."""
+    if not config.LLM_AUTO_MAX_TOKENS:
+        return default
+    return output_budget(_get_history(), kind, default, config.LLM_MAX_OUTPUT_TOKENS)
+
+def _cut_off(resp) -> bool:
+    """출력 한도(max_output_tokens)에 걸려 잘린 응답인지."""
+    if getattr(resp, "status", None) != "incomplete":
+        return False
+    reason = getattr(getattr(resp, "incomplete_details", None), "reason", None)
+    return reason in (None, "max_output_tokens")
+
+_log = None
+_log_lock = threading.Lock()
+def _get_log() -> AsyncJsonlLog:
+    global _log
+    log = _log
+    if log is not None and log.path == config.LLM_LOG_PATH:
+        return log
+    with _log_lock:  # 동시 첫 호출이 같은 파일에 기록기를 여러 개 만들지 않도록
+        if _log is None or _log.path != config.LLM_LOG_PATH:
+            if _log is not None:
+                _log.close()
+            _log = AsyncJsonlLog(
+                config.LLM_LOG_PATH,
+                max_bytes=int(config.LLM_LOG_MAX_MB * 1024 * 1024),
+                rotate_seconds=config.LLM_LOG_ROTATE_HOURS * 3600,
+                backups=config.LLM_LOG_BACKUPS,
+                raw=config.LLM_LOG_RAW,
+                raw_max=config.LLM_LOG_RAW_MAX,
+            )
+        return _log
+
+# 호출 맥락 태그 (kind=define|eval, prompt_id …) → 모든 로그 이벤트의 "tags" 로 기록
+_log_tags: ContextVar[Dict[str, Any]] = ContextVar("llm_log_tags", default={})
+
+@contextmanager
+def log_context(**tags):
+    token = _log_tags.set({**_log_tags.get(), **tags})
     try:
-        with LLM_LOG_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    except Exception:
-        pass
+        yield
+    finally:
+        _log_tags.reset(token)
+
+def _append_jsonl(obj: Dict[str, Any]):
+    # 큐에 넣기만 함 (파일 기록/회전은 백그라운드 스레드)
+    tags = _log_tags.get()
+    _get_log().write({**obj, "tags": tags} if tags else obj)
+
+def flush_log():
+    if _log is not None:
+        _log.flush()
 
 def _console(*args):
     if os.getenv("LLM_LOG_CONSOLE", "1") == "1":  # 기본 on
         print(*args)
 
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, LLMError):
+        return False
+    from openai import APIConnectionError, APITimeoutError
+    status = getattr(e, "status_code", None)
+    return isinstance(e, (APIConnectionError, APITimeoutError)) or status == 429 or (status or 0) >= 500
+
+def _backoff(attempt: int, e: Exception) -> float:
+    """지수 백오프 + full jitter. 서버가 Retry-After 를 주면 그 값을 우선."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after", ""))
+    except ValueError:
+        retry_after = None
+    if retry_after is not None:
+        return min(retry_after, config.LLM_BACKOFF_MAX)
+    return random.uniform(0, min(config.LLM_BACKOFF_MAX, config.LLM_BACKOFF_BASE * 2 ** attempt))
+
+_hedge_pool = None
+_hedge_lock = threading.Lock()
+
+def _hedged(call: Callable[[], Any], hedge_after: float):
+    """
+    call() 이 hedge_after 초 안에 끝나지 않으면 같은 요청을 하나 더 보내 먼저 끝난 쪽을 사용.
+    (결과, 헤지 여부) 반환. 느린 쪽은 취소할 수 없으므로 백그라운드에서 끝나고 버려진다.
+    """
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=max(2, config.LLM_POOL_SIZE), thread_name_prefix="llm-hedge")
+    first = _hedge_pool.submit(call)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result(), False
+    pending = {first, _hedge_pool.submit(call)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                return fut.result(), True
+            error = fut.exception()
+    raise error
+
+def _stream(client, kwargs: Dict[str, Any], on_delta: Callable[[str], None], t0: float):
+    """stream=True 호출. 텍스트 조각을 on_delta 로 넘기고 (최종 Response, 첫 토큰까지 걸린 초) 반환."""
+    resp, ttft = None, None
+    for event in client.responses.create(stream=True, **kwargs):
+        etype = getattr(event, "type", "")
+        if etype == "response.output_text.delta":
+            if ttft is None:
+                ttft = time.perf_counter() - t0
+            on_delta(event.delta)
+        elif etype in ("response.completed", "response.incomplete"):
+            resp = event.response
+        elif etype == "response.failed":
+            err = getattr(event.response, "error", None)
+            raise LLMError(getattr(err, "message", None) or "response.failed")
+        elif etype == "error":
+            raise LLMError(getattr(event, "message", None) or "stream error")
+    if resp is None:
+        raise LLMError("스트림이 완료 이벤트 없이 종료됨")
+    return resp, ttft
+
 def chat(
     messages: List[Dict[str, str]],
     model: Optional[str] = None,
@@ -39,12 +201,17 @@ def chat(
     max_tokens: int = 800,
     reasoning_effort: Optional[str] = None,  # "low"|"medium"|"high" 또는 None
     text_verbosity: Optional[str] = None,    # "low"|"medium"|"high" (선택)
+    on_delta: Optional[Callable[[str], None]] = None,  # 지정 시 스트리밍: 텍스트 조각마다 호출
+    hedge_after: Optional[float] = None,     # 초. 이 시간 안에 응답이 없으면 같은 요청을 한 번 더(스트리밍 제외)
+    cache_key: Optional[str] = None,         # OpenAI prompt_cache_key: 같은 정적 접두어를 쓰는 호출끼리 묶음 (응답 캐시 키와 별개)
+    sample: Optional[int] = None,            # 같은 요청을 여러 번 보낼 때 샘플 번호 (응답 캐시 키만 구분)
 ) -> str:
     """
     Responses API 호출 + 콘솔/파일 로깅.
     반환값은 최종 텍스트. (자세한 메타는 data/logs/llm.jsonl에 JSONL로 저장)
+    on_delta 를 주면 stream=True 로 호출해 도착하는 대로 넘겨주고, 반환값은 동일하게 전체 텍스트.
     """
-    client = _get_client()
+    config.load_env()  # OPENAI_MODEL / SPARKLING_LLM_CACHE 등이 .env 에 있을 수 있음
     model = model or os.getenv("OPENAI_MODEL", "gpt-5")
 
     # 요청 kwargs 구성
@@ -62,63 +229,177 @@ def chat(
         kwargs["reasoning"] = {"effort": reasoning_effort}
     if text_verbosity:
         kwargs["text"] = {"verbosity": text_verbosity}
+    if cache_key:
+        kwargs["prompt_cache_key"] = cache_key
+    # 응답 캐시 키는 호출부가 정한 요청 기준 (자동 조정된 출력 한도와 무관하게 같은 요청 = 같은 키)
+    key_kwargs = {**kwargs, "sample": sample} if sample else dict(kwargs)
 
-    # 요청 로그
+    # 입력 예산 (보내기 전에 어림) / 출력 한도 (같은 kind 의 최근 사용량 기준으로 늘림)
+    input_est = estimate_messages(messages)
+    budget = config.LLM_INPUT_BUDGET
+    if budget and input_est > budget:
+        msg = f"입력이 예산을 넘음: 약 {input_est} 토큰 > {budget} (SPARKLING_LLM_INPUT_BUDGET)"
+        if config.LLM_INPUT_POLICY == "refuse":
+            raise LLMError(msg)
+        print(f"[!] {msg}", file=sys.stderr)
+    kind = _log_tags.get().get("kind")
+    kwargs["max_output_tokens"] = output_limit(kind, max_tokens)
+
+    # 요청 로그 (req_id: 같은 호출의 request/response/error 를 묶음 — 동시 호출이어도 짝을 찾을 수 있게)
+    req_id = uuid.uuid4().hex[:12]
     req_log = {
         "ts": _now(),
         "event": "llm_request",
-        "backend": "openai.responses",
+        "req_id": req_id,
+        "backend": "openai.responses" if config.LLM_BACKEND != "replay" else "replay",
         "kwargs": {k: v for k, v in kwargs.items()},  # API 키/헤더 없음
+        "input_tokens_est": input_est,
     }
     _append_jsonl(req_log)
     _console(">>> [LLM req] model:", model,
              "| temp:", temperature,
              "| reason:", reasoning_effort,
-             "| max_out:", max_tokens,
+             "| max_out:", kwargs["max_output_tokens"],
+             "| input~:", input_est,
              "| text.verbosity:", text_verbosity)
 
+    # 응답 캐시 (refresh 면 조회 없이 새로 받아 덮어씀)
+    cache = _get_cache()
+    resp_key = request_key(key_kwargs) if cache else None
+    if cache and os.getenv("SPARKLING_LLM_CACHE") == "on":
+        try:
+            hit = cache.get(resp_key)
+        except OSError as e:  # 다른 프로세스가 방금 지운 항목 등 → 없는 것으로
+            _cache_error(req_id, "get", e)
+            hit = None
+        try:
+            st = cache.record(hit is not None)
+        except OSError as e:
+            _cache_error(req_id, "record", e)
+            st = {}
+        _append_jsonl({
+            "ts": _now(),
+            "event": "llm_cache",
+            "req_id": req_id,
+            "result": "hit" if hit else "miss",
+            "key": resp_key,
+            "hits": st.get("hits"),
+            "misses": st.get("misses"),
+        })
+        if hit:
+            _console(">>> [LLM cache] hit:", resp_key[:12], "| hits:", st.get("hits"), "| misses:", st.get("misses"))
+            if on_delta:
+                on_delta(hit["text"])
+            return hit["text"]
+
     try:
-        resp = client.responses.create(**kwargs)
+        client = _get_client()
+        if hedge_after is None:
+            hedge_after = config.LLM_HEDGE_AFTER or None
+        max_retries = config.LLM_MAX_RETRIES
+        sink, grown = on_delta, False
+        while True:
+            t0 = time.perf_counter()
+            ttft, retries, hedged, emitted = None, 0, False, []
+            if sink:
+                on_delta = lambda d: (emitted.append(1), sink(d))
+            while True:
+                try:
+                    if on_delta:
+                        resp, ttft = _stream(client, kwargs, on_delta, t0)
+                    elif hedge_after:
+                        resp, hedged = _hedged(lambda: client.responses.create(**kwargs), hedge_after)
+                    else:
+                        resp = client.responses.create(**kwargs)
+                    break
+                except Exception as e:
+                    # 스트림이 이미 출력을 내보냈으면 재시도하지 않음
+                    if retries >= max_retries or emitted or not _retryable(e):
+                        raise
+                    delay = _backoff(retries, e)
+                    retries += 1
+                    _console(f">>> [LLM retry] {retries}/{max_retries} in {delay:.2f}s: {e}")
+                    time.sleep(delay)
+            latency = time.perf_counter() - t0
 
-        usage = getattr(resp, "usage", None)
-        truncated = getattr(resp, "truncated", None)
+            usage = getattr(resp, "usage", None)
+            truncated = getattr(resp, "truncated", None)
+            status = getattr(resp, "status", None)
 
-        finish_reason = None
-        items = list(getattr(resp, "output", []) or [])
-        for item in reversed(items):
-            if hasattr(item, "finish_reason"):
-                finish_reason = item.finish_reason
-                break
+            finish_reason = None
+            items = list(getattr(resp, "output", []) or [])
+            for item in reversed(items):
+                if hasattr(item, "finish_reason"):
+                    finish_reason = item.finish_reason
+                    break
 
-        # 응답 로그
-        try:
-            resp_json = resp.model_dump()  # pydantic → dict
-        except Exception:
-            resp_json = {"_note": "model_dump failed"}
+            # 응답 로그
+            try:
+                resp_json = resp.model_dump()  # pydantic → dict
+            except Exception:
+                resp_json = {"_note": "model_dump failed"}
 
-        res_log = {
-            "ts": _now(),
-            "event": "llm_response",
-            "usage": getattr(usage, "model_dump", lambda: usage)() if usage else None,
-            "truncated": truncated,
-            "finish_reason": finish_reason,
-            "text_len": len(resp.output_text or ""),
-            "raw": resp_json,  # ⚠️파일 커질 수 있음.
-        }
-        _append_jsonl(res_log)
-
-        # 콘솔 요약
-        _console(">>> [LLM res] usage:", usage)
-        _console(">>> [LLM res] truncated:", truncated, "| finish_reason:", finish_reason)
-        _console(">>> [LLM res] text_len:", len(resp.output_text or ""))
-
-        return (resp.output_text or "").strip()
+            usage_json = getattr(usage, "model_dump", lambda: usage)() if usage else None
+            cached_tokens = ((usage_json or {}).get("input_tokens_details") or {}).get("cached_tokens")
+            res_log = {
+                "ts": _now(),
+                "event": "llm_response",
+                "req_id": req_id,
+                "model": model,
+                "usage": usage_json,
+                "cached_tokens": cached_tokens,
+                "truncated": truncated,
+                "status": status,
+                "incomplete_reason": getattr(getattr(resp, "incomplete_details", None), "reason", None),
+                "max_output_tokens": kwargs["max_output_tokens"],
+                "finish_reason": finish_reason,
+                "text_len": len(resp.output_text or ""),
+                "latency_ms": round(latency * 1000, 1),
+                "retries": retries,
+                "hedged": hedged,
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                "raw": resp_json,  # LLM_LOG_RAW 정책에 따라 잘리거나 제외됨
+            }
+            if config.LLM_BACKEND == "record":
+                res_log["text"] = resp.output_text or ""  # replay fixture 용 (raw 정책과 무관하게 전체)
+            _append_jsonl(res_log)
+
+            # 콘솔 요약
+            _console(">>> [LLM res] usage:", usage)
+            _console(">>> [LLM res] cached_tokens:", cached_tokens, "/ input:", (usage_json or {}).get("input_tokens"))
+            _console(">>> [LLM res] truncated:", truncated, "| status:", status, "| finish_reason:", finish_reason)
+            _console(">>> [LLM res] text_len:", len(resp.output_text or ""),
+                     "| latency:", f"{latency:.2f}s",
+                     *(["| ttft:", f"{ttft:.2f}s"] if ttft is not None else []))
+
+            # 출력 한도에 걸려 잘렸으면 한 번만 더 큰 한도로 다시 (전체를 사람이 다시 돌리지 않도록)
+            limit = kwargs["max_output_tokens"]
+            if not _cut_off(resp) or grown or limit >= config.LLM_MAX_OUTPUT_TOKENS:
+                break
+            grown = True
+            kwargs["max_output_tokens"] = min(config.LLM_MAX_OUTPUT_TOKENS, limit * 2)
+            _append_jsonl({"ts": _now(), "event": "llm_regrow", "req_id": req_id,
+                           "from": limit, "to": kwargs["max_output_tokens"]})
+            _console(f">>> [LLM res] 출력 한도({limit})에서 잘림 → {kwargs['max_output_tokens']} 로 다시 요청")
+            if sink:
+                sink("\n\n[!] 응답이 출력 한도에서 잘려 한도를 늘려 다시 생성합니다\n\n")
+
+        text = (resp.output_text or "").strip()
+        # 빈 응답/잘린 응답은 캐시하지 않음
+        if cache and text and not truncated and status != "incomplete":
+            try:
+                cache.put(resp_key, {"text": text, "usage": res_log["usage"], "model": model})
+            except OSError as e:
+                _cache_error(req_id, "put", e)
+        return text
 
     except Exception as e:
         # 에러도 로그에 남김
         _append_jsonl({
             "ts": _now(),
             "event": "llm_error",
+            "req_id": req_id,
+            "model": model,
             "error": str(e),
         })
         raise LLMError(f"LLM 호출 실패: {e}")
@@ -0,0 +1,198 @@
+import os
+import json
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 동작
+    fcntl = None
+
+"""
+비동기 JSONL 로그 (data/logs/llm.jsonl)
+- write() 는 큐에 넣기만 하고, 파일 기록은 백그라운드 스레드가 담당
+- 크기(max_bytes) / 시간(rotate_seconds) 기준 회전 → <파일>.<UTC시각>.gz 로 압축, 최근 backups 개만 유지
+- raw 정책: full(그대로) | truncated(raw_max 자까지) | off(raw 제거)
+- 프로세스 종료 시(atexit) 남은 로그를 모두 기록
+- 여러 프로세스(CLI/데몬/배치)가 같은 파일에 써도 안전하게:
+  · 큐에 쌓인 줄을 모아 O_APPEND fd 에 한 번의 write 로 기록 (줄이 섞이지 않음)
+  · 기록 전에 fd 와 경로의 inode 를 비교 → 다른 프로세스가 회전했으면 새 파일로 다시 연다
+  · 크기는 fstat 으로 (다른 프로세스가 쓴 만큼 포함)
+  · 확인·회전·기록은 <파일>.lock 잠금 안에서 (회전 중인 파일에 쓰다 잃는 일이 없게)
+"""
+
+_STOP = object()
+
+def rotated_segments(path: Path) -> List[Path]:
+    """회전된 압축 세그먼트 (오래된 순)."""
+    return sorted(path.parent.glob(path.name + ".*.gz"))
+
+class AsyncJsonlLog:
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_bytes: int = 50 * 1024 * 1024,
+        rotate_seconds: float = 0,
+        backups: int = 10,
+        raw: str = "truncated",
+        raw_max: int = 2000,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backups = backups
+        self.raw = raw
+        self.raw_max = raw_max
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._opened_at = 0.0
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    # ---------- 호출 측 ----------
+    def write(self, obj: Dict[str, Any]) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None:
+                    atexit.register(self.close)
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="llm-log", daemon=True)
+                    self._thread.start()
+        self._q.put(obj)
+
+    def flush(self) -> None:
+        """지금까지 write() 한 로그가 파일에 기록될 때까지 대기."""
+        if self._thread is not None and self._thread.is_alive():
+            self._q.join()
+
+    def close(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._q.put(_STOP)
+            self._thread.join(timeout=10)
+
+    # ---------- 기록 스레드 ----------
+    def _run(self) -> None:
+        while True:
+            items = [self._q.get()]
+            while len(items) < 256:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in items)
+            try:
+                self._write_batch([item for item in items if item is not _STOP])
+            except Exception:
+                pass  # 로그 실패가 호출 흐름을 깨지 않도록
+            finally:
+                for _ in items:
+                    self._q.task_done()
+            if stop:
+                self._close_file()
+                return
+
+    def _apply_raw_policy(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        if "raw" not in obj or self.raw == "full":
+            return obj
+        if self.raw == "off":
+            return {k: v for k, v in obj.items() if k != "raw"}
+        raw = json.dumps(obj["raw"], ensure_ascii=False)
+        if len(raw) <= self.raw_max:
+            return obj
+        return {**obj, "raw": {"_truncated": True, "_len": len(raw), "head": raw[:self.raw_max]}}
+
+    def _segment_started(self) -> float:
+        """기존 파일을 이어 쓸 때, 첫 줄의 ts 를 세그먼트 시작 시각으로."""
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                ts = json.loads(f.readline()).get("ts")
+            return datetime.fromisoformat(ts).timestamp()
+        except Exception:
+            return time.time()
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._opened_at = self._segment_started() if self._size() else time.time()
+
+    def _close_file(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _size(self) -> int:
+        return os.fstat(self._fd).st_size
+
+    def _ensure_current(self) -> None:
+        """열어 둔 fd 가 지금 경로의 파일인지 확인 (다른 프로세스가 회전했으면 다시 연다)."""
+        if self._fd is not None:
+            try:
+                st = os.stat(self.path)
+                mine = os.fstat(self._fd)
+                if (st.st_dev, st.st_ino) == (mine.st_dev, mine.st_ino):
+                    return
+            except FileNotFoundError:
+                pass
+            self._close_file()
+        self._open()
+
+    def _should_rotate(self, incoming: int) -> bool:
+        size = self._size()
+        if not size:
+            return False
+        if self.max_bytes and size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock_path.open("a") as lf:
+            fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    def _rotate(self) -> None:
+        self._close_file()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        seg = self.path.with_name(f"{self.path.name}.{stamp}")
+        os.replace(self.path, seg)
+        with seg.open("rb") as src, gzip.open(str(seg) + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        seg.unlink()
+        for old in rotated_segments(self.path)[:-self.backups or None]:
+            old.unlink(missing_ok=True)
+
+    def _write_batch(self, objs: List[Dict[str, Any]]) -> None:
+        if not objs:
+            return
+        lines = [(json.dumps(self._apply_raw_policy(o), ensure_ascii=False) + "\n").encode("utf-8") for o in objs]
+        with self._file_lock():
+            self._ensure_current()
+            chunk: List[bytes] = []
+            for line in lines:
+                # 회전 경계에서 나눠 쓴다 (한 세그먼트가 max_bytes 를 넘지 않게)
+                if chunk and self.max_bytes and self._size() + sum(map(len, chunk)) + len(line) > self.max_bytes:
+                    os.write(self._fd, b"".join(chunk))
+                    chunk = []
+                if not chunk and self._should_rotate(len(line)):
+                    self._rotate()
+                    self._open()
+                chunk.append(line)
+            if chunk:
+                os.write(self._fd, b"".join(chunk))
@@ -0,0 +1,134 @@
+import json
+import time
+import itertools
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .cache import request_key
+
+"""
+LLM 녹화/재생 백엔드 (SPARKLING_LLM_BACKEND=record | replay)
+- record: 실제 API 를 호출하고, llm_response 로그에 전체 text 를 함께 남긴다 → 로그 파일이 그대로 fixture
+- replay: llm.jsonl 형식 fixture 에서 응답을 꺼내 준다 (API 키/네트워크/openai import 불필요)
+  · llm_request 와 llm_response 를 req_id(없으면 바로 다음 응답)로 짝지음, 키 = 요청 kwargs 의 request_key
+    (max_output_tokens 는 키에서 뺌 — 자동 조정으로 녹화 때와 달라질 수 있음)
+  · fixture 의 status/incomplete_reason 도 재생 → 출력 한도 잘림 재요청 경로를 오프라인으로 확인
+  · match=exact: 키가 같은 응답만 / any: 없으면 fixture 응답을 차례로 돌려 씀 (합성 입력 벤치마크용)
+  · latency: 0 | 밀리초 | "recorded"(fixture 의 latency_ms)
+- ReplayClient 는 openai 클라이언트의 responses.create(…, stream=) 모양만 흉내 → chat() 의 재시도/로그/캐시 경로가 그대로 돈다
+"""
+
+def _text_from_raw(raw: Any) -> Optional[str]:
+    """model_dump() 된 Response 에서 output_text 복원 (raw 가 잘렸으면 None)."""
+    if not isinstance(raw, dict) or raw.get("_truncated"):
+        return None
+    parts = [c.get("text", "") for item in raw.get("output") or [] if isinstance(item, dict)
+             for c in item.get("content") or [] if isinstance(c, dict) and c.get("type") == "output_text"]
+    return "".join(parts) if parts else None
+
+def _key(kwargs: Dict[str, Any]) -> str:
+    return request_key({k: v for k, v in kwargs.items() if k != "max_output_tokens"})
+
+def load_fixtures(path: Path) -> List[Tuple[Optional[str], Dict[str, Any]]]:
+    """[(요청 키 | None, {"text","usage","latency_ms","model","status","incomplete_reason"})] — 기록 순."""
+    pending: Dict[str, str] = {}   # req_id → key
+    last_key: Optional[str] = None
+    out = []
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                continue
+            if ev.get("event") == "llm_request":
+                last_key = _key(ev.get("kwargs") or {})
+                if ev.get("req_id"):
+                    pending[ev["req_id"]] = last_key
+            elif ev.get("event") == "llm_response":
+                text = ev.get("text")
+                if text is None:
+                    text = _text_from_raw(ev.get("raw"))
+                if text is None:
+                    continue
+                key = pending.pop(ev["req_id"], None) if ev.get("req_id") else last_key
+                out.append((key, {"text": text, "usage": ev.get("usage"),
+                                  "latency_ms": ev.get("latency_ms"), "model": ev.get("model"),
+                                  "status": ev.get("status"), "incomplete_reason": ev.get("incomplete_reason")}))
+    return out
+
+class _Response:
+    """chat() 이 읽는 Response 속성만."""
+    def __init__(self, entry: Dict[str, Any], model: Optional[str]):
+        self.output_text = entry["text"]
+        self.usage = entry.get("usage")
+        self.truncated = None
+        self.status = entry.get("status") or "completed"
+        reason = entry.get("incomplete_reason")
+        self.incomplete_details = _Event("incomplete", reason=reason) if self.status == "incomplete" else None
+        self.output: List[Any] = []
+        self.model = entry.get("model") or model
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {"object": "response", "backend": "replay", "model": self.model, "status": self.status,
+                "output_text": self.output_text, "usage": self.usage}
+
+class _Event:
+    def __init__(self, type: str, **kw):
+        self.type = type
+        self.__dict__.update(kw)
+
+class ReplayClient:
+    def __init__(self, path: Path, *, latency: str = "0", match: str = "exact"):
+        if match not in ("exact", "any"):
+            raise ValueError(f"알 수 없는 replay match: {match} (exact|any)")
+        self.path = Path(path)
+        self.latency = str(latency)
+        self.match = match
+        self.by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self.entries = []
+        for key, entry in load_fixtures(self.path):
+            self.entries.append(entry)
+            if key:
+                self.by_key.setdefault(key, []).append(entry)
+        self._turn: Dict[str, int] = {}
+        self._any = itertools.cycle(self.entries) if self.entries else None
+        self._lock = threading.Lock()
+        self.responses = self  # client.responses.create(...)
+
+    def _pick(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        key = _key(kwargs)
+        with self._lock:
+            hits = self.by_key.get(key)
+            if hits:
+                # 같은 요청이 여러 번 녹화됐으면 차례로
+                i = self._turn.get(key, 0)
+                self._turn[key] = i + 1
+                return hits[i % len(hits)]
+            if self.match == "any" and self._any is not None:
+                return next(self._any)
+        from .llm import LLMError
+        raise LLMError(f"replay: 일치하는 fixture 없음 (key {key[:12]}, {self.path})")
+
+    def _delay(self, entry: Dict[str, Any]) -> float:
+        if self.latency == "recorded":
+            return (entry.get("latency_ms") or 0) / 1000.0
+        return float(self.latency or 0) / 1000.0
+
+    def create(self, stream: bool = False, **kwargs):
+        entry = self._pick(kwargs)
+        resp = _Response(entry, kwargs.get("model"))
+        if stream:
+            return self._stream(resp, self._delay(entry))
+        time.sleep(self._delay(entry))
+        return resp
+
+    @staticmethod
+    def _stream(resp: _Response, delay: float, chunks: int = 20) -> Iterator[_Event]:
+        text = resp.output_text
+        step = max(1, -(-len(text) // chunks))
+        pieces = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+        time.sleep(delay * 0.3)  # 첫 토큰까지
+        for piece in pieces:
+            yield _Event("response.output_text.delta", delta=piece)
+            time.sleep(delay * 0.7 / len(pieces))
+        yield _Event("response.completed", response=resp)
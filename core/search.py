@@ -0,0 +1,144 @@
+import math
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from . import config
+from . import storage as _storage
+from .text import tokenize
+
+"""
+전문 검색 (sparkling search)
+- 저장소 레코드마다 문서 1개: 프롬프트 = title + content + meta.goal / 평가 = title + llm_output
+- 토큰: core/text.tokenize — 영문/숫자는 단어(소문자), 한글은 2글자 n-gram (한 글자 단어는 그대로)
+- 역색인은 SQLite 파일 (data/cache/search.db) — 저장소 cursor 이후 새 레코드만 이어서 색인
+- 순위: BM25 (k1=1.2, b=0.75)
+"""
+
+K1, B = 1.2, 0.75
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id      INTEGER PRIMARY KEY,
+    prompt_id   TEXT,
+    version     INTEGER,
+    record_type TEXT,
+    title       TEXT,
+    len         INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term   TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf     INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _doc_text(rec: Dict[str, Any]) -> str:
+    if rec.get("record_type") == "eval":
+        return "\n".join([rec.get("title") or "", rec.get("llm_output") or ""])
+    return "\n".join([rec.get("title") or "", rec.get("content") or "", (rec.get("meta") or {}).get("goal") or ""])
+
+class SearchIndex:
+    def __init__(self, path: Optional[Path] = None, store: Optional[_storage.Storage] = None):
+        self.path = Path(path or config.SEARCH_INDEX_PATH)
+        self.store = store or _storage.get_storage()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str) -> None:
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def _clear(self) -> None:
+        self.conn.execute("DELETE FROM postings")
+        self.conn.execute("DELETE FROM docs")
+        self.conn.execute("DELETE FROM state")
+
+    def update(self) -> int:
+        """저장소에 새로 추가된 레코드를 색인. 색인한 문서 수."""
+        source = f"{type(self.store).__name__}:{getattr(self.store, 'path', '')}"
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._get("cursor") if self._get("source") == source else None
+            if cursor is None:
+                self._clear()
+            records, new_cursor, reset = self.store.records_since(cursor)
+            if reset:
+                self._clear()
+            (next_id,) = self.conn.execute("SELECT COALESCE(MAX(doc_id), 0) + 1 FROM docs").fetchone()
+            docs, posts = [], []
+            for rec in records:
+                if not rec.get("prompt_id"):
+                    continue
+                terms = Counter(tokenize(_doc_text(rec)))
+                version = rec.get("source_version") if rec.get("record_type") == "eval" else rec.get("version")
+                docs.append((next_id, rec["prompt_id"], version, rec.get("record_type") or "prompt",
+                             rec.get("title"), sum(terms.values())))
+                posts.extend((t, next_id, n) for t, n in terms.items())
+                next_id += 1
+            self.conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?)", docs)
+            self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", posts)
+            self._set("source", source)
+            self._set("cursor", new_cursor)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return len(docs)
+
+    def search(self, query: str, *, limit: int = 20, record_type: Optional[str] = None,
+               per_prompt: bool = True) -> List[Dict[str, Any]]:
+        """
+        BM25 순위의 [{"prompt_id","version","record_type","title","score"}].
+        per_prompt: 프롬프트마다 점수가 가장 높은 문서 하나만.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        n_docs, total_len = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(len), 0) FROM docs").fetchone()
+        if not n_docs:
+            return []
+        avg_len = total_len / n_docs
+        scores: Dict[int, float] = {}
+        for term in terms:
+            rows = self.conn.execute(
+                "SELECT p.doc_id, p.tf, d.len FROM postings p JOIN docs d ON d.doc_id = p.doc_id WHERE p.term = ?",
+                (term,),
+            ).fetchall()
+            if not rows:
+                continue
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            for doc_id, tf, dl in rows:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * dl / avg_len))
+
+        hits, seen = [], set()
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])
+        for i in range(0, len(ranked), 500):
+            chunk = ranked[i:i + 500]
+            q = ",".join("?" * len(chunk))
+            info = {row[0]: row[1:] for row in self.conn.execute(
+                f"SELECT doc_id, prompt_id, version, record_type, title FROM docs WHERE doc_id IN ({q})",
+                [d for d, _ in chunk])}
+            for doc_id, score in chunk:
+                pid, version, rtype, title = info[doc_id]
+                if record_type and rtype != record_type:
+                    continue
+                if per_prompt:
+                    if pid in seen:
+                        continue
+                    seen.add(pid)
+                hits.append({"prompt_id": pid, "version": version, "record_type": rtype,
+                             "title": title, "score": round(score, 4)})
+                if len(hits) >= limit:
+                    return hits
+        return hits
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,276 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from .storage import Storage, StorageError, JsonlStorage, SUMMARY_SORTS, _now_iso
+
+"""
+SQLite(WAL) 저장소
+- records 한 테이블: 조회용 컬럼(prompt_id/version/title/record_type) + 원본 레코드 JSON(body)
+- 버전 할당은 BEGIN IMMEDIATE 트랜잭션 안에서 → 여러 writer 가 같은 파일을 공유해도 안전
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt_id   TEXT,
+    version     INTEGER,
+    title       TEXT,
+    record_type TEXT NOT NULL DEFAULT 'prompt',
+    created_at  TEXT,
+    body        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_prompt ON records(prompt_id, version);
+CREATE INDEX IF NOT EXISTS idx_records_title ON records(title);
+CREATE INDEX IF NOT EXISTS idx_records_type ON records(record_type);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_records_prompt_version
+    ON records(prompt_id, version) WHERE record_type = 'prompt';
+
+-- 프롬프트별 요약 (list 용). records 에 INSERT 될 때 트리거가 갱신
+CREATE TABLE IF NOT EXISTS summary (
+    prompt_id    TEXT PRIMARY KEY,
+    title        TEXT,
+    version      INTEGER NOT NULL,
+    updated_at   TEXT,
+    last_eval_at TEXT,
+    evals        INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_summary_updated ON summary(updated_at);
+CREATE INDEX IF NOT EXISTS idx_summary_title ON summary(title);
+CREATE TRIGGER IF NOT EXISTS trg_summary_prompt AFTER INSERT ON records WHEN NEW.record_type = 'prompt'
+BEGIN
+    INSERT INTO summary (prompt_id, title, version, updated_at) VALUES (NEW.prompt_id, NEW.title, NEW.version, NEW.created_at)
+    ON CONFLICT(prompt_id) DO UPDATE SET title = excluded.title, version = excluded.version, updated_at = excluded.updated_at
+    WHERE excluded.version >= summary.version;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_summary_eval AFTER INSERT ON records WHEN NEW.record_type = 'eval'
+BEGIN
+    UPDATE summary SET evals = evals + 1, last_eval_at = NEW.created_at WHERE prompt_id = NEW.prompt_id;
+END;
+"""
+
+# summary 테이블이 생기기 전에 만든 DB → 한 번 채움
+_BACKFILL_SUMMARY = """
+INSERT INTO summary (prompt_id, title, version, updated_at, last_eval_at, evals)
+SELECT r.prompt_id, r.title, r.version, r.created_at,
+       (SELECT MAX(e.created_at) FROM records e WHERE e.prompt_id = r.prompt_id AND e.record_type = 'eval'),
+       (SELECT COUNT(*) FROM records e WHERE e.prompt_id = r.prompt_id AND e.record_type = 'eval')
+FROM records r
+WHERE r.record_type = 'prompt'
+  AND r.version = (SELECT MAX(version) FROM records m WHERE m.prompt_id = r.prompt_id AND m.record_type = 'prompt')
+"""
+
+# list 정렬: 이름 → 컬럼
+_SUMMARY_ORDER = {"updated": "updated_at", "eval": "last_eval_at", "version": "version", "title": "title"}
+
+_INSERT = (
+    "INSERT INTO records (prompt_id, version, title, record_type, created_at, body) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+def _row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        record.get("prompt_id"),
+        record.get("version"),
+        record.get("title"),
+        record.get("record_type") or "prompt",
+        record.get("created_at"),
+        json.dumps(record, ensure_ascii=False),
+    )
+
+class SqliteStorage(Storage):
+    def __init__(self, path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self._local = threading.local()
+        self._conn()  # 스키마 생성
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: 트랜잭션은 직접 BEGIN/COMMIT
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            if (conn.execute("SELECT 1 FROM records LIMIT 1").fetchone()
+                    and not conn.execute("SELECT 1 FROM summary LIMIT 1").fetchone()):
+                conn.execute(_BACKFILL_SUMMARY)
+            self._local.conn = conn
+        return conn
+
+    def append_record(self, record: Dict[str, Any]) -> None:
+        record["created_at"] = _now_iso()
+        self._conn().execute(_INSERT, _row(record))
+
+    def append_records(self, records: List[Dict[str, Any]]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for r in records:
+                r["created_at"] = _now_iso()
+                conn.execute(_INSERT, _row(r))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def evals_for(self, prompt_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT body FROM records WHERE prompt_id = ? AND record_type = 'eval' ORDER BY id", (prompt_id,)
+        )
+        return [json.loads(body) for (body,) in rows]
+
+    def records_since(self, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], str, bool]:
+        # cursor = 마지막으로 읽은 id (AUTOINCREMENT 라 재사용되지 않음)
+        last = int(cursor) if cursor and cursor.isdigit() else 0
+        (top,) = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM records").fetchone()
+        reset = last > top
+        if reset:
+            last = 0
+        rows = self._conn().execute("SELECT id, body FROM records WHERE id > ? ORDER BY id", (last,)).fetchall()
+        recs = [self._materialize_any(json.loads(body)) for _, body in rows]
+        return recs, str(rows[-1][0] if rows else last), reset
+
+    def compact(self, *, keep: int = 0, evals: str = "keep") -> Dict[str, Any]:
+        # 보관/평가 필드 정리는 JSONL 전용. SQLite 는 VACUUM 으로 빈 페이지만 회수
+        if keep or evals != "keep":
+            raise StorageError("SQLite 저장소의 compact 는 --keep/--evals 를 지원하지 않음 (VACUUM 만 수행)")
+        def size():
+            return sum(p.stat().st_size for p in (self.path, Path(str(self.path) + "-wal")) if p.exists())
+        before = size()
+        conn = self._conn()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"bytes_before": before, "bytes_after": size(), "archived": 0, "blobs": 0, "evals_trimmed": 0}
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for (body,) in self._conn().execute("SELECT body FROM records ORDER BY id"):
+            yield json.loads(body)
+
+    def _raw_version(self, prompt_id: str, version: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT body FROM records WHERE prompt_id = ? AND version = ? AND record_type = 'prompt'",
+            (prompt_id, version),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest_by_id(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT body FROM records WHERE prompt_id = ? AND record_type = 'prompt' "
+            "ORDER BY version DESC LIMIT 1",
+            (prompt_id,),
+        ).fetchone()
+        return self._materialize(json.loads(row[0])) if row else None
+
+    def all_versions(self, prompt_id: str) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT body FROM records WHERE prompt_id = ? AND record_type = 'prompt' ORDER BY version",
+            (prompt_id,),
+        )
+        return [self._materialize(json.loads(body)) for (body,) in rows]
+
+    def summaries(self, *, sort: str = "updated", reverse: bool = False, title_prefix: Optional[str] = None,
+                  limit: Optional[int] = None, offset: int = 0) -> Tuple[int, List[Dict[str, Any]]]:
+        column, desc = _SUMMARY_ORDER[sort], SUMMARY_SORTS[sort][1] != reverse
+        where, params = "", []
+        if title_prefix:
+            # LIKE 는 ASCII 대소문자를 무시 → JSONL(startswith)과 같게 정확한 접두어 비교
+            where, params = "WHERE substr(title, 1, length(?)) = ?", [title_prefix, title_prefix]
+        conn = self._conn()
+        (total,) = conn.execute(f"SELECT COUNT(*) FROM summary {where}", params).fetchone()
+        # NULL 은 오름차순이면 앞, 내림차순이면 뒤 (JSONL 과 같게)
+        order = f"{column} IS NOT NULL {'DESC' if desc else 'ASC'}, {column} {'DESC' if desc else 'ASC'}, prompt_id"
+        rows = conn.execute(
+            f"SELECT prompt_id, title, version, updated_at, last_eval_at, evals FROM summary {where} "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [limit if limit else -1, offset],
+        )
+        keys = ("prompt_id", "title", "version", "updated_at", "last_eval_at", "evals")
+        return total, [dict(zip(keys, row)) for row in rows]
+
+    def find_ids_by_title(self, title: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT DISTINCT prompt_id FROM records WHERE title = ? ORDER BY prompt_id", (title,)
+        )
+        return [pid for (pid,) in rows]
+
+    def save_new_version(self, prompt_id: str, title: str, content: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (cur,) = conn.execute(
+                "SELECT MAX(version) FROM records WHERE prompt_id = ? AND record_type = 'prompt'",
+                (prompt_id,),
+            ).fetchone()
+            # 델타 저장일 때만 부모 내용을 복원
+            parent = self.latest_by_id(prompt_id) if cur and self.mode == "delta" else None
+            rec = {
+                "prompt_id": prompt_id,
+                "version": (cur or 0) + 1,
+                "title": title,
+                "content": content,
+                "meta": meta or {},
+                "created_at": _now_iso(),
+            }
+            conn.execute(_INSERT, _row(self._encode(rec, parent)))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rec
+
+    def save_new_prompts(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        conn = self._conn()
+        out = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for it in items:
+                exists = conn.execute(
+                    "SELECT 1 FROM records WHERE prompt_id = ? AND record_type = 'prompt' LIMIT 1", (it["prompt_id"],)
+                ).fetchone()
+                if exists:
+                    continue
+                rec = {"prompt_id": it["prompt_id"], "version": 1, "title": it["title"], "content": it["content"],
+                       "meta": it.get("meta") or {}, "created_at": _now_iso()}
+                conn.execute(_INSERT, _row(self._encode(rec, None)))
+                out.append(rec)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return out
+
+def migrate_jsonl(src: Path, dst: Path, batch_size: int = 1000) -> Tuple[int, int]:
+    """prompts.jsonl(+보관 세그먼트)을 레코드 단위로 읽어 SQLite 로 옮긴다. (기록 수, 중복 버전으로 건너뛴 수)"""
+    conn = SqliteStorage(dst)._conn()
+    inserted = skipped = 0
+
+    def flush(rows):
+        nonlocal inserted, skipped
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for r in rows:
+                cur = conn.execute(_INSERT.replace("INSERT", "INSERT OR IGNORE", 1), r)
+                if cur.rowcount:
+                    inserted += 1
+                else:
+                    skipped += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    batch = []
+    # JsonlStorage 로 읽는다: compact 가 만든 보관 세그먼트/blob 참조도 풀어서 옮김
+    for rec in JsonlStorage(src).iter_records():
+        batch.append(_row(rec))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return inserted, skipped
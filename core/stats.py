@@ -0,0 +1,151 @@
+import re
+import json
+import math
+import gzip
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Iterable
+from .logsink import rotated_segments
+
+"""
+LLM 로그 집계 (sparkling stats)
+- 회전된 .gz 세그먼트 → 현재 llm.jsonl 순으로 한 줄씩 읽는다 (파일 전체를 메모리에 올리지 않음)
+- llm_response: 지연(p50/p95/p99), 토큰, 비용 / llm_error: 실패 수 / llm_cache: 적중 수
+- 묶는 기준: model, kind(define/eval…), prompt_id (kind/prompt_id 는 로그의 tags)
+"""
+
+DIMENSIONS = ("model", "kind", "prompt")
+
+def parse_since(spec: str, now: Optional[datetime] = None) -> datetime:
+    """'7d' / '24h' / '30m' 또는 ISO 시각."""
+    now = now or datetime.now(timezone.utc)
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([dhm])", spec.strip())
+    if m:
+        n, unit = float(m.group(1)), m.group(2)
+        return now - timedelta(**{{"d": "days", "h": "hours", "m": "minutes"}[unit]: n})
+    dt = datetime.fromisoformat(spec)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def iter_log_events(path: Path) -> Iterator[Dict[str, Any]]:
+    for seg in rotated_segments(path):
+        with gzip.open(seg, "rt", encoding="utf-8") as f:
+            yield from _parse(f)
+    if path.exists():
+        with path.open("r", encoding="utf-8") as f:
+            yield from _parse(f)
+
+def _parse(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+def price_for(model: str, prices: Dict[str, Dict[str, float]]) -> Optional[Dict[str, float]]:
+    """가장 길게 일치하는 접두어의 단가 (USD / 1M tokens)."""
+    best = max((p for p in prices if model.startswith(p)), key=len, default=None)
+    return prices.get(best) if best else None
+
+def _percentile(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(q / 100.0 * len(sorted_vals)) - 1))  # nearest-rank
+    return sorted_vals[k]
+
+class _Group:
+    __slots__ = ("calls", "errors", "cache_hits", "latencies", "input", "cached", "output", "reasoning", "cost", "retries")
+
+    def __init__(self):
+        self.calls = self.errors = self.cache_hits = self.retries = 0
+        self.latencies: List[float] = []
+        self.input = self.cached = self.output = self.reasoning = 0
+        self.cost = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "latency_ms": {"p50": _percentile(lat, 50), "p95": _percentile(lat, 95), "p99": _percentile(lat, 99)},
+            "tokens": {"input": self.input, "cached": self.cached, "output": self.output, "reasoning": self.reasoning},
+            "cost_usd": round(self.cost, 6),
+        }
+
+def aggregate(
+    events: Iterable[Dict[str, Any]],
+    *,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    by: Iterable[str] = DIMENSIONS,
+    prices: Optional[Dict[str, Dict[str, float]]] = None,
+) -> Dict[str, Any]:
+    by = [d for d in by if d in DIMENSIONS]
+    groups: Dict[str, Dict[str, _Group]] = {d: {} for d in by}
+    total = _Group()
+    last_model = None  # 예전 로그: 응답에 model 이 없으면 직전 요청의 model
+    for ev in events:
+        kind = ev.get("event")
+        if kind == "llm_request":
+            last_model = (ev.get("kwargs") or {}).get("model")
+            continue
+        if kind not in ("llm_response", "llm_error", "llm_cache"):
+            continue
+        try:
+            ts = datetime.fromisoformat(ev["ts"])
+        except (KeyError, ValueError):
+            continue
+        if (since and ts < since) or (until and ts > until):
+            continue
+        tags = ev.get("tags") or {}
+        model = ev.get("model") or last_model or "unknown"
+        keys = {"model": model, "kind": tags.get("kind") or "-", "prompt": tags.get("prompt_id") or "-"}
+        targets = [total] + [groups[d].setdefault(keys[d], _Group()) for d in by]
+        for g in targets:
+            if kind == "llm_error":
+                g.errors += 1
+            elif kind == "llm_cache":
+                g.cache_hits += ev.get("result") == "hit"
+            else:
+                _add_response(g, ev, model, prices or {})
+    return {"total": total.summary(), **{d: {k: g.summary() for k, g in groups[d].items()} for d in by}}
+
+def _add_response(g: _Group, ev: Dict[str, Any], model: str, prices: Dict[str, Dict[str, float]]) -> None:
+    usage = ev.get("usage") or {}
+    inp = usage.get("input_tokens") or 0
+    cached = (usage.get("input_tokens_details") or {}).get("cached_tokens") or 0
+    out = usage.get("output_tokens") or 0
+    g.calls += 1
+    g.retries += ev.get("retries") or 0
+    if ev.get("latency_ms") is not None:
+        g.latencies.append(ev["latency_ms"])
+    g.input += inp
+    g.cached += cached
+    g.output += out
+    g.reasoning += (usage.get("output_tokens_details") or {}).get("reasoning_tokens") or 0
+    price = price_for(model, prices)
+    if price:
+        g.cost += ((inp - cached) * price.get("input", 0)
+                   + cached * price.get("cached_input", price.get("input", 0))
+                   + out * price.get("output", 0)) / 1_000_000
+
+def format_report(report: Dict[str, Any]) -> str:
+    def fmt(v):
+        return "-" if v is None else f"{v:,.0f}"
+    head = f"{'':<38}{'calls':>7}{'err':>5}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'in_tok':>11}{'cached':>10}{'out_tok':>10}{'cost$':>10}"
+    out = []
+    def row(name, s):
+        lat, tok = s["latency_ms"], s["tokens"]
+        out.append(f"{name[:37]:<38}{s['calls']:>7}{s['errors']:>5}{fmt(lat['p50']):>9}{fmt(lat['p95']):>9}"
+                   f"{fmt(lat['p99']):>9}{tok['input']:>11,}{tok['cached']:>10,}{tok['output']:>10,}{s['cost_usd']:>10.4f}")
+    out.append(head)
+    row("TOTAL", report["total"])
+    for dim in DIMENSIONS:
+        if dim not in report:
+            continue
+        out.append(f"\n[by {dim}]")
+        out.append(head)
+        for name, s in sorted(report[dim].items(), key=lambda kv: -kv[1]["cost_usd"]):
+            row(name, s)
+    return "\n".join(out)
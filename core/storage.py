@@ -1,55 +1,459 @@
+import os
 import json
 import time
+import hashlib
+import threading
 import uuid
-from typing import Dict, List, Optional, Any, Iterable
-from .config import JSONL_PATH
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+from . import config
+from .delta import make_delta, apply_delta
+from .index import OffsetIndex
+from .archive import Archive, _fsync_dir
 
-def _read_lines() -> List[Dict[str, Any]]:
-    if not JSONL_PATH.exists():
-        return []
-    with JSONL_PATH.open("r", encoding="utf-8") as f:
-        return [json.loads(line) for line in f if line.strip()]
+try:
+    import fcntl
+except ImportError:  # Windows: 잠금 없이 동작
+    fcntl = None
 
-def _write_lines(rows: Iterable[Dict[str, Any]]) -> None:
-    with JSONL_PATH.open("w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+def _now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
+class StorageError(Exception):
+    pass
+
+# list 정렬 기준: 이름 → (요약 필드, 기본 내림차순 여부)
+SUMMARY_SORTS = {
+    "updated": ("updated_at", True),
+    "eval": ("last_eval_at", True),
+    "version": ("version", True),
+    "title": ("title", False),
+}
+
+def _page(rows: List[Dict[str, Any]], sort: str, reverse: bool, title_prefix: Optional[str],
+          limit: Optional[int], offset: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """요약 목록 → (전체 수, 한 페이지). 같은 값이면 prompt_id 순."""
+    field, desc = SUMMARY_SORTS[sort]
+    if title_prefix:
+        rows = [r for r in rows if (r.get("title") or "").startswith(title_prefix)]
+    rows = sorted(rows, key=lambda r: r["prompt_id"])
+    empty = 0 if field == "version" else ""  # None 자리 (빈 제목 "" 은 그대로 문자열로 비교)
+    rows.sort(key=lambda r: (r.get(field) is not None, empty if r.get(field) is None else r[field]),
+              reverse=desc != reverse)
+    return len(rows), rows[offset:offset + limit if limit else None]
+
+class Storage(ABC):
+    """
+    저장소 인터페이스.
+    - 레코드는 dict 그대로 저장/반환 (프롬프트 버전: record_type 없음, 평가: record_type="eval")
+    - save_new_version 은 버전 번호 할당과 기록을 원자적으로 처리해야 한다.
+    - @abstractmethod 는 백엔드가 반드시 구현 (빠지면 생성할 때 TypeError)
+    - mode="delta": 버전을 부모 대비 라인 델타로 저장하고 snapshot_every 버전마다 전체 내용을 저장.
+      읽을 때는 가까운 스냅샷부터 델타를 적용해 content 를 복원 (프로세스 내 LRU 캐시).
+    """
+    CACHE_SIZE = 256
+
+    def __init__(self, mode: str = "full", snapshot_every: int = 10):
+        if mode not in ("full", "delta"):
+            raise StorageError(f"알 수 없는 저장 방식: {mode} (full|delta)")
+        self.mode = mode
+        self.snapshot_every = max(1, snapshot_every)
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+    # ---------- 백엔드 구현 ----------
+    @abstractmethod
+    def _raw_version(self, prompt_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """저장된 그대로의 레코드 (델타 복원 전)."""
+        ...
+
+    @abstractmethod
+    def append_record(self, record: Dict[str, Any]) -> None:
+        ...
+
+    def append_records(self, records: List[Dict[str, Any]]) -> None:
+        """여러 레코드를 한 번에 기록 (백엔드가 한 번의 잠금/트랜잭션으로 처리)."""
+        for r in records:
+            self.append_record(r)
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        ...
+
+    def evals_for(self, prompt_id: str) -> List[Dict[str, Any]]:
+        """해당 프롬프트의 eval 레코드 (기록 순)."""
+        return [r for r in self.iter_records()
+                if r.get("record_type") == "eval" and r.get("prompt_id") == prompt_id]
+
+    @abstractmethod
+    def latest_by_id(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def all_versions(self, prompt_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def find_ids_by_title(self, title: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def save_new_version(self, prompt_id: str, title: str, content: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        ...
+
+    def save_new_prompts(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        새 프롬프트(v1) 여러 개를 한 번에 기록. items = [{"prompt_id", "title", "content", "meta"}].
+        이미 있는 prompt_id 는 건너뜀 (재실행해도 중복 없음). 기록한 레코드만 반환.
+        """
+        return [self.save_new_version(it["prompt_id"], it["title"], it["content"], it.get("meta"))
+                for it in items if self.latest_by_id(it["prompt_id"]) is None]
+
+    def summaries(self, *, sort: str = "updated", reverse: bool = False, title_prefix: Optional[str] = None,
+                  limit: Optional[int] = None, offset: int = 0) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        프롬프트별 요약 {"prompt_id","title","version","updated_at","last_eval_at","evals"} 한 페이지와 전체 수.
+        기본 구현은 전체 레코드를 훑는다 (백엔드가 유지하는 요약으로 재정의).
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for r in self.iter_records():
+            pid = r.get("prompt_id")
+            if r.get("record_type") in (None, "prompt"):
+                row = rows.setdefault(pid, {"prompt_id": pid, "version": 0, "evals": 0, "last_eval_at": None})
+                if r.get("version", 0) >= row["version"]:
+                    row.update(version=r.get("version", 0), title=r.get("title"), updated_at=r.get("created_at"))
+            elif r.get("record_type") == "eval" and pid in rows:
+                rows[pid]["evals"] += 1
+                rows[pid]["last_eval_at"] = r.get("created_at")
+        return _page(list(rows.values()), sort, reverse, title_prefix, limit, offset)
+
+    def get_version(self, prompt_id: str, version: int) -> Optional[Dict[str, Any]]:
+        rec = self._raw_version(prompt_id, version)
+        return self._materialize(rec) if rec else None
+
+    def records_since(self, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], str, bool]:
+        """
+        cursor 이후에 추가된 레코드(프롬프트는 content 복원), 새 cursor, reset 여부.
+        cursor 가 현재 저장소와 맞지 않으면(재작성 등) 처음부터 돌려주고 reset=True.
+        기본 구현은 레코드 수를 cursor 로 쓴다 (백엔드가 더 싸게 재정의).
+        """
+        seen = int(cursor) if cursor and cursor.isdigit() else 0
+        rows = list(self.iter_records())
+        reset = cursor is not None and seen > len(rows)
+        new = rows if reset else rows[seen:]
+        return [self._materialize_any(r) for r in new], str(len(rows)), reset
+
+    def _materialize_any(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        return self._materialize(rec) if rec.get("record_type") in (None, "prompt") else rec
+
+    def compact(self, **options) -> Dict[str, Any]:
+        raise StorageError(f"{type(self).__name__} 는 compact 를 지원하지 않음")
+
+    # ---------- 델타 인코딩/복원 ----------
+    def _remember(self, key: tuple, content: str) -> None:
+        self._cache[key] = content
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _encode(self, rec: Dict[str, Any], parent: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """rec(content 포함)를 저장용 레코드로. parent 는 복원된 직전 버전."""
+        self._remember((rec["prompt_id"], rec["version"]), rec["content"])
+        if self.mode != "delta" or parent is None or (rec["version"] - 1) % self.snapshot_every == 0:
+            return rec
+        ops = make_delta(parent["content"], rec["content"])
+        if len(json.dumps(ops, ensure_ascii=False)) >= len(rec["content"]):
+            return rec
+        stored = {k: v for k, v in rec.items() if k != "content"}
+        stored["delta"] = {"base": parent["version"], "ops": ops}
+        return stored
+
+    def _materialize(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        if "content" in rec or "delta" not in rec:
+            return rec
+        pid = rec["prompt_id"]
+        chain, text = [rec], None
+        while True:
+            base_v = chain[-1]["delta"]["base"]
+            text = self._cache.get((pid, base_v))
+            if text is not None:
+                break
+            base = self._raw_version(pid, base_v)
+            if base is None:
+                raise StorageError(f"델타 기준 버전이 없음: {pid} v{base_v}")
+            if "content" in base:
+                text = base["content"]
+                self._remember((pid, base_v), text)
+                break
+            chain.append(base)
+        for r in reversed(chain):
+            text = apply_delta(text, r["delta"]["ops"])
+            self._remember((pid, r["version"]), text)
+        rec["content"] = text
+        return rec
+
+# compact 가 쓰는 내부 레코드 (조회 결과에는 나오지 않음)
+#  {"record_type":"compact", ...}           : 재작성 표시 (첫 줄 → 인덱스/검색 cursor 가 재작성을 감지)
+#  {"record_type":"blob","hash":..,"content":..} : 여러 레코드가 공유하는 내용, 참조는 "<필드>_ref": hash
+INTERNAL_TYPES = ("compact", "blob")
+REF_FIELDS = ("content", "meta_prompt")
+
+class JsonlStorage(Storage):
+    """prompts.jsonl 한 파일 + 사이드카 오프셋 인덱스. 쓰기는 <log>.lock 파일 잠금으로 직렬화."""
+
+    def __init__(self, path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self.index = OffsetIndex(self.path, lock=self._locked)  # 인덱스 파일 쓰기도 같은 잠금 안에서
+        self.archive = Archive(self.path)
+
+    @contextmanager
+    def _locked(self):
+        """프로세스 간 파일 잠금. 같은 스레드에서 겹쳐 잡아도 됨 (쓰기 중 인덱스 갱신)."""
+        with self._rlock:
+            lf = None
+            if self._depth == 0 and fcntl is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                lf = self.lock_path.open("a")
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if lf is not None:
+                    fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+                    lf.close()
+
+    def _read_lines(self) -> List[Dict[str, Any]]:
+        return list(self.iter_records())
+
+    def _write_lines(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """로그 전체를 원자적으로 교체 (임시 파일 → fsync → rename). 잠금은 호출 측에서."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path.parent)
+
+    def _blob(self, h: str) -> str:
+        loc = self.index.blobs.get(h)
+        text = self.index.read([loc])[0]["content"] if loc else self.archive.blob(h)
+        if text is None:
+            raise StorageError(f"blob 없음: {h}")
+        return text
+
+    def _resolve(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        """compact 가 바꿔 둔 "<필드>_ref" 를 실제 내용으로."""
+        for field in REF_FIELDS:
+            ref = rec.pop(field + "_ref", None)
+            if ref is not None:
+                rec[field] = self._blob(ref)
+        return rec
+
+    def _read(self, locs: Iterable[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        return [self._resolve(r) for r in self.index.read(locs)]
+
+    def _append_unlocked(self, *records: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        index = self.index.refresh()
+        lines = []
+        for record in records:
+            record["created_at"] = _now_iso()
+            lines.append((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        with self.path.open("ab") as f:
+            offset = f.tell()
+            f.write(b"".join(lines))
+        for record, line in zip(records, lines):
+            index.add(offset, len(line), record)
+            offset += len(line)
+
+    def append_record(self, record: Dict[str, Any]) -> None:
+        with self._locked():
+            self._append_unlocked(record)
+
+    def append_records(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            with self._locked():
+                self._append_unlocked(*records)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """보관 세그먼트의 옛 버전 → 현재 로그 순."""
+        yield from self.archive.iter_records()
+        if not self.path.exists():
+            return
+        self.index.refresh()
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    if rec.get("record_type") not in INTERNAL_TYPES:
+                        yield self._resolve(rec)
+
+    def evals_for(self, prompt_id: str) -> List[Dict[str, Any]]:
+        index = self.index.refresh()
+        return self._read(index.evals.get(prompt_id, []))
+
+    def records_since(self, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], str, bool]:
+        # cursor = {"sig": 첫 줄 해시, "off": 읽은 바이트, "tail": 마지막으로 읽은 줄 해시, "tail_len": 그 길이}
+        try:
+            state = json.loads(cursor) if cursor else None
+        except ValueError:
+            state = None
+        sig = self.index._signature()
+        off, reset = 0, cursor is not None
+        if isinstance(state, dict) and state.get("sig") == sig and self.path.exists():
+            off, tail_len = int(state.get("off", 0)), int(state.get("tail_len", 0))
+            with self.path.open("rb") as f:
+                f.seek(max(0, off - tail_len))
+                tail = f.read(tail_len)
+            if tail_len <= off and hashlib.sha1(tail).hexdigest() == state.get("tail"):
+                reset = False
+            else:
+                off = 0
+        rows, tail = [], b""
+        if off == 0:
+            rows.extend(self.archive.iter_records())
+        if self.path.exists():
+            self.index.refresh()
+            with self.path.open("rb") as f:
+                f.seek(off)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # 쓰는 중인 마지막 줄은 다음에
+                    off += len(line)
+                    tail = line
+                    rec = json.loads(line) if line.strip() else {}
+                    if rec and rec.get("record_type") not in INTERNAL_TYPES:
+                        rows.append(self._materialize_any(self._resolve(rec)))
+        if not tail and not reset and isinstance(state, dict):
+            return rows, cursor, False
+        new = {"sig": sig, "off": off, "tail": hashlib.sha1(tail).hexdigest(), "tail_len": len(tail)}
+        return rows, json.dumps(new), reset
+
+    def _raw_version(self, prompt_id: str, version: int) -> Optional[Dict[str, Any]]:
+        loc = self.index.refresh().prompts.get(prompt_id, {}).get(version)
+        if loc:
+            return self._read([loc])[0]
+        archived = self.archive.read_versions(prompt_id, [version])
+        return archived[0] if archived else None
+
+    def latest_by_id(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        index = self.index.refresh()
+        hit = index.latest(prompt_id)
+        if not hit:
+            return None
+        return self._materialize(self._read([hit[1]])[0])
+
+    def all_versions(self, prompt_id: str) -> List[Dict[str, Any]]:
+        index = self.index.refresh()
+        live = index.versions(prompt_id)
+        have = {v for v, _ in live}
+        archived = [r for r in self.archive.read_versions(prompt_id) if r["version"] not in have]
+        return archived + [self._materialize(r) for r in self._read(loc for _, loc in live)]
+
+    def compact(self, **options) -> Dict[str, Any]:
+        from .compact import compact_jsonl
+        return compact_jsonl(self, **options)
+
+    def find_ids_by_title(self, title: str) -> List[str]:
+        return self.index.refresh().ids_by_title(title)
+
+    def save_new_version(self, prompt_id: str, title: str, content: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        with self._locked():
+            hit = self.index.refresh().latest(prompt_id)
+            # 델타 저장일 때만 부모 내용을 복원
+            parent = self.latest_by_id(prompt_id) if hit and self.mode == "delta" else None
+            rec = {
+                "prompt_id": prompt_id,
+                "version": hit[0] + 1 if hit else 1,
+                "title": title,
+                "content": content,
+                "meta": meta or {},
+            }
+            stored = self._encode(rec, parent)
+            self._append_unlocked(stored)
+            rec["created_at"] = stored["created_at"]
+        return rec
+
+    def summaries(self, *, sort: str = "updated", reverse: bool = False, title_prefix: Optional[str] = None,
+                  limit: Optional[int] = None, offset: int = 0) -> Tuple[int, List[Dict[str, Any]]]:
+        # 인덱스가 append 마다 갱신하는 요약 → 로그를 읽지 않음
+        total, page = _page(list(self.index.refresh().summary.values()), sort, reverse, title_prefix, limit, offset)
+        return total, [dict(r) for r in page]
+
+    def save_new_prompts(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._locked():
+            index, seen, out = self.index.refresh(), set(), []
+            for it in items:
+                if it["prompt_id"] in seen or index.latest(it["prompt_id"]):
+                    continue
+                seen.add(it["prompt_id"])
+                out.append({"prompt_id": it["prompt_id"], "version": 1, "title": it["title"],
+                            "content": it["content"], "meta": it.get("meta") or {}})
+            if out:
+                self._append_unlocked(*[self._encode(rec, None) for rec in out])
+        return out
+
+def open_storage(backend: str, path: Optional[Path] = None) -> Storage:
+    opts = {"mode": config.STORAGE_MODE, "snapshot_every": config.SNAPSHOT_EVERY}
+    if backend == "jsonl":
+        return JsonlStorage(path or config.JSONL_PATH, **opts)
+    if backend == "sqlite":
+        from .sqlite_store import SqliteStorage
+        return SqliteStorage(path or config.SQLITE_PATH, **opts)
+    raise StorageError(f"알 수 없는 저장소 백엔드: {backend} (jsonl|sqlite)")
+
+_storage: Optional[Storage] = None
+
+def get_storage() -> Storage:
+    """SPARKLING_STORAGE 설정에 따른 프로세스 공용 저장소."""
+    global _storage
+    if _storage is None:
+        _storage = open_storage(config.STORAGE_BACKEND)
+    return _storage
+
+# ---------- 모듈 함수 (기존 호출부 호환) ----------
 def append_record(record: Dict[str, Any]) -> None:
-    record["created_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-    with JSONL_PATH.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    get_storage().append_record(record)
 
 def list_prompts() -> List[Dict[str, Any]]:
-    return _read_lines()
+    return list(get_storage().iter_records())
 
 def latest_by_id(prompt_id: str) -> Optional[Dict[str, Any]]:
-    rows = [r for r in _read_lines() if r.get("prompt_id") == prompt_id]
-    if not rows:
-        return None
-    return max(rows, key=lambda r: r.get("version", 0))
+    return get_storage().latest_by_id(prompt_id)
 
 def all_versions(prompt_id: str) -> List[Dict[str, Any]]:
-    rows = [r for r in _read_lines() if r.get("prompt_id") == prompt_id]
-    return sorted(rows, key=lambda r: r.get("version", 0))
+    return get_storage().all_versions(prompt_id)
+
+def get_version(prompt_id: str, version: int) -> Optional[Dict[str, Any]]:
+    return get_storage().get_version(prompt_id, version)
 
 def find_ids_by_title(title: str) -> List[str]:
-    rows = _read_lines()
-    ids = {r["prompt_id"] for r in rows if r.get("title") == title}
-    return sorted(ids)
+    return get_storage().find_ids_by_title(title)
+
+def append_records(records: List[Dict[str, Any]]) -> None:
+    get_storage().append_records(records)
+
+def evals_for(prompt_id: str) -> List[Dict[str, Any]]:
+    return get_storage().evals_for(prompt_id)
+
+def save_new_prompts(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return get_storage().save_new_prompts(items)
+
+def list_summaries(**options) -> Tuple[int, List[Dict[str, Any]]]:
+    return get_storage().summaries(**options)
 
 def new_prompt_id() -> str:
     return str(uuid.uuid4())
 
 def save_new_version(prompt_id: str, title: str, content: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    rows = [r for r in _read_lines() if r.get("prompt_id") == prompt_id]
-    version = (max([r.get("version", 0) for r in rows]) + 1) if rows else 1
-    rec = {
-        "prompt_id": prompt_id,
-        "version": version,
-        "title": title,
-        "content": content,
-        "meta": meta or {},
-    }
-    append_record(rec)
-    return rec
+    return get_storage().save_new_version(prompt_id, title, content, meta)
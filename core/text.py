@@ -0,0 +1,18 @@
+import re
+from typing import List
+
+"""
+텍스트 토큰화 (검색 색인과 평가 제안 묶기가 같이 씀 — 가벼운 모듈, sqlite/저장소 import 없음)
+- 영문/숫자는 단어(소문자), 한글은 2글자 n-gram (한 글자 단어는 그대로)
+"""
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]+|[가-힣]+")
+
+def tokenize(text: str) -> List[str]:
+    out: List[str] = []
+    for run in _TOKEN_RE.findall(text.lower()):
+        if "가" <= run[0] <= "힣" and len(run) > 1:
+            out.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            out.append(run)
+    return out
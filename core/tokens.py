@@ -0,0 +1,84 @@
+import json
+import math
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Any, List, Optional
+
+"""
+토큰 예산 (core/llm.chat 이 호출 전에 사용)
+- estimate_tokens: 토크나이저 없이 어림 — ASCII 4자 ≈ 1토큰, 한글 등 그 밖의 글자 1자 ≈ 0.7토큰 (조금 크게 잡는 쪽)
+- UsageHistory: llm.jsonl 의 llm_response 에서 kind(define/eval…)별 최근 output_tokens 를 모음
+  (처음엔 로그 끝부분만 읽고, 이후엔 늘어난 부분만 이어 읽음)
+- output_budget: 최근 출력 토큰 p95 × 여유율 — 호출부 기본값보다 작아지지는 않음
+"""
+
+MESSAGE_OVERHEAD = 4      # 메시지마다 role/구분자
+HISTORY_SIZE = 200        # kind 별로 기억할 최근 응답 수
+MIN_SAMPLES = 5           # 이보다 적으면 호출부 기본값 그대로
+HEADROOM = 1.3
+TAIL_BYTES = 4 * 1024 * 1024
+
+def estimate_tokens(text: str) -> int:
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) * 0.7)
+
+def estimate_messages(messages: List[Dict[str, Any]]) -> int:
+    total = 0
+    for m in messages:
+        content = m.get("content")
+        total += MESSAGE_OVERHEAD + estimate_tokens(content if isinstance(content, str) else json.dumps(content))
+    return total
+
+class UsageHistory:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.offset: Optional[int] = None
+        self.outputs: Dict[str, Deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def _scan(self) -> None:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if self.offset is None or size < self.offset:  # 처음 / 회전됨
+            start = max(0, size - TAIL_BYTES) if self.offset is None else 0
+        else:
+            start = self.offset
+        if start == size:
+            return
+        with self.path.open("rb") as f:
+            f.seek(start)
+            if start and self.offset is None:
+                start += len(f.readline())  # 중간에서 시작 → 잘린 첫 줄 버림
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # 아직 쓰는 중인 줄
+                start += len(raw)
+                if b'"llm_response"' in raw:
+                    self._add(raw)
+        self.offset = start
+
+    def _add(self, raw: bytes) -> None:
+        try:
+            ev = json.loads(raw)
+        except ValueError:
+            return
+        kind = (ev.get("tags") or {}).get("kind")
+        out = (ev.get("usage") or {}).get("output_tokens")
+        if ev.get("event") == "llm_response" and kind and isinstance(out, int):
+            self.outputs.setdefault(kind, deque(maxlen=HISTORY_SIZE)).append(out)
+
+    def output_tokens(self, kind: str) -> List[int]:
+        with self._lock:
+            self._scan()
+            return list(self.outputs.get(kind, ()))
+
+def output_budget(history: UsageHistory, kind: Optional[str], default: int, cap: int) -> int:
+    """kind 의 최근 출력 토큰 p95 × HEADROOM (기록이 적으면 default). default ≤ 결과 ≤ cap."""
+    samples = sorted(history.output_tokens(kind)) if kind else []
+    if len(samples) < MIN_SAMPLES:
+        return default
+    p95 = samples[max(0, math.ceil(0.95 * len(samples)) - 1)]
+    return max(default, min(cap, math.ceil(p95 * HEADROOM)))
@@ -0,0 +1,73 @@
+import re
+from typing import List, Dict, Any, Sequence
+from core.text import tokenize
+
+"""
+여러 평가 샘플의 제안 모으기 (eval --samples N)
+- 샘플마다 제안 단위로 자름: 목록 항목(-, *, 1.) 하나 = 제안 하나 (목록이 없으면 문단 단위)
+- 비슷한 제안끼리 묶음: 토큰(영문 단어 + 한글 bigram, 영문 불용어 제외) 집합의 Jaccard 유사도 ≥ threshold
+- 순위: 몇 개의 샘플에서 나왔는지(support) → 처음 나온 순서
+"""
+
+THRESHOLD = 0.4
+_STOP = set("a an the to of in on for and or with that this it is are be as at by from so into".split())
+
+_ITEM_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+_HEADER_RE = re.compile(r"^\s*(#+\s|\*\*[^*]+\*\*:?\s*$|[^\s].{0,60}:\s*$)")
+
+def split_suggestions(text: str) -> List[str]:
+    items: List[str] = []
+    current: List[str] = []
+    for line in text.splitlines():
+        item = _ITEM_RE.match(line)
+        if item or not line.strip() or (not current and _HEADER_RE.match(line)):
+            if current:
+                items.append(" ".join(current))
+            current = [line[item.end():].strip()] if item else []
+        else:
+            current.append(line.strip())  # 목록 항목/문단의 이어지는 줄
+    if current:
+        items.append(" ".join(current))
+    return [s for s in items if tokenize(s)]
+
+def _tokens(text: str) -> set:
+    return {t for t in tokenize(text) if t not in _STOP}
+
+def similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def cluster_suggestions(samples: Sequence[str], threshold: float = THRESHOLD) -> List[Dict[str, Any]]:
+    """[{"text": 대표 제안, "support": 나온 샘플 수, "samples": [샘플 번호], "variants": [같은 묶음의 제안들]}]"""
+    clusters: List[Dict[str, Any]] = []
+    for i, text in enumerate(samples):
+        for s in split_suggestions(text):
+            toks = _tokens(s)
+            best, best_sim = None, threshold
+            for c in clusters:
+                sim = max(similarity(toks, t) for t in c["_tokens"])
+                if sim >= best_sim:
+                    best, best_sim = c, sim
+            if best is None:
+                best = {"_tokens": [], "variants": [], "samples": []}
+                clusters.append(best)
+            best["_tokens"].append(toks)
+            best["variants"].append(s)
+            if i not in best["samples"]:
+                best["samples"].append(i)
+    out = []
+    for order, c in enumerate(clusters):
+        # 대표 = 같은 묶음의 다른 제안들과 가장 비슷한 것
+        toks = c.pop("_tokens")
+        k = max(range(len(toks)), key=lambda j: (sum(similarity(toks[j], t) for t in toks), -j))
+        out.append({"text": c["variants"][k], "support": len(c["samples"]), "samples": c["samples"],
+                    "variants": c["variants"], "_order": order})
+    out.sort(key=lambda c: (-c["support"], c["_order"]))
+    for c in out:
+        del c["_order"]
+    return out
+
+def format_report(clusters: List[Dict[str, Any]], n_samples: int) -> str:
+    lines = [f"# 제안 ({n_samples}개 샘플, 반복된 순)"]
+    for k, c in enumerate(clusters, 1):
+        lines.append(f"{k}. [{c['support']}/{n_samples}] {c['text']}")
+    return "\n".join(lines)
@@ -5,11 +5,10 @@ SYSTEM_ROLE = (
     "Developer: You are a world-class prompt engineer. Your objective is to create execution-ready prompts that reliably guide another AI model. The prompts should be concrete, minimal, and actionable."
 )
 
+# 프롬프트 캐시(prefix caching)가 적중하도록: 정적인 지시문을 앞에, 사용자 목표는 맨 끝에 둔다.
+# USER_TEMPLATE 에서 {goal} 앞부분은 호출마다 바이트 단위로 동일해야 함.
 USER_TEMPLATE = """# Role and Objective
-Act as a world-class Prompt Architect. Your task is to produce ONE execution-ready prompt that enables another AI (the "Executor") to accomplish the specified goal with high reliability.
-
-# Specified Goal
-{goal}
+Act as a world-class Prompt Architect. Your task is to produce ONE execution-ready prompt that enables another AI (the "Executor") to accomplish the specified goal with high reliability. The goal is given at the end, under "# Specified Goal".
 
 Begin with a concise checklist (3–7 bullets) of the critical sub-tasks you will follow; keep items conceptual, not implementation-level.
 
@@ -34,15 +33,19 @@ After producing your prompt, validate in 1–2 lines that it directly addresses
 - Output a single fenced code block using markdown (```).
 - Inside this code block, provide the final, execution-ready prompt as it should be presented to another model.
 - Do not include explanations, comments, or additional formatting—only the prompt text within the code block.
+
+# Specified Goal
+{goal}
 """
 
+MAX_TOKENS = 2000  # 출력 한도 기본값 (같은 kind 기록이 쌓이면 chat 이 늘림)
 _CODEBLOCK_RE = re.compile(r"```(?:[^\n]*)\n(.*?)```", re.S)
 
 def _extract_codeblock(text: str) -> str:
     m = _CODEBLOCK_RE.search(text)
     return m.group(1).strip() if m else text.strip()
 
-def make_draft(goal: str, *, model=None, temperature=None, reasoning_effort="low") -> str:
+def make_draft(goal: str, *, model=None, temperature=None, reasoning_effort="low", on_delta=None) -> str:
     messages = [
         {"role": "system", "content": SYSTEM_ROLE},
         {"role": "user", "content": USER_TEMPLATE.format(goal=goal.strip())},
@@ -51,7 +54,9 @@ def make_draft(goal: str, *, model=None, temperature=None, reasoning_effort="low
         messages=messages,
         model=model or "gpt-5",
         temperature=temperature,  
-        max_tokens=2000,
+        max_tokens=MAX_TOKENS,
         reasoning_effort="low",
+        on_delta=on_delta,
+        cache_key="sparkling-define-v1",
     )
     return _extract_codeblock(raw)
\ No newline at end of file
@@ -1,28 +1,82 @@
 # prompts/eval.py
 import re
-from typing import Optional, Dict, Any
-from core.llm import chat
+import difflib
+import contextvars
+from typing import Optional, Dict, Any, Callable, Tuple
+from core import config
+from core.llm import chat, log_context
 
-META_TEMPLATE = """When asked to optimize prompts, give answers from your own perspective - explain what specific phrases could be added to, or deleted from, this prompt to more consistently elicit the desired behavior or prevent the undesired behavior.
+# 프롬프트 캐시(prefix caching)가 적중하도록: 정적인 지시문(META_INSTRUCTIONS)을 앞에,
+# 평가 대상 프롬프트/desired/undesired(META_INPUT)는 뒤에 붙인다.
+META_INSTRUCTIONS = """When asked to optimize prompts, give answers from your own perspective - explain what specific phrases could be added to, or deleted from, this prompt to more consistently elicit the desired behavior or prevent the undesired behavior.
 
+Below you will find a prompt, the behavior desired from it, and the undesired behavior it shows instead. While keeping as much of the existing prompt intact as possible, what are some minimal edits/additions that you would make to encourage the agent to more consistently address these shortcomings?
+"""
+
+META_INPUT = """
 Here's a prompt:
 [PROMPT]
 
-The desired behavior from this prompt is for the agent to [{DESIRED}], but instead it [{UNDESIRED}]. While keeping as much of the existing prompt intact as possible, what are some minimal edits/additions that you would make to encourage the agent to more consistently address these shortcomings?
+The desired behavior from this prompt is for the agent to [{DESIRED}], but instead it [{UNDESIRED}].
 """
 
+META_TEMPLATE = META_INSTRUCTIONS + META_INPUT
+
+# 증분 평가: 직전 평가(같은 desired/undesired) 이후 바뀐 줄(diff)과 그때의 피드백만 보낸다
+META_INCREMENTAL_INPUT = """
+You already reviewed an earlier version (v{BASE}) of this prompt and suggested:
+[PRIOR_FEEDBACK]
+
+Since then the prompt was changed as follows (unified diff against the reviewed version):
+[DIFF]
+
+The desired behavior from this prompt is for the agent to [{DESIRED}], but instead it [{UNDESIRED}].
+Taking these changes into account, say which of your earlier suggestions are now addressed, and what minimal edits/additions are still needed.
+"""
+
+SYSTEM_ROLE = "You are an expert prompt engineer. Be concrete, minimal, and actionable."
+MAX_TOKENS = 800  # 출력 한도 기본값 (같은 kind 기록이 쌓이면 chat 이 늘림)
+
 def extract_goal_from_content(content: str) -> Optional[str]:
     # "# 목표" 섹션 ~ 다음 헤더 전까지를 긁어온다.
     m = re.search(r"#\s*목표\s*\n(.*?)(?=\n#\s|\Z)", content, flags=re.S)
     return m.group(1).strip() if m else None
 
 def build_meta_prompt(prompt_text: str, desired: str, undesired: str) -> str:
-    return (
-        META_TEMPLATE
-        .replace("PROMPT", prompt_text.strip())
+    # desired/undesired 를 먼저 채우고 프롬프트 본문은 마지막에 (본문 안의 "{DESIRED}" 등이 치환되지 않도록)
+    tail = (
+        META_INPUT
         .replace("{DESIRED}", desired.strip())
         .replace("{UNDESIRED}", undesired.strip())
+        .replace("[PROMPT]", "[" + prompt_text.strip() + "]", 1)
     )
+    return META_INSTRUCTIONS + tail
+
+def prompt_diff(old: str, new: str, context: int = 1) -> Tuple[str, float]:
+    """(unified diff, 바뀐 줄 비율). 내용이 같으면 ("", 0.0)."""
+    a, b = old.strip().splitlines(), new.strip().splitlines()
+    sm = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    changed = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in sm.get_opcodes() if tag != "equal")
+    diff = "\n".join(difflib.unified_diff(a, b, "reviewed", "current", n=context, lineterm=""))
+    return diff, changed / max(len(a), len(b), 1)
+
+def build_incremental_meta_prompt(
+    prev_text: str, prompt_text: str, prior_feedback: str, base_version: int, desired: str, undesired: str,
+    max_change: float,
+) -> Optional[str]:
+    """바뀐 줄이 max_change 비율을 넘거나 바뀐 게 없으면 None (전체 평가)."""
+    diff, ratio = prompt_diff(prev_text, prompt_text)
+    if not diff or ratio > max_change:
+        return None
+    tail = (
+        META_INCREMENTAL_INPUT
+        .replace("{BASE}", str(base_version))
+        .replace("{DESIRED}", desired.strip())
+        .replace("{UNDESIRED}", undesired.strip())
+    )
+    # 피드백/diff 본문은 한 번에 치환 (서로의 본문 안 자리표시자가 다시 치환되지 않도록)
+    bodies = {"PRIOR_FEEDBACK": "[" + prior_feedback.strip() + "]", "DIFF": diff}
+    return META_INSTRUCTIONS + re.sub(r"\[(PRIOR_FEEDBACK|DIFF)\]", lambda m: bodies[m.group(1)], tail, count=2)
 
 def run_llm_eval(
     prompt_text: str,
@@ -31,20 +85,68 @@ def run_llm_eval(
     *,
     model: Optional[str] = None,
     temperature: float = 0.2,
-    max_tokens: int = 800,
+    max_tokens: int = MAX_TOKENS,
+    on_delta: Optional[Callable[[str], None]] = None,
+    previous: Optional[Dict[str, Any]] = None,
+    max_change: Optional[float] = None,
+    samples: int = 1,
 ) -> Dict[str, Any]:
+    """
+    previous: 직전 평가 {"version", "content", "llm_output", "desired", "undesired"}.
+    desired/undesired 가 같고 바뀐 줄이 max_change(기본 EVAL_MAX_CHANGE) 이하이며 더 짧아지면 증분 평가.
+    samples > 1: 같은 메타 프롬프트로 동시에 여러 번 호출 → 비슷한 제안끼리 묶어 반복 횟수 순으로 정리
+    (llm_output = 정리된 제안, "samples" = 개별 응답, "suggestions" = 묶음)
+    """
     d = (desired or "").strip()
     if not d:
         # 본문에서 목표 자동 추출(없으면 LLM이 추론하도록 힌트)
         d = extract_goal_from_content(prompt_text) or "the intended goal stated in the '# 목표' section (not found; infer best you can)"
     meta_prompt = build_meta_prompt(prompt_text, d, undesired)
+    mode, base_version = "full", None
+    if (previous and previous.get("llm_output") and (previous.get("desired") or "").strip() == d
+            and (previous.get("undesired") or "").strip() == undesired.strip()):
+        inc = build_incremental_meta_prompt(
+            previous["content"], prompt_text, previous["llm_output"], previous["version"], d, undesired,
+            config.EVAL_MAX_CHANGE if max_change is None else max_change,
+        )
+        if inc and len(inc) < len(meta_prompt):
+            meta_prompt, mode, base_version = inc, "incremental", previous["version"]
 
-    system = {"role": "system", "content": "You are an expert prompt engineer. Be concrete, minimal, and actionable."}
+    system = {"role": "system", "content": SYSTEM_ROLE}
     user = {"role": "user", "content": meta_prompt}
-    output = chat([system, user], model=model, temperature=temperature, max_tokens=max_tokens)
-
-    return {
+    result = {
         "meta_prompt": meta_prompt,
-        "llm_output": output,
         "desired_used": d,
+        "mode": mode,
+        "base_version": base_version,
     }
+    if samples <= 1:
+        result["llm_output"] = chat([system, user], model=model, temperature=temperature, max_tokens=max_tokens,
+                                    on_delta=on_delta, cache_key="sparkling-eval-v1")
+        return result
+    if on_delta:
+        raise ValueError("samples > 1 이면 스트리밍할 수 없음")
+
+    from core.batch import run_batch
+    from prompts.aggregate import cluster_suggestions, format_report
+
+    def one(i: int) -> str:
+        with log_context(sample=i):
+            return chat([system, user], model=model, temperature=temperature, max_tokens=max_tokens,
+                        cache_key="sparkling-eval-v1", sample=i)
+
+    # 스레드 풀에는 contextvars(log_context 태그)가 넘어가지 않음 → 샘플마다 복사본에서 실행
+    contexts = {i: contextvars.copy_context() for i in range(samples)}
+    done = sorted(run_batch(range(samples), lambda i: contexts[i].run(one, i), concurrency=samples),
+                  key=lambda r: r[0])
+    outputs = [out for _, out, err in done if err is None]
+    if not outputs:
+        raise done[0][2]
+    clusters = cluster_suggestions(outputs)
+    result.update({
+        "llm_output": format_report(clusters, len(outputs)),
+        "samples": outputs,
+        "samples_failed": [str(err) for _, _, err in done if err is not None],
+        "suggestions": clusters,
+    })
+    return result
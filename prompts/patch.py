@@ -0,0 +1,110 @@
+from typing import List, Dict, Any, Optional, Tuple, Sequence, TypeVar
+
+"""
+패치 엔진 (라인 기반, prompts/edit.py 의 set/insert/delete 규칙)
+- 모든 op 의 라인 번호는 '원본' 기준 → 정렬/순서와 무관하게 한 번의 선형 패스로 적용 (O(라인 + op))
+- 같은 라인의 insert 는 패치에 적힌 순서대로, 그 라인 '앞'에 들어감 (삭제/교체되는 라인이어도 위치 유지)
+- 범위를 벗어난 op, 같은 라인의 set/delete 충돌은 건너뛰지 않고 PatchError 로 보고
+- compose(): 연속된 패치(meta.edits)를 원본 기준의 패치 하나로 합침
+"""
+
+T = TypeVar("T")
+
+class PatchError(ValueError):
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+def _index(patch: Sequence[Dict[str, Any]], n_lines: int):
+    """패치 → (라인별 insert 목록, 라인별 set/delete). 문제가 있으면 PatchError."""
+    inserts: Dict[int, List[str]] = {}
+    changes: Dict[int, Tuple[str, Optional[str]]] = {}
+    problems: List[str] = []
+    if not isinstance(patch, (list, tuple)):
+        raise PatchError([f"패치가 목록이 아님 ({type(patch).__name__})"])
+    for k, e in enumerate(patch):
+        if not isinstance(e, dict):
+            problems.append(f"#{k}: 객체가 아님")
+            continue
+        op, line = e.get("op"), e.get("line")
+        if op not in ("set", "insert", "delete"):
+            problems.append(f"#{k}: 알 수 없는 op {op!r}")
+            continue
+        if not isinstance(line, int) or isinstance(line, bool):
+            problems.append(f"#{k}: line 이 정수가 아님 ({line!r})")
+            continue
+        hi = n_lines + 1 if op == "insert" else n_lines
+        if not 1 <= line <= hi:
+            problems.append(f"#{k}: {op} line {line} 범위 밖 (1..{hi})")
+            continue
+        if op == "insert":
+            inserts.setdefault(line, []).append(e.get("text", ""))
+        elif line in changes:
+            problems.append(f"#{k}: line {line} 에 {changes[line][0]} 와 {op} 충돌")
+        else:
+            changes[line] = (op, e.get("text", "") if op == "set" else None)
+    if problems:
+        raise PatchError(problems)
+    return inserts, changes
+
+def _apply(items: List[T], patch: Sequence[Dict[str, Any]], new_item, set_item=None) -> List[T]:
+    """items 에 패치 적용. new_item(text): 삽입 라인, set_item(old, text): 교체 라인 (기본은 new_item)."""
+    set_item = set_item or (lambda old, text: new_item(text))
+    inserts, changes = _index(patch, len(items))
+    out: List[T] = []
+    for line in range(1, len(items) + 2):
+        for text in inserts.get(line, ()):
+            out.append(new_item(text))
+        if line > len(items):
+            break
+        op, text = changes.get(line, (None, None))
+        if op is None:
+            out.append(items[line - 1])
+        elif op == "set":
+            out.append(set_item(items[line - 1], text))
+    return out
+
+def validate(patch: Sequence[Dict[str, Any]], n_lines: int) -> List[str]:
+    """문제 목록 (비어 있으면 적용 가능)."""
+    try:
+        _index(patch, n_lines)
+    except PatchError as e:
+        return e.problems
+    return []
+
+def apply_patch(content: str, patch: Sequence[Dict[str, Any]]) -> str:
+    return "\n".join(_apply(content.splitlines(), patch, lambda t: t))
+
+def apply_mapped(lines: List[str], patch: Sequence[Dict[str, Any]]) -> List[Tuple[str, Optional[int]]]:
+    """결과 라인마다 (텍스트, 원본 라인 인덱스 0-based | 새로 생긴 라인이면 None)."""
+    return _apply([(t, i) for i, t in enumerate(lines)], patch, lambda t: (t, None))
+
+def compose(patches: Sequence[Sequence[Dict[str, Any]]], n_lines: int) -> List[Dict[str, Any]]:
+    """
+    n_lines 줄짜리 원본에 patches 를 차례로 적용한 것과 같은 결과를 내는 패치 하나.
+    중간 단계의 라인 번호를 원본 기준으로 되돌려 set/insert/delete 로 다시 씀.
+    """
+    # 항목: ("orig", 원본 라인번호, 교체 텍스트 | None) 또는 ("new", None, 텍스트)
+    items: List[Tuple[str, Optional[int], Optional[str]]] = [("orig", i, None) for i in range(1, n_lines + 1)]
+    for i, p in enumerate(patches):
+        try:
+            items = _apply(items, p, lambda t: ("new", None, t),
+                           lambda old, t: (old[0], old[1], t) if old[0] == "orig" else ("new", None, t))
+        except PatchError as e:
+            raise PatchError([f"patch {i}: {msg}" for msg in e.problems])
+
+    out: List[Dict[str, Any]] = []
+    kept = set()
+    prev = 0  # 직전에 남아 있는 원본 라인
+    for kind, line, text in items:
+        if kind == "new":
+            # prev 다음 라인 앞에 삽입 (prev+1 ~ 다음 원본 라인 사이는 모두 삭제된 라인)
+            out.append({"op": "insert", "line": prev + 1, "text": text})
+            continue
+        kept.add(line)
+        if text is not None:
+            out.append({"op": "set", "line": line, "text": text})
+        prev = line
+    out.extend({"op": "delete", "line": line} for line in range(1, n_lines + 1) if line not in kept)
+    out.sort(key=lambda e: (e["line"], e["op"] != "insert"))  # 안정 정렬: 같은 라인 insert 순서 유지
+    return out
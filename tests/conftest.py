@@ -0,0 +1,29 @@
+import json
+import pytest
+from core import llm
+
+@pytest.fixture
+def replay_llm(monkeypatch, tmp_path):
+    """
+    오프라인 LLM (replay 백엔드). use("응답1", "응답2", ...) 로 돌려줄 응답을 정하면
+    요청 내용과 상관없이 차례로 돌려준다 (SPARKLING_LLM_REPLAY_MATCH=any 와 같음).
+    """
+    fixtures = tmp_path / "llm_fixtures.jsonl"
+
+    def use(*texts):
+        with fixtures.open("w", encoding="utf-8") as f:
+            for i, text in enumerate(texts):
+                f.write(json.dumps({"event": "llm_request", "req_id": f"r{i}", "kwargs": {}}) + "\n")
+                f.write(json.dumps({"event": "llm_response", "req_id": f"r{i}", "text": text,
+                                    "usage": {"input_tokens": 10, "output_tokens": 5}}, ensure_ascii=False) + "\n")
+        monkeypatch.setattr(llm, "_client", None)
+
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "0")
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "off")
+    monkeypatch.setattr(llm.config, "LLM_BACKEND", "replay")
+    monkeypatch.setattr(llm.config, "LLM_FIXTURES", fixtures)
+    monkeypatch.setattr(llm.config, "LLM_REPLAY_MATCH", "any")
+    monkeypatch.setattr(llm.config, "LLM_REPLAY_LATENCY", "0")
+    monkeypatch.setattr(llm.config, "LLM_LOG_PATH", tmp_path / "llm.jsonl")
+    yield use
+    llm._client = None
@@ -0,0 +1,129 @@
+import json
+import os
+import signal
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import cli
+import core.storage as storage
+import prompts.define
+import prompts.eval
+from core.batch import BatchInterrupted, RateLimiter, run_batch
+
+def test_run_batch_reports_failures_without_aborting():
+    def fn(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x * 2
+    res = run_batch(range(6), fn, concurrency=3)
+    assert sorted(r for _, r, e in res if e is None) == [0, 2, 4, 8, 10]
+    assert [str(e) for _, _, e in res if e is not None] == ["boom"]
+
+def _ctrl_c_after(seconds):
+    """seconds 뒤 메인 스레드에 SIGINT (실제 Ctrl-C 와 같은 경로)."""
+    t = threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGINT))
+    t.start()
+    return t
+
+def test_run_batch_interrupt_cancels_queued_jobs():
+    calls, seen = [], []
+    def fn(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x
+    _ctrl_c_after(0.25)
+    t0 = time.monotonic()
+    with pytest.raises(BatchInterrupted) as ei:
+        run_batch(range(20), fn, concurrency=2, on_done=seen.append)
+    assert time.monotonic() - t0 < 0.6
+    time.sleep(0.3)
+    assert sorted(calls) == sorted(r for _, r, _ in ei.value.results)  # 실행 중이던 호출의 결과도 넘김
+    assert len(seen) == len(calls) and ei.value.pending == 20 - len(calls) and len(calls) <= 6
+
+def test_rate_limiter_spaces_requests():
+    lim = RateLimiter(rpm=600)  # 버킷 600 → 처음엔 바로 통과
+    lim._req = 0
+    t0 = time.monotonic()
+    lim.acquire()
+    assert time.monotonic() - t0 >= 0.09
+
+def test_eval_batch_skips_done_items(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    calls = []
+    def fake_eval(prompt_text, desired, undesired, **kw):
+        calls.append(undesired)
+        if undesired == "bad":
+            raise RuntimeError("LLM down")
+        return {"meta_prompt": "m", "llm_output": "fix it", "desired_used": desired or ""}
+    monkeypatch.setattr(prompts.eval, "run_llm_eval", fake_eval)
+    rec = storage.save_new_version(storage.new_prompt_id(), "T", "hello", meta={"goal": "g"})
+    manifest = tmp_path / "m.jsonl"
+    manifest.write_text("\n".join(json.dumps(x) for x in [
+        {"title": "T", "undesired": "u1"},
+        {"id": rec["prompt_id"], "version": 1, "undesired": "bad"},
+        {"title": "missing", "undesired": "u"},
+    ]) + "\n", encoding="utf-8")
+    args = SimpleNamespace(manifest=str(manifest), concurrency=2, rpm=None, tpm=None,
+                           model=None, temperature=None, flush_every=20)
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "1")
+    with pytest.raises(SystemExit):
+        cli.cmd_eval_batch(args)
+    assert os.environ["LLM_LOG_CONSOLE"] == "1"  # 배치 동안만 끔
+    assert [e["llm_output"] for e in storage.evals_for(rec["prompt_id"])] == ["fix it"]
+    calls.clear()
+    with pytest.raises(SystemExit):
+        cli.cmd_eval_batch(args)
+    assert calls == ["bad"]
+
+def test_define_from_file_resumes(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    calls, down = [], {"g2"}
+    def fake_draft(goal, **kw):
+        calls.append(goal)
+        if goal in down:
+            raise RuntimeError("LLM down")
+        return f"# 목표\n{goal}"
+    monkeypatch.setattr(prompts.define, "make_draft", fake_draft)
+    goals = tmp_path / "goals.jsonl"
+    goals.write_text("\n".join(json.dumps({"title": f"T{i}", "goal": f"g{i}"}) for i in range(3)) + "\n{bad\n",
+                     encoding="utf-8")
+    args = SimpleNamespace(from_file=str(goals), concurrency=3, rpm=None, tpm=None, model=None, flush_every=1)
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "1")
+    with pytest.raises(SystemExit):
+        cli.cmd_define(args)
+    assert os.environ["LLM_LOG_CONSOLE"] == "1"
+    assert sorted(r["title"] for r in storage.list_prompts()) == ["T0", "T1"]
+    calls.clear()
+    down.clear()
+    with pytest.raises(SystemExit):  # 깨진 줄은 계속 실패로 보고
+        cli.cmd_define(args)
+    assert calls == ["g2"]
+    prompts_ = storage.list_prompts()
+    assert sorted(r["title"] for r in prompts_) == ["T0", "T1", "T2"]
+    assert all(r["version"] == 1 and r["meta"]["goal"] == "g" + r["title"][1] for r in prompts_)
+
+def test_define_from_file_interrupt_stops_and_keeps_finished(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    calls = []
+    def fake_draft(goal, **kw):
+        calls.append(goal)
+        time.sleep(0.05)
+        return f"# 목표\n{goal}"
+    monkeypatch.setattr(prompts.define, "make_draft", fake_draft)
+    goals = tmp_path / "goals.jsonl"
+    goals.write_text("\n".join(json.dumps({"title": f"T{i}", "goal": f"g{i}"}) for i in range(20)) + "\n",
+                     encoding="utf-8")
+    args = SimpleNamespace(from_file=str(goals), concurrency=2, rpm=None, tpm=None, model=None, flush_every=50)
+    _ctrl_c_after(0.12)
+    with pytest.raises(SystemExit) as ei:
+        cli.cmd_define(args)
+    assert ei.value.code == 130 and "중단됨" in capsys.readouterr().out
+    time.sleep(0.1)
+    assert 2 <= len(calls) <= 8  # 남은 줄은 호출하지 않음
+    # flush 전이어도 끝난 초안(중단 때 실행 중이던 것 포함)은 저장
+    assert sorted(r["title"] for r in storage.list_prompts()) == sorted("T" + g[1:] for g in calls)
+    done = set(calls)
+    calls.clear()
+    cli.cmd_define(args)
+    assert sorted(calls) == sorted(f"g{i}" for i in range(20) if f"g{i}" not in done)
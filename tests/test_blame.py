@@ -0,0 +1,20 @@
+import core.storage as storage
+from core import blame
+from prompts.edit import apply_edits
+
+def test_blame_follows_edits_and_rewrites(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    monkeypatch.setattr(blame.config, "BLAME_CACHE_DIR", tmp_path / "blame")
+    pid = storage.new_prompt_id()
+    storage.save_new_version(pid, "T", "A\nB\nC", meta={"kind": "define"})
+    edits = [{"op": "set", "line": 2, "text": "BB"}, {"op": "insert", "line": 1, "text": "X"}]
+    storage.save_new_version(pid, "T", apply_edits("A\nB\nC", edits), meta={"kind": "edit", "edits": edits})
+    storage.save_new_version(pid, "T", "X\nA\nBB\nC\nD")  # meta 없이 통째로 바뀐 버전 → 라인 diff
+    _, rows = blame.blame(pid)
+    assert [(r["line"], r["version"]) for r in rows] == [("X", 2), ("A", 1), ("BB", 2), ("C", 1), ("D", 3)]
+    assert rows[0]["kind"] == "edit" and rows[1]["kind"] == "define"
+    assert (tmp_path / "blame" / pid / "3.json").exists()
+    _, cached = blame.blame(pid)
+    assert cached == rows
+    _, older = blame.blame(pid, 2)
+    assert [r["version"] for r in older] == [2, 1, 2, 1]
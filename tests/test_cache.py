@@ -0,0 +1,54 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import core.llm as llm
+from core.cache import ResponseCache, request_key
+
+def test_cache_ttl_and_lru(tmp_path):
+    c = ResponseCache(tmp_path, max_bytes=10_000, ttl=60)
+    keys = [request_key({"model": "m", "input": i}) for i in range(5)]
+    for i, k in enumerate(keys):
+        c.put(k, {"text": "x" * 100})
+        os.utime(c._path(k), (time.time() - 10 + i,) * 2)
+    c.max_bytes = 600
+    assert c.evict() == 2                   # 용량의 90% 이하가 될 때까지 오래된 순으로 삭제
+    assert c.get(keys[0]) is None
+    assert c.get(keys[-1])["text"] == "x" * 100
+    c.ttl = 1e-9
+    assert c.get(keys[-1]) is None
+
+def test_cache_stats_concurrent(tmp_path):
+    c = ResponseCache(tmp_path)
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda i: (c.record(False), c.put(request_key({"i": i % 8}), {"text": "x"})), range(400)))
+    assert c.stats()["misses"] == 400
+
+def test_chat_uses_cache(monkeypatch, tmp_path):
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(output_text="hello", usage=None, truncated=None, output=[], status="completed")
+    monkeypatch.setattr(llm.config, "LLM_LOG_PATH", tmp_path / "llm.jsonl")
+    monkeypatch.setattr(llm.config, "LLM_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(llm, "_cache", None)
+    monkeypatch.setattr(llm, "_get_client", lambda: SimpleNamespace(responses=SimpleNamespace(create=create)))
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "on")
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "0")
+    msgs = [{"role": "user", "content": "hi"}]
+    assert llm.chat(msgs, model="gpt-5") == "hello"
+    assert llm.chat(msgs, model="gpt-5") == "hello"
+    assert len(calls) == 1
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "refresh")
+    llm.chat(msgs, model="gpt-5")
+    assert len(calls) == 2
+    assert llm._cache.stats()["hits"] == 1
+
+    # 캐시 장부 실패는 호출 실패가 아님
+    def broken(*a, **k):
+        raise OSError("disk full")
+    monkeypatch.setattr(llm._cache, "get", broken)
+    monkeypatch.setattr(llm._cache, "put", broken)
+    monkeypatch.setattr(llm._cache, "record", broken)
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "on")
+    assert llm.chat([{"role": "user", "content": "new"}], model="gpt-5") == "hello"
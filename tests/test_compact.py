@@ -0,0 +1,41 @@
+import json
+import core.storage as storage
+from core.compact import compact_jsonl
+from core.sqlite_store import migrate_jsonl, SqliteStorage
+
+def test_compact_archives_dedupes_and_stays_readable(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    store = storage.JsonlStorage(path, mode="delta", snapshot_every=3)
+    a, b, c = storage.new_prompt_id(), storage.new_prompt_id(), storage.new_prompt_id()
+    base = "\n".join(f"line {i}" for i in range(50))
+    for v in range(6):
+        store.save_new_version(a, "A", base + f"\nv{v}")
+    store.save_new_version(b, "B", "same")
+    store.save_new_version(c, "C", "same")  # 다른 프롬프트, 같은 내용 → blob 하나
+    store.append_record({"record_type": "eval", "prompt_id": a, "source_version": 6, "title": "A",
+                         "meta_prompt": "M" * 5000, "llm_output": "ok"})
+    expected = [r["content"] for r in store.all_versions(a)]
+
+    res = compact_jsonl(store, keep=2, evals="archive")
+    assert res["archived"] == 4 and res["blobs"] == 1 and res["evals_trimmed"] == 1
+    assert res["bytes_after"] < res["bytes_before"]
+    assert json.loads(path.read_text(encoding="utf-8").splitlines()[0])["record_type"] == "compact"
+
+    fresh = storage.JsonlStorage(path, mode="delta", snapshot_every=3)  # 다른 프로세스처럼 새로 열기
+    assert [r["content"] for r in fresh.all_versions(a)] == expected
+    assert fresh.get_version(a, 2)["content"] == expected[1]
+    assert fresh.latest_by_id(c)["content"] == "same"
+    assert fresh.evals_for(a)[0]["meta_prompt"] == "M" * 5000
+    assert fresh.save_new_version(a, "A", "next")["version"] == 7
+    assert sum(1 for r in fresh.iter_records() if r.get("prompt_id") == a and "record_type" not in r) == 7
+
+    inserted, _ = migrate_jsonl(path, tmp_path / "p.db")
+    assert inserted == 10
+    assert SqliteStorage(tmp_path / "p.db").get_version(a, 1)["content"] == expected[0]
+
+    # 다시 compact (기본 evals=keep) 해도 보관된 meta_prompt 를 로그로 되돌리지 않음
+    size = path.stat().st_size
+    res = compact_jsonl(fresh)
+    assert res["evals_trimmed"] == 0 and path.stat().st_size < size + 1000
+    assert "M" * 5000 not in path.read_text(encoding="utf-8")
+    assert storage.JsonlStorage(path).evals_for(a)[0]["meta_prompt"] == "M" * 5000
@@ -0,0 +1,49 @@
+import json
+import socket
+import threading
+from core import daemon
+
+def _request(path, payload):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(path))
+        s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with s.makefile("rb") as f:
+            return [json.loads(line) for line in f]
+
+def test_daemon_runs_commands_and_stops(tmp_path):
+    path = tmp_path / "s.sock"
+    calls = []
+
+    def run(argv):
+        calls.append(argv)
+        print("hello", *argv)
+        return 3
+
+    ready = threading.Event()
+    t = threading.Thread(target=daemon.serve, args=(run, path, lambda _: ready.set()), daemon=True)
+    t.start()
+    assert ready.wait(5)
+    assert path.stat().st_mode & 0o777 == 0o600
+    # 클라이언트 설정(환경변수)이 데몬과 다르면 실행하지 않음 → forward 는 None (직접 실행)
+    assert _request(path, {"argv": ["show"], "cwd": str(tmp_path), "env": "other"}) == [{"mismatch": True}]
+    msgs = _request(path, {"argv": ["show", "--id", "x"], "cwd": str(tmp_path), "env": daemon.env_fingerprint()})
+    assert "".join(m.get("out", "") for m in msgs) == "hello show --id x\n"
+    assert msgs[-1] == {"exit": 3}
+    assert calls == [["show", "--id", "x"]]
+    assert daemon.stop(path)
+    t.join(5)
+    assert not t.is_alive() and not path.exists()
+
+def test_forward_without_daemon(monkeypatch, tmp_path):
+    monkeypatch.setenv("SPARKLING_SOCKET", str(tmp_path / "none.sock"))
+    assert daemon.forward(["list"]) is None
+
+def test_run_restores_env_changed_by_command(monkeypatch, tmp_path):
+    import cli
+    import core.storage as storage
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "1")
+    empty = tmp_path / "goals.jsonl"
+    empty.write_text("", encoding="utf-8")
+    assert cli.run(["define", "--from-file", str(empty)]) == 0  # 배치 명령은 콘솔 로그를 끔
+    assert daemon.os.environ["LLM_LOG_CONSOLE"] == "1"
@@ -1,7 +1,16 @@
 from prompts.define import make_draft
 
-def test_make_draft_includes_goal():
+def test_make_draft_includes_goal(replay_llm):
+    replay_llm("체크리스트\n- 목표 파악\n```\n# 목표\n제품 리뷰 요약\n\n# 출력 형식\n- 3줄 요약\n```\n검증: 목표를 충족함.")
     goal = "제품 리뷰 요약"
     draft = make_draft(goal)
     assert "제품 리뷰 요약" in draft
     assert "# 출력 형식" in draft
+
+def test_user_template_goal_is_last():
+    # 프롬프트 캐시: 목표가 달라도 앞부분(정적 지시문)은 동일해야 함
+    from prompts.define import USER_TEMPLATE
+    a, b = USER_TEMPLATE.format(goal="A"), USER_TEMPLATE.format(goal="B")
+    prefix = USER_TEMPLATE.split("{goal}")[0]
+    assert a.startswith(prefix) and b.startswith(prefix)
+    assert a.rstrip().endswith("A")
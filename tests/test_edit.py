@@ -5,3 +5,40 @@ def test_apply_edits_basic():
     edits = [{"op":"set","line":2,"text":"BB"}, {"op":"insert","line":2,"text":"X"}, {"op":"delete","line":3}]
     out = apply_edits(src, edits)
     assert out.splitlines() == ["A","X","BB"]
+
+def test_apply_edits_reports_out_of_range_and_conflicts():
+    import pytest
+    from prompts.patch import PatchError
+    with pytest.raises(PatchError) as ei:
+        apply_edits("A\nB", [{"op":"delete","line":5}, {"op":"set","line":1,"text":"x"}, {"op":"delete","line":1}])
+    assert len(ei.value.problems) == 2
+    with pytest.raises(PatchError) as ei:
+        apply_edits("A", [["set", 1, "x"], "delete 1", {"op": "delete", "line": 1}])
+    assert ei.value.problems == ["#0: 객체가 아님", "#1: 객체가 아님"]
+    with pytest.raises(PatchError):
+        apply_edits("A", {"op": "delete", "line": 1})
+
+def test_compose_matches_sequential_application():
+    import random
+    from prompts.patch import apply_patch, apply_mapped, compose
+    rng = random.Random(7)
+    for _ in range(200):
+        content = "\n".join(f"L{i}" for i in range(rng.randint(0, 8)))
+        cur, patches = content, []
+        for _ in range(rng.randint(1, 4)):
+            n = len(cur.splitlines())
+            p, used = [], set()
+            for _ in range(rng.randint(0, 4)):
+                op = rng.choice(["set", "insert", "delete"])
+                line = rng.randint(1, n + 1 if op == "insert" else max(n, 1))
+                if op != "insert":
+                    if n == 0 or line in used:
+                        continue
+                    used.add(line)
+                p.append({"op": op, "line": line, "text": f"t{rng.random():.3f}"})
+            cur = apply_patch(cur, p)
+            patches.append(p)
+        squashed = compose(patches, len(content.splitlines()))
+        assert apply_patch(content, squashed) == cur
+    mapped = apply_mapped(["A", "B", "C"], [{"op":"insert","line":2,"text":"X"}, {"op":"set","line":3,"text":"c"}])
+    assert mapped == [("A", 0), ("X", None), ("B", 1), ("c", None)]
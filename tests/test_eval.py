@@ -1,7 +1,74 @@
-from prompts.eval import evaluate
+from prompts.eval import build_meta_prompt, extract_goal_from_content, run_llm_eval, META_INSTRUCTIONS
 
-def test_evaluate_sections():
-    content = "# 목표\nx\n# 지시사항\nx\n# 제약조건\nx\n# 출력 형식\nx\n# 평가 기준\nx\n1) a\n- b"
-    r = evaluate(content)
-    assert r["score"] > 60
-    assert not r["red_flags"]
+def test_meta_prompt_static_prefix():
+    a = build_meta_prompt("프롬프트 A", "요약한다", "장황하다")
+    b = build_meta_prompt("프롬프트 B {DESIRED}", "분류한다", "틀린다")
+    assert a.startswith(META_INSTRUCTIONS) and b.startswith(META_INSTRUCTIONS)
+    assert "[프롬프트 B {DESIRED}]" in b
+    assert "for the agent to [분류한다], but instead it [틀린다]" in b
+
+def test_run_llm_eval_uses_goal(replay_llm):
+    replay_llm("- '출력 형식' 섹션에 JSON 스키마를 추가하세요.")
+    content = "# 목표\n고객 문의 분류\n\n# 출력 형식\nx"
+    r = run_llm_eval(content, extract_goal_from_content(content), "형식을 지키지 않는다")
+    assert r["llm_output"].startswith("- '출력 형식'")
+    assert r["desired_used"]
+    assert "형식을 지키지 않는다" in r["meta_prompt"]
+
+def test_incremental_eval_sends_diff(replay_llm):
+    replay_llm("- 예시를 추가하세요.")
+    lines = ["# 목표\n고객 문의 분류"] + [f"규칙 {i}: 문의를 분류 기준표에 따라 나눈다" for i in range(40)]
+    old, new = "\n".join(lines), "\n".join(lines[:10] + ["규칙 X: 애매하면 기타로"] + lines[10:])
+    prev = {"version": 3, "content": old, "llm_output": "- 기타 분류를 정의하세요.",
+            "desired": "고객 문의 분류", "undesired": "애매한 문의를 틀린다"}
+    r = run_llm_eval(new, "고객 문의 분류", "애매한 문의를 틀린다", previous=prev)
+    assert r["mode"] == "incremental" and r["base_version"] == 3
+    assert "+규칙 X: 애매하면 기타로" in r["meta_prompt"] and "[- 기타 분류를 정의하세요.]" in r["meta_prompt"]
+    full = build_meta_prompt(new, "고객 문의 분류", "애매한 문의를 틀린다")
+    assert len(r["meta_prompt"]) - len(META_INSTRUCTIONS) < (len(full) - len(META_INSTRUCTIONS)) / 2
+    # 많이 바뀌었거나 undesired 가 다르면 전체 평가
+    assert run_llm_eval("완전히 다른 내용", "고객 문의 분류", "애매한 문의를 틀린다", previous=prev)["mode"] == "full"
+    assert run_llm_eval(new, "고객 문의 분류", "장황하다", previous=prev)["mode"] == "full"
+
+def test_run_llm_eval_samples_clusters(replay_llm):
+    replay_llm("1. Add an explicit JSON schema example to the '출력 형식' section.\n2. Replace \"be concise\" with a 3 sentence limit.",
+               "- Include an example of the JSON schema in the 출력 형식 section.",
+               "- Add a JSON schema example under '출력 형식'.\n- State that ambiguous inquiries go to '기타'.")
+    r = run_llm_eval("# 목표\n분류\n\n# 출력 형식\nx", None, "형식을 안 지킴", samples=3)
+    assert len(r["samples"]) == 3 and not r["samples_failed"]
+    top = r["suggestions"][0]
+    assert top["support"] == 3 and "JSON schema" in top["text"]
+    assert [c["support"] for c in r["suggestions"]] == [3, 1, 1]
+    assert r["llm_output"].splitlines()[1].startswith("1. [3/3]")
+
+def test_incremental_base_is_last_full_eval(monkeypatch, tmp_path):
+    import cli
+    import core.storage as storage
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    pid = storage.new_prompt_id()
+    for v in range(1, 4):
+        storage.save_new_version(pid, "T", f"v{v}")
+    for v, mode in [(1, "full"), (2, "incremental")]:
+        storage.append_record({"record_type": "eval", "prompt_id": pid, "source_version": v, "title": "T",
+                               "undesired": "u", "llm_output": f"fb{v}", "eval_mode": mode})
+    prev = cli._previous_eval(pid, storage.latest_by_id(pid), "u")
+    assert prev["version"] == 1 and prev["llm_output"] == "fb1"  # 증분 평가 위에 증분을 쌓지 않음
+
+def test_eval_uses_edited_goal_section(replay_llm, monkeypatch, tmp_path, capsys):
+    import cli
+    import core.storage as storage
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(tmp_path / "prompts.jsonl"))
+    replay_llm("- 예시를 추가하세요.")
+    lines = [f"규칙 {i}: 문의를 분류 기준표에 따라 나눈다" for i in range(40)]
+    pid = storage.new_prompt_id()
+    storage.save_new_version(pid, "T", "\n".join(["# 목표", "고객 문의 분류", "", "# 규칙"] + lines),
+                             meta={"kind": "define", "goal": "고객 문의 분류"})
+    assert cli.run(["eval", "--id", pid, "--undesired", "u"]) == 0
+    assert cli.run(["edit", "--id", pid, "--patch-json", '[{"op":"set","line":2,"text":"환불 문의만 분류"}]']) == 0
+    assert cli.run(["eval", "--id", pid, "--undesired", "u"]) == 0
+    last = storage.evals_for(pid)[-1]
+    assert last["desired"] == "환불 문의만 분류" and "eval_mode" not in last  # 목표가 바뀜 → 전체 평가
+    assert cli.run(["edit", "--id", pid, "--patch-json", '[{"op":"insert","line":6,"text":"규칙 X"}]']) == 0
+    assert cli.run(["eval", "--id", pid, "--undesired", "u"]) == 0
+    last = storage.evals_for(pid)[-1]
+    assert last["desired"] == "환불 문의만 분류" and last["eval_mode"] == "incremental"
@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import pytest
+import core.llm as llm
+
+def test_chat_streaming_hands_out_deltas(monkeypatch, tmp_path):
+    final = SimpleNamespace(output_text="hello world", usage=None, truncated=None, output=[], status="completed",
+                            model_dump=lambda: {})
+    events = [SimpleNamespace(type="response.created"),
+              SimpleNamespace(type="response.output_text.delta", delta="hello"),
+              SimpleNamespace(type="response.output_text.delta", delta=" world"),
+              SimpleNamespace(type="response.completed", response=final)]
+    monkeypatch.setattr(llm.config, "LLM_LOG_PATH", tmp_path / "llm.jsonl")
+    monkeypatch.setattr(llm, "_get_client", lambda: SimpleNamespace(
+        responses=SimpleNamespace(create=lambda **kw: iter(events) if kw.get("stream") else final)))
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "off")
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "0")
+    got = []
+    assert llm.chat([{"role": "user", "content": "hi"}], on_delta=got.append) == "hello world"
+    assert got == ["hello", " world"]
+    llm.flush_log()
+    assert '"ttft_ms"' in (tmp_path / "llm.jsonl").read_text(encoding="utf-8")
+
+def _response_body(text):
+    return {
+        "id": "resp_1", "object": "response", "created_at": 0, "model": "gpt-5", "status": "completed",
+        "output": [{"type": "message", "id": "msg_1", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "usage": {"input_tokens": 5, "input_tokens_details": {"cached_tokens": 0},
+                  "output_tokens": 2, "output_tokens_details": {"reasoning_tokens": 0}, "total_tokens": 7},
+    }
+
+@pytest.fixture
+def stub_server(monkeypatch, tmp_path):
+    """/v1/responses 에 대해 script 의 동작을 차례로 수행: 정수=HTTP 상태 코드, ("sleep", 초, text), 문자열=정상 응답."""
+    script = []
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("content-length", 0)))
+            step = script.pop(0) if script else "ok"
+            if isinstance(step, tuple):
+                time.sleep(step[1])
+                step = step[2]
+            if isinstance(step, int):
+                body, status = b'{"error": {"message": "injected"}}', step
+            else:
+                body, status = json.dumps(_response_body(step)).encode(), 200
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("LLM_LOG_CONSOLE", "0")
+    monkeypatch.setenv("SPARKLING_LLM_CACHE", "off")
+    monkeypatch.setattr(llm.config, "LLM_LOG_PATH", tmp_path / "llm.jsonl")
+    monkeypatch.setattr(llm.config, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm.config, "LLM_HEDGE_AFTER", 0)
+    monkeypatch.setattr(llm, "_client", None)
+    yield script
+    server.shutdown()
+    llm._client = None
+
+def _last_response_log(tmp_path):
+    llm.flush_log()
+    rows = [json.loads(l) for l in (tmp_path / "llm.jsonl").read_text(encoding="utf-8").splitlines()]
+    return [r for r in rows if r["event"] == "llm_response"][-1]
+
+def test_chat_retries_injected_failures(stub_server, tmp_path):
+    stub_server.extend([500, 429, "recovered"])
+    assert llm.chat([{"role": "user", "content": "hi"}]) == "recovered"
+    assert _last_response_log(tmp_path)["retries"] == 2
+    assert _last_response_log(tmp_path)["cached_tokens"] == 0
+    stub_server.extend([400])
+    with pytest.raises(llm.LLMError):
+        llm.chat([{"role": "user", "content": "hi"}])
+
+def test_chat_hedges_slow_request(stub_server, tmp_path):
+    stub_server.extend([("sleep", 1.5, "slow"), "fast"])
+    t0 = time.perf_counter()
+    assert llm.chat([{"role": "user", "content": "hi"}], hedge_after=0.2) == "fast"
+    assert time.perf_counter() - t0 < 1.0
+    assert _last_response_log(tmp_path)["hedged"] is True
+
+def test_record_then_replay(stub_server, tmp_path, monkeypatch):
+    msgs = [{"role": "user", "content": "hi"}]
+    monkeypatch.setattr(llm.config, "LLM_BACKEND", "record")
+    stub_server.extend(["recorded answer"])
+    assert llm.chat(msgs) == "recorded answer"
+    llm.flush_log()
+
+    monkeypatch.setattr(llm.config, "LLM_BACKEND", "replay")
+    monkeypatch.setattr(llm.config, "LLM_FIXTURES", tmp_path / "llm.jsonl")
+    monkeypatch.setattr(llm.config, "LLM_REPLAY_MATCH", "exact")
+    monkeypatch.setattr(llm.config, "LLM_REPLAY_LATENCY", "50")
+    monkeypatch.setattr(llm, "_client", None)
+    chunks = []
+    t0 = time.perf_counter()
+    assert llm.chat(msgs, on_delta=chunks.append) == "recorded answer"
+    assert time.perf_counter() - t0 >= 0.05
+    assert "".join(chunks) == "recorded answer"
+    with pytest.raises(llm.LLMError):
+        llm.chat([{"role": "user", "content": "never recorded"}])
+
+def test_token_budget_and_truncation_regrow(replay_llm, tmp_path, monkeypatch, capsys):
+    from core.tokens import estimate_tokens
+    assert estimate_tokens("abcd" * 10) == 10 and estimate_tokens("한글") == 2
+    msgs = [{"role": "user", "content": "x" * 400}]  # 약 104 토큰
+    fixtures = tmp_path / "llm_fixtures.jsonl"
+    with fixtures.open("w", encoding="utf-8") as f:
+        for i, (text, status) in enumerate([("cut", "incomplete"), ("full answer", "completed")]):
+            f.write(json.dumps({"event": "llm_request", "req_id": f"r{i}", "kwargs": {}}) + "\n")
+            f.write(json.dumps({"event": "llm_response", "req_id": f"r{i}", "text": text, "status": status,
+                                "incomplete_reason": "max_output_tokens" if status == "incomplete" else None,
+                                "usage": {"input_tokens": 100, "output_tokens": 700}}) + "\n")
+
+    # 출력 한도에서 잘리면 한도를 두 배로 해서 한 번만 다시 요청
+    assert llm.chat(msgs, max_tokens=500) == "full answer"
+    llm.flush_log()
+    rows = [json.loads(l) for l in (tmp_path / "llm.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [r["max_output_tokens"] for r in rows if r["event"] == "llm_response"] == [500, 1000]
+
+    # 같은 kind 의 기록이 쌓이면 출력 한도를 p95 × 여유율로 늘림 (호출부 기본값보다 작아지지 않음)
+    llm.flush_log()
+    with (tmp_path / "llm.jsonl").open("a", encoding="utf-8") as f:
+        for n in range(1, 11):
+            f.write(json.dumps({"event": "llm_response", "tags": {"kind": "eval"},
+                                "usage": {"output_tokens": n * 100}}) + "\n")
+    with llm.log_context(kind="eval"):
+        llm.chat(msgs, max_tokens=800)
+    llm.flush_log()
+    rows = [json.loads(l) for l in (tmp_path / "llm.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [r for r in rows if r["event"] == "llm_request"][-1]["kwargs"]["max_output_tokens"] == 1300
+
+    # 입력 예산: warn 은 경고만, refuse 는 보내지 않음
+    monkeypatch.setattr(llm.config, "LLM_INPUT_BUDGET", 50)
+    llm.chat(msgs)
+    assert "예산" in capsys.readouterr().err
+    monkeypatch.setattr(llm.config, "LLM_INPUT_POLICY", "refuse")
+    with pytest.raises(llm.LLMError):
+        llm.chat(msgs)
+
+def test_lazy_log_is_created_once(monkeypatch, tmp_path):
+    made = []
+    class SlowLog:
+        def __init__(self, path, **kw):
+            time.sleep(0.05)
+            self.path = path
+            made.append(self)
+    monkeypatch.setattr(llm, "AsyncJsonlLog", SlowLog)
+    monkeypatch.setattr(llm, "_log", None)
+    monkeypatch.setattr(llm.config, "LLM_LOG_PATH", tmp_path / "llm.jsonl")
+    threads = [threading.Thread(target=llm._get_log) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(made) == 1
+
+def test_lazy_client_is_created_once(monkeypatch, tmp_path):
+    import core.replay
+    made = []
+    class SlowClient:
+        def __init__(self, *a, **kw):
+            time.sleep(0.05)
+            made.append(self)
+    monkeypatch.setattr(core.replay, "ReplayClient", SlowClient)
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm.config, "LLM_BACKEND", "replay")
+    threads = [threading.Thread(target=llm._get_client) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(made) == 1
+
+def test_output_limit_follows_history(replay_llm, tmp_path, monkeypatch):
+    with (tmp_path / "llm.jsonl").open("w", encoding="utf-8") as f:
+        for n in range(1, 11):
+            f.write(json.dumps({"event": "llm_response", "tags": {"kind": "define"},
+                                "usage": {"output_tokens": n * 300}}) + "\n")
+    assert llm.output_limit("define", 2000) == 3900  # p95 3000 × 1.3 — batch 비용 어림도 같은 값
+    assert llm.output_limit("eval", 800) == 800
+    monkeypatch.setattr(llm.config, "LLM_AUTO_MAX_TOKENS", False)
+    assert llm.output_limit("define", 2000) == 2000
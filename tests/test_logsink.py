@@ -0,0 +1,49 @@
+import gzip
+import json
+from core.logsink import AsyncJsonlLog, rotated_segments
+
+def test_rotation_and_raw_policy(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    log = AsyncJsonlLog(path, max_bytes=300, backups=2, raw="truncated", raw_max=20)
+    for i in range(12):
+        log.write({"ts": "2026-01-01T00:00:00+00:00", "i": i, "raw": {"text": "x" * 100}})
+    log.flush()
+    segs = rotated_segments(path)
+    assert len(segs) == 2
+    rows = [json.loads(l) for l in gzip.open(segs[-1], "rt", encoding="utf-8")]
+    rows += [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+    assert rows[-1]["i"] == 11
+    assert rows[-1]["raw"]["_truncated"] and len(rows[-1]["raw"]["head"]) == 20
+    log.close()
+    log.raw = "off"
+    log.write({"i": 12, "raw": {"a": 1}})  # close 후에도 다시 기록
+    log.flush()
+    assert "raw" not in json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+
+def test_two_writers_share_rotation(tmp_path):
+    # 각자 fd 와 잠금 fd 를 따로 여는 두 인스턴스 = 두 프로세스와 같은 상황
+    path = tmp_path / "llm.jsonl"
+    a = AsyncJsonlLog(path, max_bytes=400, backups=100)
+    b = AsyncJsonlLog(path, max_bytes=400, backups=100)
+    for i in range(60):
+        (a if i % 2 else b).write({"i": i, "pad": "y" * 40})
+    a.flush(); b.flush()
+    rows = [json.loads(l) for seg in rotated_segments(path) for l in gzip.open(seg, "rt", encoding="utf-8")]
+    rows += [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+    assert sorted(r["i"] for r in rows) == list(range(60))
+    assert all(seg.stat().st_size for seg in rotated_segments(path))
+    assert path.stat().st_size <= 400
+    a.close(); b.close()
+
+def test_writer_follows_rotation_by_other(tmp_path):
+    # b 의 줄은 작아서 b 혼자서는 회전 조건에 걸리지 않음 → a 가 회전한 뒤 옛 fd 에 쓰면 유실
+    path = tmp_path / "llm.jsonl"
+    a = AsyncJsonlLog(path, max_bytes=400, backups=100)
+    b = AsyncJsonlLog(path, max_bytes=400, backups=100)
+    for i in range(6):
+        a.write({"i": f"a{i}", "pad": "y" * 280}); a.flush()
+        b.write({"i": f"b{i}"}); b.flush()
+    rows = [json.loads(l) for seg in rotated_segments(path) for l in gzip.open(seg, "rt", encoding="utf-8")]
+    rows += [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["i"] for r in rows] == [f"{w}{i}" for i in range(6) for w in "ab"]
+    a.close(); b.close()
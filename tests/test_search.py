@@ -0,0 +1,42 @@
+import core.storage as storage
+from core.search import SearchIndex, tokenize
+from core.sqlite_store import SqliteStorage
+
+def test_tokenize_mixed():
+    assert tokenize("JSON 출력 형식") == ["json", "출력", "형식"]
+    assert tokenize("리뷰요약") == ["리뷰", "뷰요", "요약"]
+
+def _fill(store):
+    a, b = storage.new_prompt_id(), storage.new_prompt_id()
+    store.save_new_version(a, "리뷰 요약", "제품 리뷰를 요약하라.", meta={"goal": "리뷰 요약"})
+    store.save_new_version(a, "리뷰 요약", "제품 리뷰를 요약하고 JSON 출력으로 반환하라.")
+    store.save_new_version(b, "번역", "Translate the text into English.")
+    return a, b
+
+def test_search_incremental_bm25(tmp_path):
+    for store in (storage.JsonlStorage(tmp_path / "p.jsonl"), SqliteStorage(tmp_path / "p.db")):
+        idx = SearchIndex(tmp_path / f"{type(store).__name__}.db", store)
+        a, b = _fill(store)
+        assert idx.update() == 3
+        hits = idx.search("json output")
+        assert [(h["prompt_id"], h["version"]) for h in hits] == [(a, 2)]
+        assert idx.search("english")[0]["prompt_id"] == b
+        assert idx.update() == 0
+        store.append_record({"record_type": "eval", "prompt_id": b, "source_version": 1, "title": "번역",
+                             "llm_output": "Add an explicit JSON schema."})
+        assert idx.update() == 1
+        assert {h["prompt_id"] for h in idx.search("json")} == {a, b}
+        assert idx.search("schema", record_type="eval")[0]["version"] == 1
+        idx.close()
+
+def test_search_rebuilds_after_rewrite(tmp_path):
+    path = tmp_path / "p.jsonl"
+    store = storage.JsonlStorage(path)
+    idx = SearchIndex(tmp_path / "s.db", store)
+    a, _ = _fill(store)
+    idx.update()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    path.write_text("\n".join(lines[:2]) + "\n", encoding="utf-8")  # 마지막 레코드 제거
+    assert idx.update() == 2
+    assert idx.search("english") == []
+    idx.close()
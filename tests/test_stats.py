@@ -0,0 +1,24 @@
+import gzip
+import json
+from core.stats import aggregate, iter_log_events, parse_since
+
+def _resp(ts, ms, kind, pid, out=100):
+    return {"ts": ts, "event": "llm_response", "model": "gpt-5", "latency_ms": ms, "retries": 0,
+            "usage": {"input_tokens": 1000, "input_tokens_details": {"cached_tokens": 200}, "output_tokens": out},
+            "tags": {"kind": kind, "prompt_id": pid}}
+
+def test_aggregate_over_rotated_logs(tmp_path):
+    path = tmp_path / "llm.jsonl"
+    old = [_resp("2026-01-01T00:00:00+00:00", 9999, "eval", "a")]
+    seg = [_resp(f"2026-02-01T00:00:0{i}+00:00", 100 * (i + 1), "define", "a") for i in range(5)]
+    cur = [_resp("2026-02-02T00:00:00+00:00", 50, "eval", "b"),
+           {"ts": "2026-02-02T00:00:01+00:00", "event": "llm_error", "model": "gpt-5", "tags": {"kind": "eval"}}]
+    with gzip.open(tmp_path / "llm.jsonl.20260201T000000000000.gz", "wt", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e) + "\n" for e in old + seg))
+    path.write_text("".join(json.dumps(e) + "\n" for e in cur) + "{broken\n", encoding="utf-8")
+    prices = {"gpt-5": {"input": 1.0, "cached_input": 0.1, "output": 10.0}}
+    r = aggregate(iter_log_events(path), since=parse_since("2026-01-15"), prices=prices)
+    assert r["total"]["calls"] == 6 and r["total"]["errors"] == 1
+    assert r["kind"]["define"]["latency_ms"] == {"p50": 300, "p95": 500, "p99": 500}
+    assert r["prompt"]["b"]["tokens"]["cached"] == 200
+    assert abs(r["model"]["gpt-5"]["cost_usd"] - 6 * (800 + 20 + 1000) / 1e6) < 1e-9
@@ -0,0 +1,141 @@
+import threading
+import core.storage as storage
+from core.sqlite_store import SqliteStorage, migrate_jsonl
+
+def _use_tmp_store(monkeypatch, tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    monkeypatch.setattr(storage, "_storage", storage.JsonlStorage(path))
+    return path
+
+def test_index_lookups(monkeypatch, tmp_path):
+    _use_tmp_store(monkeypatch, tmp_path)
+    pid = storage.new_prompt_id()
+    storage.save_new_version(pid, "T", "v1")
+    storage.save_new_version(pid, "T", "v2")
+    storage.append_record({"record_type": "eval", "prompt_id": pid, "source_version": 2, "title": "T"})
+    storage.save_new_version(storage.new_prompt_id(), "U", "other")
+    assert storage.latest_by_id(pid)["content"] == "v2"
+    assert [r["version"] for r in storage.all_versions(pid)] == [1, 2]
+    assert storage.find_ids_by_title("T") == [pid]
+
+def test_index_follows_external_append_and_truncate(monkeypatch, tmp_path):
+    path = _use_tmp_store(monkeypatch, tmp_path)
+    pid = storage.new_prompt_id()
+    storage.save_new_version(pid, "T", "v1")
+    storage.save_new_version(pid, "T", "v2")
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"prompt_id": "%s", "version": 3, "title": "T", "content": "v3"}\n' % pid)
+    assert storage.latest_by_id(pid)["version"] == 3
+    first = path.read_text(encoding="utf-8").splitlines()[0]
+    path.write_text(first + "\n", encoding="utf-8")
+    assert storage.latest_by_id(pid)["version"] == 1
+    assert storage.save_new_version(pid, "T", "again")["version"] == 2
+
+def test_index_catch_up_does_not_duplicate(tmp_path):
+    path = tmp_path / "prompts.jsonl"
+    a, b = storage.JsonlStorage(path), storage.JsonlStorage(path)
+    pid = storage.new_prompt_id()
+    a.save_new_version(pid, "T", "v1")
+    assert b.latest_by_id(pid)["version"] == 1
+    a.append_record({"record_type": "eval", "prompt_id": pid, "source_version": 1, "title": "T"})
+    assert len(b.evals_for(pid)) == 1  # b 가 따라잡으며 같은 줄을 .idx 에 한 번 더 씀
+    fresh = storage.JsonlStorage(path)
+    assert len(fresh.evals_for(pid)) == 1
+    assert fresh.summaries()[1][0]["evals"] == 1
+
+def test_sqlite_concurrent_versions_and_migrate(tmp_path):
+    db = SqliteStorage(tmp_path / "p.db")
+    pid = storage.new_prompt_id()
+    threads = [threading.Thread(target=db.save_new_version, args=(pid, "T", f"c{i}")) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [r["version"] for r in db.all_versions(pid)] == list(range(1, 9))
+
+    src = storage.JsonlStorage(tmp_path / "prompts.jsonl")
+    src.save_new_version(pid, "T", "a")
+    src.save_new_version(pid, "T", "b")
+    src.append_record({"record_type": "eval", "prompt_id": pid, "source_version": 2, "title": "T"})
+    assert migrate_jsonl(src.path, tmp_path / "m.db") == (3, 0)
+    m = SqliteStorage(tmp_path / "m.db")
+    assert m.latest_by_id(pid)["content"] == "b"
+    assert m.find_ids_by_title("T") == [pid]
+
+def test_delta_mode_roundtrip(tmp_path):
+    for st in (storage.JsonlStorage(tmp_path / "d.jsonl", mode="delta", snapshot_every=4),
+               SqliteStorage(tmp_path / "d.db", mode="delta", snapshot_every=4)):
+        pid = storage.new_prompt_id()
+        lines = [f"line {i}" for i in range(50)]
+        expected = []
+        for v in range(10):
+            lines[v] = f"edited {v}"
+            expected.append("\n".join(lines))
+            st.save_new_version(pid, "T", expected[-1])
+        raw = list(st.iter_records())
+        assert sum("delta" in r for r in raw) == 7  # v1, v5, v9 은 스냅샷
+        st._cache.clear()
+        assert st.latest_by_id(pid)["content"] == expected[-1]
+        st._cache.clear()
+        assert st.get_version(pid, 7)["content"] == expected[6]
+        assert [r["content"] for r in st.all_versions(pid)] == expected
+
+def test_summaries_page_sort_and_filter(tmp_path):
+    import sqlite3
+    for store in (storage.JsonlStorage(tmp_path / "p.jsonl"), SqliteStorage(tmp_path / "p.db")):
+        a, b, c = (storage.new_prompt_id() for _ in range(3))
+        store.save_new_version(a, "고객 분류", "v1")
+        store.save_new_version(b, "고객 응대", "v1")
+        store.save_new_version(a, "고객 분류", "v2")
+        store.append_record({"record_type": "eval", "prompt_id": a, "source_version": 2, "title": "고객 분류"})
+        store.save_new_version(c, "Review", "v1")
+        total, rows = store.summaries(sort="title")
+        assert total == 3  # eval 은 프롬프트로 세지 않음
+        assert [r["title"] for r in rows] == ["Review", "고객 분류", "고객 응대"]
+        assert (rows[1]["version"], rows[1]["evals"]) == (2, 1) and rows[1]["last_eval_at"]
+        total, rows = store.summaries(sort="title", title_prefix="고객", limit=1, offset=1)
+        assert total == 2 and [r["prompt_id"] for r in rows] == [b]
+        assert [r["prompt_id"] for r in store.summaries(sort="eval")[1]][0] == a
+        assert store.summaries(title_prefix="review")[0] == 0
+    # summary 테이블 이전에 만든 DB → 연결할 때 채움
+    conn = sqlite3.connect(str(tmp_path / "p.db"))
+    conn.execute("DELETE FROM summary")
+    conn.commit()
+    conn.close()
+    assert SqliteStorage(tmp_path / "p.db").summaries(sort="title")[1][1]["evals"] == 1
+
+def test_summaries_sort_by_empty_title(tmp_path):
+    for store in (storage.JsonlStorage(tmp_path / "p.jsonl"), SqliteStorage(tmp_path / "p.db")):
+        a, b = storage.new_prompt_id(), storage.new_prompt_id()
+        store.save_new_version(a, "B", "v1")
+        store.save_new_version(b, "", "v1")
+        assert [r["title"] for r in store.summaries(sort="title")[1]] == ["", "B"]
+
+def test_reader_catch_up_writes_index_under_lock(tmp_path):
+    import time
+    path = tmp_path / "prompts.jsonl"
+    writer, reader = storage.JsonlStorage(path), storage.JsonlStorage(path)
+    pid = storage.new_prompt_id()
+    writer.save_new_version(pid, "T", "v1")
+    assert reader.latest_by_id(pid)["version"] == 1
+    writer.save_new_version(pid, "T", "v2")
+    held = threading.Event()
+    def hold():
+        with storage.JsonlStorage(path)._locked():  # 다른 프로세스의 쓰기 중
+            held.set()
+            time.sleep(0.3)
+    t = threading.Thread(target=hold)
+    t.start()
+    held.wait(5)
+    t0 = time.monotonic()
+    assert reader.latest_by_id(pid)["version"] == 2  # 따라잡은 줄을 .idx 에 쓰려면 잠금을 기다림
+    assert time.monotonic() - t0 >= 0.2
+    t.join()
+
+def test_incomplete_backend_fails_on_creation():
+    import pytest
+    class Partial(storage.Storage):
+        def append_record(self, record):
+            pass
+    with pytest.raises(TypeError):
+        Partial()